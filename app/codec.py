@@ -0,0 +1,161 @@
+"""Compact binary encoding of bus events for cross-process transports.
+
+A frame is ``timestamp (float64) | type length (uint16) | type (utf-8) |
+payload``. The payload is a tagged msgpack-style encoding of JSON-like values
+(None, bool, int, float, str, bytes, list/tuple, dict); anything else is sent
+as its ``str()``, the same way the event sink stores it. Unlike pickle,
+decoding never executes code and the frames are readable from any language.
+"""
+
+import struct
+from typing import Any, Tuple
+
+from app.events import Event
+
+_HEADER = struct.Struct("!dH")
+# tag byte followed by a fixed-size value or length
+_TAG_I32 = struct.Struct("!ci")
+_TAG_I64 = struct.Struct("!cq")
+_TAG_F64 = struct.Struct("!cd")
+_TAG_LEN = struct.Struct("!cI")
+_I32 = struct.Struct("!i")
+_I64 = struct.Struct("!q")
+_F64 = struct.Struct("!d")
+_U32 = struct.Struct("!I")
+
+_NONE = b"N"
+_TRUE = b"T"
+_FALSE = b"F"
+_INT32 = b"j"
+_INT = b"i"
+_BIGINT = b"I"  # ints outside int64, as decimal text
+_FLOAT = b"d"
+_STR = b"s"
+_BYTES = b"b"
+_LIST = b"l"
+_MAP = b"m"
+# the same tags as ints, for comparing against indexed bytes
+_N, _T, _F, _J, _I, _BIG, _D, _S, _B, _L, _M = (
+    _NONE
+    + _TRUE
+    + _FALSE
+    + _INT32
+    + _INT
+    + _BIGINT
+    + _FLOAT
+    + _STR
+    + _BYTES
+    + _LIST
+    + _MAP
+)
+
+_INT32_MIN = -(2**31)
+_INT32_MAX = 2**31 - 1
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+def _encode_value(value: Any, out: bytearray):
+    # exact type checks first: they are the common, cheap case
+    kind = type(value)
+    if kind is str:
+        raw = value.encode("utf-8")
+        out += _TAG_LEN.pack(_STR, len(raw))
+        out += raw
+    elif kind is dict:
+        out += _TAG_LEN.pack(_MAP, len(value))
+        for k, v in value.items():
+            _encode_value(k if type(k) is str else str(k), out)
+            _encode_value(v, out)
+    elif value is None:
+        out += _NONE
+    elif value is True:
+        out += _TRUE
+    elif value is False:
+        out += _FALSE
+    elif isinstance(value, int):
+        if _INT32_MIN <= value <= _INT32_MAX:
+            out += _TAG_I32.pack(_INT32, value)
+        elif _INT64_MIN <= value <= _INT64_MAX:
+            out += _TAG_I64.pack(_INT, value)
+        else:
+            raw = str(value).encode()
+            out += _TAG_LEN.pack(_BIGINT, len(raw))
+            out += raw
+    elif isinstance(value, float):
+        out += _TAG_F64.pack(_FLOAT, value)
+    elif isinstance(value, str):
+        _encode_value(str.__str__(value), out)
+    elif isinstance(value, (bytes, bytearray)):
+        out += _TAG_LEN.pack(_BYTES, len(value))
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out += _TAG_LEN.pack(_LIST, len(value))
+        for item in value:
+            _encode_value(item, out)
+    elif isinstance(value, dict):
+        _encode_value(dict(value), out)
+    else:
+        _encode_value(str(value), out)
+
+
+def _decode_value(buf: bytes, pos: int) -> Tuple[Any, int]:
+    tag = buf[pos]
+    pos += 1
+    if tag == _S:
+        (size,) = _U32.unpack_from(buf, pos)
+        pos += 4
+        return buf[pos : pos + size].decode("utf-8"), pos + size
+    if tag == _M:
+        (size,) = _U32.unpack_from(buf, pos)
+        pos += 4
+        mapping = {}
+        for _ in range(size):
+            k, pos = _decode_value(buf, pos)
+            mapping[k], pos = _decode_value(buf, pos)
+        return mapping, pos
+    if tag == _J:
+        return _I32.unpack_from(buf, pos)[0], pos + 4
+    if tag == _L:
+        (size,) = _U32.unpack_from(buf, pos)
+        pos += 4
+        items = []
+        for _ in range(size):
+            item, pos = _decode_value(buf, pos)
+            items.append(item)
+        return items, pos
+    if tag == _N:
+        return None, pos
+    if tag == _T:
+        return True, pos
+    if tag == _F:
+        return False, pos
+    if tag == _I:
+        return _I64.unpack_from(buf, pos)[0], pos + 8
+    if tag == _D:
+        return _F64.unpack_from(buf, pos)[0], pos + 8
+    if tag == _B or tag == _BIG:
+        (size,) = _U32.unpack_from(buf, pos)
+        pos += 4
+        raw = buf[pos : pos + size]
+        return (raw if tag == _B else int(raw)), pos + size
+    raise ValueError(f"unknown tag {tag!r} at offset {pos - 1}")
+
+
+def encode_event(event: Event) -> bytes:
+    etype = event.type.encode("utf-8")
+    out = bytearray(_HEADER.pack(event.timestamp, len(etype)))
+    out += etype
+    _encode_value(event.payload, out)
+    return bytes(out)
+
+
+def decode_event(frame: bytes) -> Event:
+    buf = bytes(frame)
+    timestamp, type_len = _HEADER.unpack_from(buf, 0)
+    pos = _HEADER.size
+    etype = buf[pos : pos + type_len].decode("utf-8")
+    payload, end = _decode_value(buf, pos + type_len)
+    if end != len(buf):
+        raise ValueError("trailing bytes after event payload")
+    return Event(type=etype, payload=payload, timestamp=timestamp)
@@ -1,8 +1,10 @@
+import os
 import queue
 import threading
 import time
+from collections import deque
 from dataclasses import dataclass
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
 
 
 @dataclass
@@ -16,50 +18,317 @@ class Event:
             self.timestamp = time.time()
 
 
+# back-pressure policies for a full subscription
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+COALESCE = "coalesce"
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+DEFAULT_MAXSIZE = 10000
+
+
+class Subscription:
+    """Bounded ring buffer holding one subscriber's pending events.
+
+    Quacks like ``queue.Queue`` (``get``/``get_nowait``/``put``/``qsize``) so
+    existing consumers keep working. When the buffer is full, ``policy`` decides
+    what happens to a new event:
+
+    - ``block``: the publisher waits for room (up to ``block_timeout``, then the
+      event is dropped);
+    - ``drop_oldest``: the oldest pending event is discarded;
+    - ``drop_newest``: the new event is discarded;
+    - ``coalesce``: an event whose ``key(event)`` matches a pending one replaces
+      it in place; other events fall back to ``drop_oldest``. ``key`` returning
+      None means "never coalesce" for that event.
+
+    ``maxsize=0`` keeps the old unbounded behaviour.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        policy: str = DROP_OLDEST,
+        key: Optional[Callable[[Event], Hashable]] = None,
+        block_timeout: Optional[float] = None,
+        name: Optional[str] = None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r}")
+        if policy == COALESCE and key is None:
+            raise ValueError("coalesce policy needs a key function")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self.block_timeout = block_timeout
+        self.name = name
+        self._items = deque()
+        # key -> pending cell ([key, event]) for the coalesce policy
+        self._pending_keys: Dict[Hashable, list] = {}
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0
+        self.closed = False
+
+    def _full(self) -> bool:
+        return 0 < self.maxsize <= len(self._items)
+
+    def _drop_oldest(self):
+        cell = self._items.popleft()
+        if self.policy == COALESCE and self._pending_keys.get(cell[0]) is cell:
+            del self._pending_keys[cell[0]]
+        self.dropped += 1
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        """Enqueue ``item`` according to the policy; never raises ``queue.Full``."""
+        with self._mutex:
+            if self.closed:
+                return
+            if self.policy == COALESCE:
+                k = self.key(item)
+                cell = self._pending_keys.get(k) if k is not None else None
+                if cell is not None:
+                    cell[1] = item
+                    self.coalesced += 1
+                    return
+                if self._full():
+                    self._drop_oldest()
+                cell = [k, item]
+                if k is not None:
+                    self._pending_keys[k] = cell
+                self._items.append(cell)
+            else:
+                if self._full():
+                    if self.policy == DROP_NEWEST or (
+                        self.policy == BLOCK and not block
+                    ):
+                        self.dropped += 1
+                        return
+                    if self.policy == BLOCK:
+                        wait = self.block_timeout if timeout is None else timeout
+                        self._not_full.wait_for(
+                            lambda: not self._full() or self.closed, timeout=wait
+                        )
+                        if self.closed:
+                            return
+                        if self._full():
+                            self.dropped += 1
+                            return
+                    else:
+                        self._drop_oldest()
+                self._items.append([None, item])
+            self.max_lag = max(self.max_lag, len(self._items))
+            self._not_empty.notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        with self._mutex:
+            if not self._items:
+                if not block:
+                    raise queue.Empty
+                self._not_empty.wait_for(
+                    lambda: self._items or self.closed, timeout=timeout
+                )
+                if not self._items:
+                    raise queue.Empty
+            return self._take(1)[0]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_batch(self, max_items: int = 256, timeout: Optional[float] = None) -> List:
+        """Wait for events and return up to ``max_items`` of them at once.
+
+        The whole batch is taken under one lock acquisition. Returns an empty
+        list on timeout or once the subscription is closed and drained.
+        """
+        with self._mutex:
+            self._not_empty.wait_for(
+                lambda: self._items or self.closed, timeout=timeout
+            )
+            return self._take(max_items)
+
+    def _take(self, n: int) -> List:
+        # must hold self._mutex
+        out = []
+        while self._items and len(out) < n:
+            cell = self._items.popleft()
+            if self.policy == COALESCE and self._pending_keys.get(cell[0]) is cell:
+                del self._pending_keys[cell[0]]
+            out.append(cell[1])
+        if out:
+            self.delivered += len(out)
+            self._not_full.notify(len(out))
+        return out
+
+    def close(self):
+        """Reject further events and wake every waiting producer and consumer."""
+        with self._mutex:
+            self.closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return self._full()
+
+    def stats(self) -> Dict:
+        """Counters for monitoring; ``lag`` is the number of pending events."""
+        with self._mutex:
+            return {
+                "name": self.name,
+                "policy": self.policy,
+                "maxsize": self.maxsize,
+                "lag": len(self._items),
+                "max_lag": self.max_lag,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+
+def topic_matches(pattern: str, event_type: str) -> bool:
+    """``*`` matches everything, ``intent.*`` every type under ``intent.``."""
+    if pattern == "*":
+        return True
+    if pattern.endswith(".*"):
+        return event_type.startswith(pattern[:-1])
+    return pattern == event_type
+
+
+# distinct event types whose subscriber lists are memoised per bus state
+MAX_CACHED_ROUTES = 1024
+
+
 class EventBus:
     """Thread-safe publish-subscribe event bus.
 
-    Each subscriber gets its own internal queue so multiple consumers receive the same events.
+    Each subscriber gets its own bounded Subscription so multiple consumers
+    receive the same events and a slow one only affects itself (see the
+    Subscription policies). Subscribers may restrict themselves to ``topics``
+    (exact types or ``prefix.*`` patterns); publish resolves the matching
+    subscribers once per event type and caches the result, so fan-out only
+    touches interested queues.
+
+    Bus state is copy-on-write: register and unregister swap in a new
+    (subscribers, routes) pair under the lock, publish reads the current pair
+    without taking any lock.
+
+    With a ``transport`` (see app.transport) published events are also sent to
+    the buses of other processes, and theirs are delivered to local
+    subscribers.
     """
 
-    def __init__(self):
-        self._subscribers = []
+    def __init__(self, transport=None):
+        # ((queue, patterns or None), ...), {event type: (queue, ...)}
+        self._state: Tuple[Tuple, Dict[str, Tuple]] = ((), {})
         self._lock = threading.Lock()
+        self.transport = transport
+        if transport is not None:
+            transport.start(self._deliver)
+
+    @property
+    def _subscribers(self) -> Tuple:
+        return tuple(q for q, _ in self._state[0])
+
+    def _route(self, event_type: str) -> Tuple:
+        subscribers, routes = self._state
+        targets = routes.get(event_type)
+        if targets is None:
+            targets = tuple(
+                q
+                for q, patterns in subscribers
+                if patterns is None
+                or any(topic_matches(p, event_type) for p in patterns)
+            )
+            # routes belongs to this snapshot only, so a racing register simply
+            # discards what we add here
+            if len(routes) < MAX_CACHED_ROUTES:
+                routes[event_type] = targets
+        return targets
 
     def publish(self, event: Event):
-        with self._lock:
-            for q in list(self._subscribers):
-                try:
-                    q.put(event)
-                except Exception:
-                    pass
+        self._deliver(event)
+        if self.transport is not None:
+            try:
+                self.transport.send(event)
+            except Exception:
+                pass
+
+    def _deliver(self, event: Event):
+        for q in self._route(event.type):
+            try:
+                q.put(event)
+            except Exception:
+                pass
+
+    def close(self):
+        """Disconnect the transport, if any."""
+        if self.transport is not None:
+            self.transport.close()
+
+    def register(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        q=None,
+        policy: str = DROP_OLDEST,
+        key: Optional[Callable[[Event], Hashable]] = None,
+        block_timeout: Optional[float] = None,
+        name: Optional[str] = None,
+        topics: Optional[Iterable[str]] = None,
+    ) -> Subscription:
+        """Register a new subscriber and return the Subscription to read from.
 
-    def register(self, maxsize: int = 0) -> queue.Queue:
-        """Register a new subscriber and return a Queue the subscriber can read from."""
-        q = queue.Queue(maxsize=maxsize)
+        ``topics`` limits delivery to matching event types (None = all events).
+        An existing queue-like object (e.g. a ``queue.Queue`` subclass with its
+        own overflow handling) can be passed as ``q`` instead of letting the bus
+        create one.
+        """
+        if q is None:
+            q = Subscription(
+                maxsize=maxsize,
+                policy=policy,
+                key=key,
+                block_timeout=block_timeout,
+                name=name,
+            )
+        patterns = tuple(topics) if topics is not None else None
         with self._lock:
-            self._subscribers.append(q)
+            self._state = (self._state[0] + ((q, patterns),), {})
         return q
 
-    def unregister(self, q: queue.Queue):
+    def unregister(self, q):
         with self._lock:
-            try:
-                self._subscribers.remove(q)
-            except ValueError:
-                pass
+            subscribers = tuple(s for s in self._state[0] if s[0] is not q)
+            self._state = (subscribers, {})
+
+    def stats(self) -> List[Dict]:
+        """Per-subscriber lag/drop counters (only for bus-created Subscriptions)."""
+        return [q.stats() for q in self._subscribers if isinstance(q, Subscription)]
 
     def drain(self):
         # drain all subscriber queues (mainly for testing)
         out = {}
-        with self._lock:
-            for idx, q in enumerate(self._subscribers):
-                items = []
-                while True:
-                    try:
-                        items.append(q.get_nowait())
-                    except queue.Empty:
-                        break
-                out[idx] = items
+        for idx, q in enumerate(self._subscribers):
+            items = []
+            while True:
+                try:
+                    items.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            out[idx] = items
         return out
 
 
@@ -69,26 +338,76 @@ _lock = threading.Lock()
 
 
 def get_event_bus() -> EventBus:
+    """Process-wide bus; ``V3_EVENT_BUS_URL=unix:///path`` joins a broker.
+
+    A broker that is not running does not fail this call: the bus works
+    locally and the transport keeps reconnecting in the background.
+    """
     global _default_bus
     with _lock:
         if _default_bus is None:
-            _default_bus = EventBus()
+            from app.transport import transport_from_url
+
+            _default_bus = EventBus(
+                transport=transport_from_url(os.environ.get("V3_EVENT_BUS_URL"))
+            )
         return _default_bus
 
 
-def run_consumer_loop(consumer: Callable[[Event], None], stop_event: threading.Event):
-    bus = get_event_bus()
-    q = bus.register()
+def run_batch_consumer_loop(
+    consumer: Callable[[List[Event]], None],
+    stop_event: threading.Event,
+    max_batch: int = 256,
+    bus: Optional[EventBus] = None,
+    **register_kwargs,
+):
+    """Feed bus events to ``consumer`` in lists of up to ``max_batch``.
+
+    The loop sleeps on the subscription's condition variable instead of polling:
+    an idle consumer never wakes up, and setting ``stop_event`` closes the
+    subscription so the loop returns right away. Events still pending at that
+    point are discarded. ``register_kwargs`` (maxsize, policy, key, name,
+    topics) configure the subscription on ``bus`` (the global bus by default).
+    """
+    bus = bus or get_event_bus()
+    q = bus.register(**register_kwargs)
+
+    def close_on_stop():
+        stop_event.wait()
+        q.close()
+
+    threading.Thread(target=close_on_stop, name="consumer-stop", daemon=True).start()
     try:
         while not stop_event.is_set():
-            try:
-                ev = q.get(timeout=0.5)
-            except queue.Empty:
+            batch = q.get_batch(max_batch)
+            if not batch or stop_event.is_set():
                 continue
             try:
-                consumer(ev)
+                consumer(batch)
             except Exception:
                 # swallow to keep loop alive
                 pass
     finally:
         bus.unregister(q)
+        q.close()
+
+
+def run_consumer_loop(
+    consumer: Callable[[Event], None], stop_event: threading.Event, **register_kwargs
+):
+    """Feed bus events to ``consumer`` one at a time until ``stop_event`` is set.
+
+    Built on run_batch_consumer_loop, so it also waits without polling.
+    """
+
+    def consume_each(batch: List[Event]):
+        for ev in batch:
+            if stop_event.is_set():
+                return
+            try:
+                consumer(ev)
+            except Exception:
+                # swallow to keep loop alive
+                pass
+
+    run_batch_consumer_loop(consume_each, stop_event, **register_kwargs)
@@ -3,7 +3,14 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext
 import time
 import requests
-from app.events import get_event_bus, Event, run_consumer_loop
+from app.events import COALESCE, get_event_bus, Event, run_consumer_loop
+
+
+def _coalesce_key(ev: Event):
+    # cache hit/miss counters are cumulative: only the latest one matters to the log
+    if ev.type in ("cache.hit", "cache.miss"):
+        return ("cache", ev.payload.get("adapter"))
+    return None
 
 
 class MainGUI:
@@ -14,6 +21,11 @@ class MainGUI:
 
         self.bus = get_event_bus()
         self.stop_event = threading.Event()
+        # id of the job started from this window (from its job.started event)
+        self.job_id = None
+        # url -> (etag, parsed body): polls revalidate instead of re-downloading
+        self._http = requests.Session()
+        self._http_cache = {}
 
         # build UI first (widgets needed by consumer callbacks)
         self._build()
@@ -22,6 +34,7 @@ class MainGUI:
         self.consumer_thread = threading.Thread(
             target=run_consumer_loop,
             args=(self._on_event, self.stop_event),
+            kwargs={"policy": COALESCE, "key": _coalesce_key, "name": "gui"},
             daemon=True,
         )
         self.consumer_thread.start()
@@ -76,14 +89,20 @@ class MainGUI:
     def _start_run(self):
         # publish an intent to start a job; JobManager should listen
         self.bus.publish(
-            Event(type="intent.start_run", payload={"keywords": ["python", "tkinter"]})
+            Event(
+                type="intent.start_run",
+                # GUI runs jump ahead of batch/backfill jobs in the scheduler
+                payload={"keywords": ["python", "tkinter"], "priority": "interactive"},
+            )
         )
         self.start_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         self._log("Published start intent")
 
     def _stop_run(self):
-        self.bus.publish(Event(type="intent.stop_run", payload={}))
+        # cancel only our job; the manager keeps serving other runs
+        payload = {"job_id": self.job_id} if self.job_id is not None else {}
+        self.bus.publish(Event(type="intent.stop_run", payload=payload))
         self.start_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self._log("Published stop intent")
@@ -105,8 +124,14 @@ class MainGUI:
         else:
             self._log(text)
 
+        if ev.type == "job.started" and ev.payload.get("priority") == "interactive":
+            self.job_id = ev.payload.get("job_id")
         # optional: update ads/metrics views when job finishes
-        if ev.type == "job.finished":
+        if ev.type in ("job.finished", "job.cancelled"):
+            if ev.payload.get("job_id") == self.job_id:
+                self.job_id = None
+                self.start_btn.config(state=tk.NORMAL)
+                self.stop_btn.config(state=tk.DISABLED)
             # refresh ads display if present
             try:
                 if hasattr(self, "ads_text"):
@@ -170,9 +195,7 @@ class MainGUI:
 
         self.root.after(0, show_loading)
         try:
-            resp = requests.get(url, timeout=3)
-            resp.raise_for_status()
-            metrics = resp.json()
+            metrics = self._get_json(url)
         except Exception as e:
             self._log(f"Erro ao buscar métricas: {e}")
 
@@ -238,13 +261,24 @@ class MainGUI:
 
         self.root.after(0, render)
 
+    def _get_json(self, url: str):
+        """GET ``url`` with If-None-Match; a 304 reuses the last body."""
+        cached = self._http_cache.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        resp = self._http.get(url, headers=headers, timeout=3)
+        if resp.status_code == 304 and cached:
+            return cached[1]
+        resp.raise_for_status()
+        data = resp.json()
+        if "ETag" in resp.headers:
+            self._http_cache[url] = (resp.headers["ETag"], data)
+        return data
+
     def _fetch_ads(self):
         """Fetch /ads and populate the ads_text widget. Run in background thread."""
         url = "http://127.0.0.1:8000/ads"
         try:
-            resp = requests.get(url, timeout=3)
-            resp.raise_for_status()
-            ads = resp.json()
+            ads = self._get_json(url)
         except Exception as e:
             # show error in GUI log
             self._log(f"Erro ao buscar anúncios: {e}")
@@ -0,0 +1,410 @@
+"""Cross-process transports for EventBus.
+
+A bus created with a transport delivers every published event to its local
+subscribers as usual and also hands it to the transport, which forwards it to
+the buses of other processes; events arriving from a transport are delivered
+locally only, so nothing echoes back. Events travel as app.codec frames.
+
+- ``SocketTransport`` + ``EventBroker``: a small relay listening on a Unix
+  domain socket; any number of processes connect and see each other's events.
+  Every connection writes from its own bounded outbox on its own thread, so
+  a slow peer never blocks a publisher or the other peers.
+- ``MultiprocessingHub``: one ``multiprocessing.Queue`` per peer, for a parent
+  that starts its workers itself and passes them the hub.
+
+``transport_from_url`` maps ``V3_EVENT_BUS_URL`` values (``unix:///path``,
+``inproc``) to a transport; see app.events.get_event_bus.
+"""
+
+import multiprocessing
+import os
+import socket
+import struct
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.codec import decode_event, encode_event
+from app.events import DROP_OLDEST, Event, Subscription
+
+_LEN = struct.Struct("!I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+# frames a connection may have queued before its overflow policy applies
+DEFAULT_OUTBOX = 10000
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> Optional[bytes]:
+    header = _recv_exact(sock, _LEN.size)
+    if header is None:
+        return None
+    (size,) = _LEN.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"frame of {size} bytes exceeds MAX_FRAME_BYTES")
+    return _recv_exact(sock, size)
+
+
+class Transport:
+    """Interface implemented by the transports below."""
+
+    def start(self, deliver: Callable[[Event], None]):
+        """Begin receiving; ``deliver`` is called for every remote event."""
+        raise NotImplementedError
+
+    def send(self, event: Event):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class SocketTransport(Transport):
+    """Connects a bus to an EventBroker listening on ``path``.
+
+    ``send`` only queues the event in a bounded outbox (``maxsize``/``policy``
+    as for a Subscription); a writer thread encodes and writes it, so a slow
+    or stuck broker never blocks the publisher. If the broker is not running
+    or goes away the bus keeps working locally: the writer reconnects with
+    exponential backoff (``reconnect_min_s`` doubling up to
+    ``reconnect_max_s``) and then flushes what the outbox still holds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        connect_timeout: float = 5.0,
+        maxsize: int = DEFAULT_OUTBOX,
+        policy: str = DROP_OLDEST,
+        reconnect_min_s: float = 0.1,
+        reconnect_max_s: float = 5.0,
+    ):
+        self.path = path
+        self.connect_timeout = connect_timeout
+        self.reconnect_min_s = reconnect_min_s
+        self.reconnect_max_s = reconnect_max_s
+        self._outbox = Subscription(maxsize=maxsize, policy=policy, name="bus-socket")
+        self._sock: Optional[socket.socket] = None
+        self._sock_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.received = 0
+        self.send_errors = 0
+        self.connects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    @property
+    def dropped(self) -> int:
+        """Events discarded by the outbox policy while it was full."""
+        return self._outbox.dropped
+
+    def start(self, deliver: Callable[[Event], None]):
+        # one attempt up front so events published right away reach the broker
+        self._connect()
+        self._thread = threading.Thread(
+            target=self._run, args=(deliver,), name="bus-socket", daemon=True
+        )
+        self._thread.start()
+
+    def _connect(self) -> Optional[socket.socket]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(self.path)
+            sock.settimeout(None)
+        except OSError:
+            sock.close()
+            return None
+        with self._sock_lock:
+            self._sock = sock
+        self.connects += 1
+        return sock
+
+    def _disconnect(self, sock: socket.socket):
+        with self._sock_lock:
+            if self._sock is sock:
+                self._sock = None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def _run(self, deliver: Callable[[Event], None]):
+        backoff = self.reconnect_min_s
+        while not self._closed.is_set():
+            sock = self._sock
+            if sock is None:
+                if self._outbox.closed:
+                    return  # closing and no broker to flush to
+                self._closed.wait(backoff)
+                backoff = min(backoff * 2, self.reconnect_max_s)
+                if self._closed.is_set() or self._connect() is None:
+                    continue
+                sock = self._sock
+            backoff = self.reconnect_min_s
+            reader = threading.Thread(
+                target=self._read_loop,
+                args=(sock, deliver),
+                name="bus-socket-reader",
+                daemon=True,
+            )
+            reader.start()
+            drained = self._write_loop(sock, reader)
+            self._disconnect(sock)
+            reader.join(1)
+            if drained:
+                return
+
+    def _write_loop(self, sock: socket.socket, reader: threading.Thread) -> bool:
+        """Write outbox batches until the connection drops; True once drained."""
+        while reader.is_alive():
+            batch = self._outbox.get_batch(256, timeout=0.2)
+            if not batch:
+                if self._outbox.closed:
+                    return True
+                continue
+            frames = [encode_event(event) for event in batch]
+            data = b"".join(_LEN.pack(len(frame)) + frame for frame in frames)
+            try:
+                sock.sendall(data)
+            except OSError:
+                # the batch is lost with the connection; the next ones wait
+                # in the outbox for the reconnect
+                self.send_errors += len(batch)
+                return False
+            self.sent += len(batch)
+        return False
+
+    def _read_loop(self, sock: socket.socket, deliver: Callable[[Event], None]):
+        try:
+            while True:
+                frame = _recv_frame(sock)
+                if frame is None:
+                    return
+                self.received += 1
+                try:
+                    deliver(decode_event(frame))
+                except Exception:
+                    pass
+        except (OSError, ValueError):
+            return
+
+    def send(self, event: Event):
+        self._outbox.put(event)
+
+    def close(self, timeout: float = 1.0):
+        """Flush the outbox (for up to ``timeout`` seconds) and disconnect."""
+        self._outbox.close()
+        if not self.connected:
+            self._closed.set()  # nothing to flush to: stop the reconnects
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._closed.set()
+        sock = self._sock
+        if sock is not None:
+            self._disconnect(sock)
+        if self._thread is not None:
+            self._thread.join(1)
+
+
+class _Peer:
+    """One broker connection with its bounded outbound queue and writer."""
+
+    def __init__(self, conn: socket.socket, maxsize: int, policy: str):
+        self.conn = conn
+        self.outbox = Subscription(
+            maxsize=maxsize, policy=policy, name="bus-broker-client"
+        )
+
+
+class EventBroker:
+    """Relays frames between SocketTransport clients on a Unix domain socket.
+
+    Frames are forwarded as opaque bytes (never decoded) to every client except
+    the sender. Each client has its own bounded outbox (``client_maxsize``,
+    ``policy``) drained by a writer thread, so a client that stops reading
+    only loses its own frames (see ``dropped``) and never stalls the others.
+    A client whose socket errors is dropped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client_maxsize: int = DEFAULT_OUTBOX,
+        policy: str = DROP_OLDEST,
+    ):
+        self.path = path
+        self.client_maxsize = client_maxsize
+        self.policy = policy
+        self._server: Optional[socket.socket] = None
+        self._peers: Dict[socket.socket, _Peer] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self.relayed = 0
+
+    @property
+    def dropped(self) -> int:
+        with self._lock:
+            return sum(peer.outbox.dropped for peer in self._peers.values())
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        threading.Thread(
+            target=self._accept_loop, name="bus-broker", daemon=True
+        ).start()
+
+    def serve_forever(self):
+        self.start()
+        self._closed.wait()
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            peer = _Peer(conn, self.client_maxsize, self.policy)
+            with self._lock:
+                self._peers[conn] = peer
+            threading.Thread(
+                target=self._client_loop,
+                args=(peer,),
+                name="bus-broker-client",
+                daemon=True,
+            ).start()
+            threading.Thread(
+                target=self._write_loop,
+                args=(peer,),
+                name="bus-broker-writer",
+                daemon=True,
+            ).start()
+
+    def _client_loop(self, peer: _Peer):
+        try:
+            while True:
+                frame = _recv_frame(peer.conn)
+                if frame is None:
+                    break
+                self._relay(peer.conn, _LEN.pack(len(frame)) + frame)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._drop(peer)
+
+    def _write_loop(self, peer: _Peer):
+        while True:
+            batch = peer.outbox.get_batch(256)
+            if not batch:
+                return  # dropped: outbox closed and drained
+            try:
+                peer.conn.sendall(b"".join(batch))
+            except OSError:
+                self._drop(peer)
+                return
+
+    def _relay(self, sender: socket.socket, data: bytes):
+        with self._lock:
+            targets = [p for c, p in self._peers.items() if c is not sender]
+        for peer in targets:
+            peer.outbox.put(data)
+        self.relayed += 1
+
+    def _drop(self, peer: _Peer):
+        with self._lock:
+            self._peers.pop(peer.conn, None)
+        peer.outbox.close()
+        try:
+            peer.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        peer.conn.close()
+
+    def close(self):
+        self._closed.set()
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            peers, self._peers = list(self._peers.values()), {}
+        for peer in peers:
+            self._drop(peer)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class MultiprocessingTransport(Transport):
+    """One peer of a MultiprocessingHub (see MultiprocessingHub.transport)."""
+
+    def __init__(self, queues: List, index: int):
+        self.queues = queues
+        self.index = index
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, deliver: Callable[[Event], None]):
+        self._thread = threading.Thread(
+            target=self._read_loop, args=(deliver,), name="bus-mp", daemon=True
+        )
+        self._thread.start()
+
+    def _read_loop(self, deliver: Callable[[Event], None]):
+        inbox = self.queues[self.index]
+        while True:
+            frame = inbox.get()
+            if frame is None:
+                return
+            try:
+                deliver(decode_event(frame))
+            except Exception:
+                pass
+
+    def send(self, event: Event):
+        frame = encode_event(event)
+        for idx, q in enumerate(self.queues):
+            if idx != self.index:
+                q.put(frame)
+
+    def close(self):
+        # wake our own reader with the sentinel
+        self.queues[self.index].put(None)
+        if self._thread is not None:
+            self._thread.join(1)
+
+
+class MultiprocessingHub:
+    """Fixed set of ``peers`` inboxes shared by a parent and its child processes.
+
+    Create it before starting the children, pass it to them, and give each
+    process its own ``hub.transport(i)``.
+    """
+
+    def __init__(self, peers: int, context=None):
+        ctx = context or multiprocessing.get_context()
+        self.queues = [ctx.Queue() for _ in range(peers)]
+
+    def transport(self, index: int) -> MultiprocessingTransport:
+        return MultiprocessingTransport(self.queues, index)
+
+
+def transport_from_url(url: Optional[str]) -> Optional[Transport]:
+    """``unix:///run/v3-bus.sock`` -> SocketTransport; empty/``inproc`` -> None."""
+    if not url or url == "inproc":
+        return None
+    if url.startswith("unix://"):
+        return SocketTransport(url[len("unix://") :])
+    raise ValueError(f"unsupported event bus url {url!r}")
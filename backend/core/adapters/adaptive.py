@@ -0,0 +1,201 @@
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Type
+
+from app.events import Event
+from backend.core.adapters.mock_adapter import ThrottledError
+from data.sketch import QuantileSketch
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    # requests/httpx errors carry the response; others may set status_code
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for errors a retry may cure: timeouts, connection errors, HTTP
+    429/5xx (including adapters' ThrottledError)."""
+    if isinstance(exc, (TimeoutError, ConnectionError, ThrottledError)):
+        return True
+    status = _status_code(exc)
+    # rate limited, or a server-side failure
+    return status is not None and (status == 429 or 500 <= status < 600)
+
+
+class AdaptiveAdapter:
+    """Adapter wrapper adjusting its own concurrency limit (AIMD) and retrying.
+
+    At most ``limit`` searches run at once; callers beyond that wait. Every
+    healthy search (no error, latency under ``latency_target_s`` if given)
+    adds ``increase / limit``, i.e. about +``increase`` per round trip of
+    ``limit`` requests, up to ``max_limit``. A transient error or a slow
+    search multiplies the limit by ``backoff`` (at most once per
+    ``cooldown_s``, so one burst of failures counts as a single congestion
+    signal), down to ``min_limit``.
+
+    Only transient errors are retried and count as congestion: by default
+    those ``is_transient`` accepts (timeouts, connection errors, HTTP 429 and
+    5xx), or the exception types in ``retry_on`` when given. They are retried
+    up to ``max_retries`` times after an exponential delay (``base_delay_s *
+    2**n`` capped at ``max_delay_s``) with full jitter. Any other exception
+    (a bad request, a bug) propagates at once and leaves the limit alone.
+    With a bus, ``adapter.retry`` and ``adapter.limit`` events are published.
+
+    The limit only throttles callers that actually reach the adapter: behind
+    a JobManager at most ``max_workers`` searches run at once, so a limit
+    above that has no effect (JobManager caps ``max_limit`` at
+    ``max_workers`` for that reason).
+    """
+
+    def __init__(
+        self,
+        adapter,
+        bus=None,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        latency_target_s: Optional[float] = None,
+        cooldown_s: float = 0.5,
+        max_retries: int = 3,
+        base_delay_s: float = 0.1,
+        max_delay_s: float = 5.0,
+        retry_on: Optional[Tuple[Type[BaseException], ...]] = None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        rng: Optional[random.Random] = None,
+    ):
+        self.adapter = adapter
+        self.name = getattr(adapter, "name", type(adapter).__name__)
+        self.bus = bus
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_target_s = latency_target_s
+        self.cooldown_s = cooldown_s
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.retry_on = retry_on
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._cond = threading.Condition()
+        self._last_decrease = None
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.peak_in_flight = 0
+        self._latency = QuantileSketch()
+
+    def start(self):
+        self.adapter.start()
+
+    def stop(self):
+        self.adapter.stop()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "latency_p50": self._latency.quantile(0.5),
+                "latency_p95": self._latency.quantile(0.95),
+            }
+
+    def search(self, keyword: str, country: str = "us") -> List[Dict]:
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(keyword, country)
+            except Exception as exc:
+                if not self._transient(exc) or attempt >= self.max_retries:
+                    raise
+                delay = self._rng.uniform(
+                    0, min(self.max_delay_s, self.base_delay_s * 2**attempt)
+                )
+                attempt += 1
+                with self._cond:
+                    self.retries += 1
+                self._publish(
+                    "adapter.retry",
+                    {
+                        "adapter": self.name,
+                        "keyword": keyword,
+                        "attempt": attempt,
+                        "delay_s": delay,
+                        "error": str(exc),
+                    },
+                )
+                self._sleep(delay)
+
+    def _transient(self, exc: BaseException) -> bool:
+        if self.retry_on is None:
+            return is_transient(exc)
+        return isinstance(exc, self.retry_on)
+
+    def _attempt(self, keyword: str, country: str) -> List[Dict]:
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = self._clock()
+        try:
+            results = self.adapter.search(keyword, country=country)
+        except BaseException as exc:
+            self._on_done(None, congested=self._transient(exc))
+            raise
+        self._on_done(self._clock() - started)
+        return results
+
+    def _on_done(self, latency: Optional[float], congested: bool = False):
+        """Release the slot and feed the AIMD controller.
+
+        ``latency`` is None for a failure, which shrinks the limit only when
+        ``congested`` (a transient error); other failures leave it as is.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            before = int(self.limit)
+            slow = (
+                latency is not None
+                and self.latency_target_s is not None
+                and latency > self.latency_target_s
+            )
+            if latency is not None:
+                self.successes += 1
+                self._latency.add(latency)
+            else:
+                self.failures += 1
+            if congested or slow:
+                now = self._clock()
+                if (
+                    self._last_decrease is None
+                    or now - self._last_decrease >= self.cooldown_s
+                ):
+                    self._last_decrease = now
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+            elif latency is not None:
+                self.limit = min(
+                    self.max_limit, self.limit + self.increase / self.limit
+                )
+            after = int(self.limit)
+            self._cond.notify_all()
+        if after != before:
+            self._publish("adapter.limit", {"adapter": self.name, "limit": after})
+
+    def _publish(self, event_type: str, payload: Dict):
+        if self.bus is not None:
+            self.bus.publish(Event(type=event_type, payload=payload))
@@ -0,0 +1,75 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class Adapter(Protocol):
+    """Blocking adapter interface used by JobManager (see MockAdapter)."""
+
+    name: str
+
+    def start(self) -> None: ...
+
+    def search(self, keyword: str, country: str = "us") -> List[Dict]: ...
+
+    def stop(self) -> None: ...
+
+
+@runtime_checkable
+class AsyncAdapter(Protocol):
+    """Coroutine-based adapter interface used by AsyncJobManager."""
+
+    name: str
+
+    async def start(self) -> None: ...
+
+    async def search(self, keyword: str, country: str = "us") -> List[Dict]: ...
+
+    async def stop(self) -> None: ...
+
+
+class SyncAdapterShim:
+    """Expose a blocking adapter through the AsyncAdapter interface.
+
+    Calls run on a dedicated thread pool so a slow sync adapter can never starve
+    the event loop's default executor; ``max_workers`` bounds how many blocking
+    searches run at once.
+    """
+
+    def __init__(self, adapter: Adapter, max_workers: int = 16):
+        self.adapter = adapter
+        self.name = getattr(adapter, "name", type(adapter).__name__)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{self.name}-shim"
+        )
+
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    async def start(self) -> None:
+        await self._call(self.adapter.start)
+
+    async def search(self, keyword: str, country: str = "us") -> List[Dict]:
+        return await self._call(self.adapter.search, keyword, country=country)
+
+    async def stop(self) -> None:
+        try:
+            await self._call(self.adapter.stop)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+def is_async_adapter(adapter) -> bool:
+    return inspect.iscoroutinefunction(getattr(adapter, "search", None))
+
+
+def as_async_adapter(adapter, max_workers: Optional[int] = None) -> AsyncAdapter:
+    """Return ``adapter`` unchanged if it is already async, otherwise wrap it."""
+    if is_async_adapter(adapter):
+        return adapter
+    if max_workers is None:
+        return SyncAdapterShim(adapter)
+    return SyncAdapterShim(adapter, max_workers=max_workers)
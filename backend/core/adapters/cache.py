@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from app.events import Event
+
+
+class _Entry:
+    __slots__ = ("results", "expires_at", "size")
+
+    def __init__(self, results: List[Dict], expires_at: float, size: int):
+        self.results = results
+        self.expires_at = expires_at
+        self.size = size
+
+
+def _copy(results: List[Dict]) -> List[Dict]:
+    # callers get their own dicts so they cannot mutate the cached copy
+    return [dict(ad) for ad in results]
+
+
+class CachingAdapter:
+    """Adapter wrapper caching search results per (adapter name, keyword, country).
+
+    Entries expire after ``ttl_s`` seconds and the cache is an LRU bounded by
+    ``max_entries`` and, optionally, ``max_bytes`` (JSON size of the results).
+    Concurrent lookups of the same key share one in-flight search. When a bus
+    is given, every lookup publishes ``cache.hit`` or ``cache.miss`` with the
+    running counters.
+    """
+
+    def __init__(
+        self,
+        adapter,
+        bus=None,
+        ttl_s: float = 300.0,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        clock=time.monotonic,
+    ):
+        self.adapter = adapter
+        self.name = getattr(adapter, "name", type(adapter).__name__)
+        self.bus = bus
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._inflight: Dict[Tuple, Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def start(self):
+        self.adapter.start()
+
+    def stop(self):
+        self.adapter.stop()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def search(self, keyword: str, country: str = "us") -> List[Dict]:
+        key = (self.name, keyword, country)
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                self._discard(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                results = _copy(entry.results)
+            else:
+                flight = self._inflight.get(key)
+                if flight is None:
+                    flight = self._inflight[key] = Future()
+                    leader = True
+                    self.misses += 1
+                else:
+                    # someone is already searching this key; wait for them
+                    self.hits += 1
+                    self.coalesced += 1
+        if entry is not None:
+            self._publish("cache.hit", keyword, country)
+            return results
+        if not leader:
+            self._publish("cache.hit", keyword, country)
+            return _copy(flight.result())
+
+        self._publish("cache.miss", keyword, country)
+        try:
+            results = self.adapter.search(keyword, country=country)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            flight.set_exception(exc)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, _copy(results))
+        flight.set_result(results)
+        return _copy(results)
+
+    def _store(self, key: Tuple, results: List[Dict]):
+        # must hold self._lock
+        size = len(json.dumps(results, default=str))
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = _Entry(results, self._clock() + self.ttl_s, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+            self.evictions += 1
+
+    def _discard(self, key: Tuple):
+        # must hold self._lock
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    def _publish(self, event_type: str, keyword: str, country: str):
+        if self.bus is None:
+            return
+        self.bus.publish(
+            Event(
+                type=event_type,
+                payload={
+                    "adapter": self.name,
+                    "keyword": keyword,
+                    "country": country,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                },
+            )
+        )
@@ -1,10 +1,39 @@
+import asyncio
+import random
+import threading
 import time
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+
+class ThrottledError(RuntimeError):
+    """Raised by MockAdapter when more searches overlap than its ``capacity``."""
 
 
 class MockAdapter:
-    def __init__(self, name: str = "mock"):
+    """Fake ad library.
+
+    ``latency_s`` is the simulated request time, ``error_rate`` the fraction of
+    searches failing with RuntimeError, and ``capacity`` (if set) the number of
+    concurrent searches the fake backend accepts before answering with
+    ThrottledError, the way a real library answers 429. ``seed`` makes the
+    injected errors reproducible.
+    """
+
+    def __init__(
+        self,
+        name: str = "mock",
+        latency_s: float = 0.1,
+        error_rate: float = 0.0,
+        capacity: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
         self.name = name
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.active = 0
         self._running = False
 
     def start(self):
@@ -15,8 +44,20 @@ class MockAdapter:
     def search(self, keyword: str, country: str = "us") -> List[Dict]:
         if not self._running:
             raise RuntimeError("Adapter not started")
-        # simulate network + scraping
-        time.sleep(0.1)
+        with self._lock:
+            self.active += 1
+            overloaded = self.capacity is not None and self.active > self.capacity
+            failed = self.error_rate and self._rng.random() < self.error_rate
+        try:
+            if overloaded:
+                raise ThrottledError("too many concurrent requests")
+            # simulate network + scraping
+            time.sleep(self.latency_s)
+            if failed:
+                raise RuntimeError("injected adapter error")
+        finally:
+            with self._lock:
+                self.active -= 1
         return [
             {
                 "unique_id": f"{keyword}:{country}:1",
@@ -31,3 +72,33 @@ class MockAdapter:
     def stop(self):
         self._running = False
         time.sleep(0.01)
+
+
+class AsyncMockAdapter:
+    """asyncio flavour of MockAdapter: same results, but waits without a thread."""
+
+    def __init__(self, name: str = "mock", latency_s: float = 0.1):
+        self.name = name
+        self.latency_s = latency_s
+        self._running = False
+
+    async def start(self):
+        self._running = True
+        await asyncio.sleep(0.05)
+
+    async def search(self, keyword: str, country: str = "us") -> List[Dict]:
+        if not self._running:
+            raise RuntimeError("Adapter not started")
+        await asyncio.sleep(self.latency_s)
+        return [
+            {
+                "unique_id": f"{keyword}:{country}:1",
+                "keyword": keyword,
+                "country": country,
+                "title": f"Mock ad for {keyword}",
+                "domain": f"{keyword.lower()}.example.com",
+            }
+        ]
+
+    async def stop(self):
+        self._running = False
@@ -0,0 +1,156 @@
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.core.adapters.mock_adapter import ThrottledError
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal", "pareto")
+COUNT_DISTRIBUTIONS = ("fixed", "uniform", "poisson", "geometric")
+
+
+class SimulatedAdapter:
+    """Load-simulation adapter with configurable distributions.
+
+    Latency is drawn from ``latency`` (one of LATENCY_DISTRIBUTIONS) with mean
+    ``latency_s``; ``latency_sigma`` is the lognormal shape (or the pareto
+    alpha) and every draw is capped at ``max_latency_s``. The number of ads per
+    search is drawn from ``results`` (COUNT_DISTRIBUTIONS) with mean
+    ``results_mean``. Each ad carries a ``body`` of ``payload_bytes``
+    characters. A fraction ``duplicate_ratio`` of the ads reuse one of
+    ``duplicate_pool`` shared unique_ids, the way one advertiser shows up under
+    many keywords, so the upsert path sees real conflicts. ``error_rate`` and
+    ``capacity`` inject failures like MockAdapter does.
+
+    Draws come from a Random seeded with ``seed`` and the keyword, so the same
+    keyword always yields the same ads, in any thread or process. The
+    constructor only takes plain values: ``functools.partial(SimulatedAdapter,
+    ...)`` is a valid ``adapter_factory`` for process workers.
+    """
+
+    def __init__(
+        self,
+        name: str = "sim",
+        latency: str = "lognormal",
+        latency_s: float = 0.05,
+        latency_sigma: float = 0.5,
+        max_latency_s: float = 10.0,
+        results: str = "poisson",
+        results_mean: float = 10.0,
+        payload_bytes: int = 256,
+        duplicate_ratio: float = 0.0,
+        duplicate_pool: int = 100,
+        error_rate: float = 0.0,
+        capacity: Optional[int] = None,
+        seed: int = 0,
+    ):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"unknown latency distribution {latency!r}")
+        if results not in COUNT_DISTRIBUTIONS:
+            raise ValueError(f"unknown results distribution {results!r}")
+        self.name = name
+        self.latency = latency
+        self.latency_s = latency_s
+        self.latency_sigma = latency_sigma
+        self.max_latency_s = max_latency_s
+        self.results = results
+        self.results_mean = results_mean
+        self.payload_bytes = payload_bytes
+        self.duplicate_ratio = duplicate_ratio
+        self.duplicate_pool = duplicate_pool
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._calls = 0
+        self.active = 0
+        self._running = False
+
+    def start(self):
+        self._running = True
+
+    def stop(self):
+        self._running = False
+
+    def draw_latency(self, rng: random.Random) -> float:
+        mean = self.latency_s
+        if self.latency == "fixed":
+            value = mean
+        elif self.latency == "uniform":
+            value = rng.uniform(0, 2 * mean)
+        elif self.latency == "exponential":
+            value = rng.expovariate(1 / mean) if mean > 0 else 0.0
+        elif self.latency == "lognormal":
+            # mu chosen so that the distribution mean is latency_s
+            sigma = self.latency_sigma
+            value = (
+                rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+                if mean > 0
+                else 0.0
+            )
+        else:
+            # pareto with alpha = latency_sigma (> 1), scaled to the same mean
+            alpha = max(self.latency_sigma, 1.01)
+            value = mean * (alpha - 1) / alpha * rng.paretovariate(alpha)
+        return min(value, self.max_latency_s)
+
+    def draw_count(self, rng: random.Random) -> int:
+        mean = self.results_mean
+        if self.results == "fixed":
+            return int(round(mean))
+        if self.results == "uniform":
+            return rng.randint(0, int(round(2 * mean)))
+        if self.results == "geometric":
+            if mean <= 0:
+                return 0
+            p = 1 / (mean + 1)
+            return int(math.log(1 - rng.random()) / math.log(1 - p))
+        # poisson (Knuth for small means, normal approximation above)
+        if mean > 50:
+            return max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+        limit, k, prod = math.exp(-mean), 0, rng.random()
+        while prod > limit:
+            k += 1
+            prod *= rng.random()
+        return k
+
+    def search(self, keyword: str, country: str = "us") -> List[Dict]:
+        if not self._running:
+            raise RuntimeError("Adapter not started")
+        rng = random.Random(f"{self.seed}:{keyword}:{country}")
+        with self._lock:
+            self._calls += 1
+            self.active += 1
+            overloaded = self.capacity is not None and self.active > self.capacity
+            # errors depend on the call number too, so a retry may succeed
+            failed = (
+                self.error_rate
+                and random.Random(f"{self.seed}:{keyword}:{self._calls}").random()
+                < self.error_rate
+            )
+        try:
+            if overloaded:
+                raise ThrottledError("too many concurrent requests")
+            time.sleep(self.draw_latency(rng))
+            if failed:
+                raise RuntimeError("injected adapter error")
+        finally:
+            with self._lock:
+                self.active -= 1
+        return [self._ad(rng, keyword, country, i) for i in range(self.draw_count(rng))]
+
+    def _ad(self, rng: random.Random, keyword: str, country: str, idx: int) -> Dict:
+        if self.duplicate_ratio and rng.random() < self.duplicate_ratio:
+            unique_id = f"{self.name}:shared:{rng.randrange(self.duplicate_pool)}"
+        else:
+            unique_id = f"{self.name}:{keyword}:{country}:{idx}"
+        return {
+            "unique_id": unique_id,
+            "keyword": keyword,
+            "country": country,
+            "title": f"Simulated ad {idx} for {keyword}",
+            "body": "x" * self.payload_bytes,
+            "domain": f"advertiser{rng.randrange(1000)}.example.com",
+            "media_url": f"https://cdn.example.com/{unique_id}.jpg",
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.events import Event, get_event_bus
+from backend.core.adapters.base import as_async_adapter
+from backend.core.adapters.mock_adapter import MockAdapter
+from backend.core.job_manager import record_keyword_run, record_unsuccessful_run
+
+
+class AsyncJobManager:
+    """asyncio job engine: many keyword searches in flight on one event loop.
+
+    Publishes the same events as JobManager. ``max_concurrency`` bounds the
+    in-flight searches across every job (the semaphore is also what throttles
+    how fast keywords are pulled from a job), while ``max_db_workers`` bounds the
+    threads used for the blocking SQLAlchemy writes.
+    Sync adapters such as MockAdapter are wrapped with SyncAdapterShim.
+    """
+
+    def __init__(
+        self,
+        bus=None,
+        adapter=None,
+        max_concurrency: int = 1000,
+        max_db_workers: int = 4,
+    ):
+        self.bus = bus or get_event_bus()
+        self.adapter = as_async_adapter(adapter or MockAdapter())
+        self.max_concurrency = max_concurrency
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=max_db_workers, thread_name_prefix="async-jm-db"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self.adapter.start()
+
+    async def shutdown(self):
+        try:
+            await self.adapter.stop()
+        finally:
+            self._db_executor.shutdown(wait=True)
+
+    async def run_keywords_job(
+        self, keywords: List[str], country: str = "US"
+    ) -> List[Optional[List[Dict]]]:
+        """Run every keyword concurrently; returns persisted ads per keyword.
+
+        Entries are ``None`` for keywords that failed (a ``job.error`` event is
+        published and a ``failed`` KeywordRun recorded for them, as in
+        JobManager).
+        """
+        if self._slots is None:
+            raise RuntimeError("AsyncJobManager not started")
+        self.bus.publish(
+            Event(
+                type="job.started", payload={"keywords": keywords, "country": country}
+            )
+        )
+        tasks = []
+        for kw in keywords:
+            # back-pressure: only create a task once a search slot is free
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_keyword(kw, country))
+            task.add_done_callback(lambda _t: self._slots.release())
+            tasks.append(task)
+        results = await asyncio.gather(*tasks)
+        self.bus.publish(Event(type="job.finished", payload={"keywords": keywords}))
+        return results
+
+    async def _db(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, fn, *args)
+
+    async def _run_keyword(self, kw: str, country: str) -> Optional[List[Dict]]:
+        start_ts = time.time()
+        try:
+            self.bus.publish(
+                Event(
+                    type="job.progress",
+                    payload={"keyword": kw, "status": "searching"},
+                )
+            )
+            ads = await self.adapter.search(kw, country=country)
+            # run row and ads in one transaction
+            persisted = await self._db(record_keyword_run, kw, country, ads, start_ts)
+            self.bus.publish(
+                Event(
+                    type="job.keyword_done",
+                    payload={"keyword": kw, "count": len(persisted), "ads": persisted},
+                )
+            )
+            return persisted
+        except Exception as e:
+            self.bus.publish(
+                Event(type="job.error", payload={"keyword": kw, "error": str(e)})
+            )
+            # a failed KeywordRun row, as JobManager records
+            await self._db(
+                record_unsuccessful_run, kw, country, start_ts, "failed", None, None
+            )
+            return None
@@ -0,0 +1,109 @@
+import threading
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# per calling thread: helper threads of CancelToken.call it stopped waiting for
+_local = threading.local()
+
+
+def _abandoned() -> list:
+    threads = getattr(_local, "abandoned", None)
+    if threads is None:
+        threads = _local.abandoned = []
+    return threads
+
+
+def join_abandoned_calls(
+    stop: Optional[threading.Event] = None, poll_s: float = 0.1
+) -> int:
+    """Wait until the calls this thread gave up on have really returned.
+
+    A worker thread calls this after reporting a timed-out or cancelled
+    keyword, so it keeps its slot (and the pool stays at ``max_workers``
+    concurrent adapter calls) until the abandoned call is over. Stops early
+    once ``stop`` is set; returns how many calls are still running.
+    """
+    threads = _abandoned()
+    while threads:
+        threads[0].join(poll_s)
+        if not threads[0].is_alive():
+            threads.pop(0)
+        elif stop is not None and stop.is_set():
+            break
+    return len(threads)
+
+
+class JobCancelled(Exception):
+    """Raised inside a keyword run whose job was cancelled."""
+
+
+class CancelToken:
+    """Per-job cancellation flag shared by every keyword of the job.
+
+    Cancellation is cooperative: code checks ``cancelled`` (or calls
+    ``raise_if_cancelled``) between steps, and ``call`` lets a caller stop
+    waiting for a blocking call as soon as the token is cancelled.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel the token; returns False if it was already cancelled."""
+        with self._cond:
+            if self._cancelled:
+                return False
+            self.reason = reason
+            self._cancelled = True
+            self._cond.notify_all()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._cancelled, timeout)
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise JobCancelled(self.reason)
+
+    def call(self, fn: Callable[..., T], *args, timeout_s: Optional[float] = None) -> T:
+        """Run ``fn(*args)`` and return its result, giving up on cancel or timeout.
+
+        ``fn`` runs in a helper thread; if the token is cancelled (JobCancelled)
+        or ``timeout_s`` elapses (TimeoutError) first, the caller returns at once
+        and whatever ``fn`` produces later is discarded. A blocking adapter call
+        cannot be interrupted from outside, so the call itself keeps running:
+        it is remembered for the calling thread, which should hold its slot in
+        ``join_abandoned_calls`` once it has reported the outcome.
+        """
+        self.raise_if_cancelled()
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = fn(*args)
+            except BaseException as exc:
+                outcome["error"] = exc
+            with self._cond:
+                outcome["done"] = True
+                self._cond.notify_all()
+
+        helper = threading.Thread(target=target, name="cancellable-call", daemon=True)
+        helper.start()
+        with self._cond:
+            self._cond.wait_for(lambda: "done" in outcome or self._cancelled, timeout_s)
+        if "done" not in outcome:
+            _abandoned().append(helper)
+            if self._cancelled:
+                raise JobCancelled(self.reason)
+            raise TimeoutError(f"no result within {timeout_s}s")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
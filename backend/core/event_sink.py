@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.events import Event, get_event_bus
+from data.db import SessionLocal
+from data.models import EventRecord
+
+log = logging.getLogger(__name__)
+
+
+def _encode(payload) -> str:
+    """JSON text of ``payload`` in one pass; non-JSON values (datetimes,
+    exceptions, ...) are kept as their str()."""
+    try:
+        return json.dumps(payload, default=str)
+    except ValueError:
+        # circular references
+        return json.dumps(str(payload))
+
+
+def _utc(timestamp: float) -> datetime:
+    # naive UTC, like the server-side CURRENT_TIMESTAMP
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+# (type, JSON-encoded payload, timestamp)
+Row = Tuple[str, str, float]
+
+_INSERT = insert(EventRecord.__table__)
+_INSERT_KEYS = ("type", "payload", "created_at")
+_compiled: Dict[str, Tuple[str, Callable]] = {}
+
+
+def _compiled_insert(dialect) -> Tuple[str, Callable]:
+    """SQL of ``_INSERT`` for ``dialect`` and a function making its DBAPI rows.
+
+    The batch goes straight to the driver's executemany with payloads already
+    JSON-encoded: SQLAlchemy's per-row parameter processing (which would also
+    encode them again) cost more than the INSERT itself.
+    """
+    if dialect.name not in _compiled:
+        compiled = _INSERT.compile(
+            dialect=dialect, column_keys=list(_INSERT_KEYS), for_executemany=True
+        )
+        created_at = EventRecord.__table__.c.created_at.type
+        to_db = created_at.dialect_impl(dialect).bind_processor(dialect)
+        to_db = to_db or (lambda value: value)
+        if compiled.positional and tuple(compiled.positiontup) == _INSERT_KEYS:
+
+            def params(row: Row):
+                return row[0], row[1], to_db(_utc(row[2]))
+
+        else:
+
+            def params(row: Row):
+                return dict(zip(_INSERT_KEYS, (row[0], row[1], to_db(_utc(row[2])))))
+
+        _compiled[dialect.name] = (str(compiled), params)
+    return _compiled[dialect.name]
+
+
+def _row(ev: Event) -> Row:
+    return ev.type, _encode(ev.payload), ev.timestamp
+
+
+class _SinkQueue(queue.Queue):
+    """Bounded queue whose put never blocks the publisher."""
+
+    def __init__(self, maxsize: int, on_overflow):
+        super().__init__(maxsize=maxsize)
+        self._on_overflow = on_overflow
+
+    def put(self, item, block=True, timeout=None):
+        try:
+            super().put(item, block=False)
+        except queue.Full:
+            self._on_overflow(item)
+
+
+class EventSink:
+    """Persist bus events into the ``events`` table from a background thread.
+
+    Events are written in batches of up to ``batch_size`` rows, or whatever
+    arrived within ``flush_interval_s``, in one executemany INSERT; each
+    payload is JSON-encoded once and ``created_at`` is the event time in naive
+    UTC. Publishing never waits on the database or the disk: at most
+    ``max_pending`` events are buffered, and overflow (up to another
+    ``max_pending`` events) is handed to the writer thread, which appends it
+    to ``spill_path`` in batches (JSON lines, re-ingested on the next start).
+    Without a spill file, or beyond that, overflow is dropped. A batch whose
+    INSERT fails is spilled the same way. ``stats()`` exposes the counters.
+    """
+
+    def __init__(
+        self,
+        bus=None,
+        batch_size: int = 500,
+        flush_interval_s: float = 0.2,
+        max_pending: int = 50000,
+        spill_path: Optional[str] = None,
+        session_factory=SessionLocal,
+    ):
+        self.bus = bus or get_event_bus()
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.session_factory = session_factory
+        self._queue = _SinkQueue(max_pending, self._overflow)
+        # overflowed events waiting for the writer thread to spill them
+        self._overflowed: "deque[Event]" = deque()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.write_errors = 0
+        self.replay_errors = 0
+
+    def start(self):
+        self._stopping.clear()
+        self.bus.register(q=self._queue)
+        self._thread = threading.Thread(
+            target=self._run, name="event-sink", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Unsubscribe, flush what is buffered and stop the writer thread."""
+        self.bus.unregister(self._queue)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        with self._counts_lock:
+            return {
+                "written": self.written,
+                "batches": self.batches,
+                "pending": self._queue.qsize(),
+                "overflowed": len(self._overflowed),
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "write_errors": self.write_errors,
+                "replay_errors": self.replay_errors,
+            }
+
+    def _count(self, name: str, n: int = 1):
+        with self._counts_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # ------------------ overflow handling ------------------
+    def _overflow(self, ev: Event):
+        # publisher thread: no I/O here, the writer thread spills
+        if self.spill_path is None or len(self._overflowed) >= self.max_pending:
+            self._count("dropped")
+        else:
+            self._overflowed.append(ev)
+
+    def _spill_overflowed(self):
+        rows = []
+        while self._overflowed:
+            rows.append(_row(self._overflowed.popleft()))
+        if rows:
+            self._spill(rows)
+
+    def _spill(self, rows: List[Row]):
+        if self.spill_path is None:
+            self._count("dropped", len(rows))
+            return
+        lines = [
+            '{"type": %s, "payload": %s, "timestamp": %s}\n'
+            % (json.dumps(type_), payload, json.dumps(timestamp))
+            for type_, payload, timestamp in rows
+        ]
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            self._count("spilled", len(rows))
+        except OSError:
+            self._count("dropped", len(rows))
+
+    def _replay_spill(self):
+        if self.spill_path is None or not os.path.exists(self.spill_path):
+            return
+        replay_path = self.spill_path + ".replay"
+        if os.path.exists(replay_path):
+            # left by an interrupted replay: add to it instead of replacing it
+            with open(self.spill_path, "rb") as src, open(replay_path, "ab") as dst:
+                dst.write(src.read())
+            os.remove(self.spill_path)
+        else:
+            os.replace(self.spill_path, replay_path)
+        batch: List[Row] = []
+        with open(replay_path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                try:
+                    data = json.loads(line)
+                    batch.append(
+                        (data["type"], _encode(data["payload"]), data["timestamp"])
+                    )
+                except (ValueError, KeyError, TypeError):
+                    # e.g. a line cut short by a crash: skip it, keep the rest
+                    self._count("replay_errors")
+                    log.warning("%s:%d: skipping bad spill line", replay_path, lineno)
+                    continue
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+        if batch:
+            self._write(batch)
+        os.remove(replay_path)
+
+    # ------------------ writer thread ------------------
+    def _run(self):
+        try:
+            self._replay_spill()
+        except Exception:
+            self._count("write_errors")
+        while True:
+            batch = self._collect()
+            self._spill_overflowed()
+            if batch:
+                self._write([_row(ev) for ev in batch])
+            elif self._stopping.is_set():
+                self._spill_overflowed()
+                break
+
+    def _collect(self) -> List[Event]:
+        batch: List[Event] = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        return batch
+
+    def _write(self, rows: List[Row]):
+        try:
+            with self.session_factory() as session:
+                connection = session.connection()
+                sql, params = _compiled_insert(connection.dialect)
+                connection.exec_driver_sql(sql, [params(row) for row in rows])
+                session.commit()
+        except Exception:
+            self._count("write_errors")
+            self._spill(rows)
+            return
+        with self._counts_lock:
+            self.written += len(rows)
+            self.batches += 1
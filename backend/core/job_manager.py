@@ -1,160 +1,703 @@
+import os
+import socket
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import uuid
+from collections import Counter
+from concurrent.futures import CancelledError
 import time
-from typing import List, Dict
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
 from app.events import get_event_bus, Event, run_consumer_loop
-from data.db import SessionLocal
-from data.models import Ad, KeywordRun
+from data import job_store
+from data.db import SessionLocal, unit_of_work
+from data.models import KeywordRun
+from data.persistence import ad_rows, upsert_ads
+from backend.core.adapters.adaptive import AdaptiveAdapter
+from backend.core.adapters.cache import CachingAdapter
 from backend.core.adapters.mock_adapter import MockAdapter
+from backend.core.cancellation import (
+    CancelToken,
+    JobCancelled,
+    join_abandoned_calls,
+)
+from backend.core.event_sink import EventSink
+from backend.core.scheduler import NORMAL, Scheduler
+from backend.core.worker_pool import WorkerPool, WorkerPoolBroken
+
+
+class _KeywordJob:
+    """Book-keeping for one start_keywords_job call (or a resumed job).
+
+    Work is done per distinct keyword (one job_tasks row each); a keyword that
+    appears several times in ``keywords`` runs once and its result is replayed
+    for the other occurrences. Keywords are handed to the pool one by one,
+    never more than ``limit`` at a time, so a large job cannot monopolise the
+    workers shared with other jobs.
+    """
+
+    def __init__(
+        self,
+        keywords: List[str],
+        country: str,
+        limit: int,
+        job_id: Optional[int] = None,
+        tasks: Optional[Dict[str, int]] = None,
+        priority: str = NORMAL,
+        weight: float = 1.0,
+    ):
+        self.keywords = keywords
+        self.country = country
+        self.limit = max(1, limit)
+        self.job_id = job_id
+        self.priority = priority
+        self.weight = weight
+        # keyword -> job_tasks id, for the keywords this manager still has to run
+        self.tasks = tasks or {}
+        self.work = list(self.tasks)
+        self.occurrences = Counter(keywords)
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self.in_flight = 0
+        self.remaining = len(self.work)
+        self.finished = False
+        self.token = CancelToken()
+        # threading.Timer cancelling the job after its timeout_s, if any
+        self.timer: Optional[threading.Timer] = None
+
+    def claim_finish(self) -> bool:
+        # must hold self.lock; True exactly once, when the last keyword is done
+        if self.finished or self.remaining or self.in_flight:
+            return False
+        self.finished = True
+        return True
 
 
 class JobManager:
-    """JobManager orquestra adapters and persistence, publishing progress events."""
+    """JobManager orquestra adapters and persistence, publishing progress events.
 
-    def __init__(self, bus=None, max_workers: int = 4):
+    ``max_workers`` is the global concurrency limit (the pool size shared by all
+    jobs); ``max_per_job`` caps how many keywords of a single job run at once.
+    Adapters must therefore be safe to call from several threads. Keywords are
+    started by a Scheduler (backend.core.scheduler): jobs carry a priority
+    class and a weight for fair sharing between jobs, and ``rate_limits``
+    throttles searches per ``country:<code>`` / ``adapter:<name>`` key. Passing
+    ``cache_ttl_s`` wraps the adapter in a CachingAdapter; ``persist_events``
+    records bus events in the ``events`` table through an EventSink.
+    ``adaptive=True`` puts an AdaptiveAdapter (AIMD concurrency limit plus
+    retries with jittered backoff, configured by ``adaptive_options``) between
+    the cache and the adapter, so cache hits never count against the limit.
+    The adaptive limit can only hold searches back below ``max_workers``, the
+    scheduler's own cap, so its ``max_limit`` is capped at ``max_workers``.
+
+    ``worker_mode="process"`` runs keywords in ``max_workers`` supervised
+    worker processes (see backend.core.worker_pool) instead of threads, so
+    CPU-bound post-processing scales with cores. Each process builds its own
+    adapter with ``adapter_factory`` (a picklable callable, MockAdapter by
+    default); ``adapter`` and the cache options only apply to thread mode.
+
+    Jobs are durable (see data.job_store): every distinct keyword is a
+    job_tasks row claimed under a lease of ``lease_s`` seconds, and the job
+    itself is leased to the manager that runs it; a background thread renews
+    both while the manager runs. ``start()`` resumes jobs left unfinished by
+    a previous process, and the same thread later adopts jobs whose owner
+    stopped renewing its job lease - never a job another live manager runs.
+
+    Every job has its own CancelToken: ``cancel_job`` (or an
+    ``intent.stop_run`` naming the ``job_id``; without one every running job
+    is cancelled) stops dispatching its keywords and stops waiting for the
+    ones in flight, then publishes ``job.cancelled`` with the results of the
+    keywords already done instead of ``job.finished``. The manager itself
+    keeps running. ``keyword_timeout_s`` bounds each adapter call (a timeout
+    is reported as ``job.error``; in process mode the worker is killed and
+    restarted) and ``start_keywords_job(timeout_s=...)`` cancels a whole job
+    that runs too long. A thread-mode call given up on keeps its scheduler
+    slot until it actually returns, so at most ``max_workers`` adapter calls
+    ever run at once.
+    """
+
+    def __init__(
+        self,
+        bus=None,
+        max_workers: int = 4,
+        max_per_job: Optional[int] = None,
+        adapter=None,
+        cache_ttl_s: Optional[float] = None,
+        cache_max_entries: int = 1024,
+        cache_max_bytes: Optional[int] = None,
+        persist_events: bool = False,
+        worker_mode: str = "thread",
+        adapter_factory=None,
+        lease_s: float = job_store.DEFAULT_LEASE_S,
+        rate_limits: Optional[Dict] = None,
+        adaptive: bool = False,
+        adaptive_options: Optional[Dict] = None,
+        keyword_timeout_s: Optional[float] = None,
+    ):
+        if worker_mode not in ("thread", "process"):
+            raise ValueError(f"unknown worker_mode {worker_mode!r}")
         self.bus = bus or get_event_bus()
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.adapter = MockAdapter()
-        self._lock = threading.Lock()
+        self.scheduler = Scheduler(max_workers=max_workers, rate_limits=rate_limits)
+        self.worker_pool = (
+            WorkerPool(self.bus, adapter_factory or MockAdapter, processes=max_workers)
+            if worker_mode == "process"
+            else None
+        )
+        self.max_per_job = max_per_job or max_workers
+        self.adapter = adapter or MockAdapter()
+        if adaptive:
+            # the scheduler never runs more than max_workers searches at once:
+            # a larger limit would only grow without ever being tested
+            options = dict(adaptive_options or {})
+            options["max_limit"] = min(options.get("max_limit", 64), max_workers)
+            options.setdefault("initial_limit", min(4, options["max_limit"]))
+            self.adapter = AdaptiveAdapter(self.adapter, bus=self.bus, **options)
+        if cache_ttl_s is not None:
+            # repeated keyword/country searches are served from memory
+            self.adapter = CachingAdapter(
+                self.adapter,
+                bus=self.bus,
+                ttl_s=cache_ttl_s,
+                max_entries=cache_max_entries,
+                max_bytes=cache_max_bytes,
+            )
+        # optional durable log of everything published on the bus
+        self.event_sink = EventSink(bus=self.bus) if persist_events else None
         self._stop = threading.Event()
+        self.keyword_timeout_s = keyword_timeout_s
+        self.lease_s = lease_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # job id -> _KeywordJob for the jobs this manager is running
+        self._jobs: Dict[int, _KeywordJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._lease_thread = threading.Thread(
+            target=self._lease_loop, name="job-leases", daemon=True
+        )
         # consumer listens to intents
         self.consumer_thread = threading.Thread(
             target=run_consumer_loop,
             args=(self._handle_intent, self._stop),
+            kwargs={"bus": self.bus, "topics": ["intent.*"], "name": "job-manager"},
             daemon=True,
         )
 
     def start(self):
+        if self.event_sink is not None:
+            self.event_sink.start()
+        if self.worker_pool is not None:
+            self.worker_pool.start()
         # start adapter if needed
         try:
             self.adapter.start()
         except Exception:
             pass
         self.consumer_thread.start()
+        self.resume_jobs()
+        self._lease_thread.start()
 
     def shutdown(self, wait: bool = True):
         self._stop.set()
-        self.executor.shutdown(wait=wait)
+        with self._jobs_lock:
+            timers = [job.timer for job in self._jobs.values() if job.timer]
+        for timer in timers:
+            timer.cancel()
+        self.scheduler.shutdown(wait=wait)
+        if self.worker_pool is not None:
+            self.worker_pool.shutdown(wait_for_workers=wait)
+        try:
+            # unfinished jobs can be adopted right away instead of after lease_s
+            with SessionLocal() as session:
+                job_store.release_jobs(session, self.owner)
+                session.commit()
+        except Exception:
+            pass
+        if self.event_sink is not None:
+            self.event_sink.stop()
 
     def _handle_intent(self, ev: Event):
         if ev.type == "intent.start_run":
             payload = ev.payload or {}
             keywords = payload.get("keywords", [])
             country = payload.get("country", "US")
-            self.start_keywords_job(keywords, country=country)
+            self.start_keywords_job(
+                keywords,
+                country=country,
+                priority=payload.get("priority", NORMAL),
+                weight=payload.get("weight", 1.0),
+                timeout_s=payload.get("timeout_s"),
+            )
 
         elif ev.type == "intent.stop_run":
-            self.bus.publish(Event(type="job.stop_requested", payload={}))
-            self._stop.set()
+            payload = ev.payload or {}
+            job_id = payload.get("job_id")
+            job_ids = [job_id] if job_id is not None else self.running_jobs()
+            self.bus.publish(
+                Event(type="job.stop_requested", payload={"job_ids": job_ids})
+            )
+            for jid in job_ids:
+                self.cancel_job(jid, reason=payload.get("reason", "stop requested"))
+
+    def running_jobs(self) -> List[int]:
+        with self._jobs_lock:
+            return list(self._jobs)
+
+    def cancel_job(self, job_id: int, reason: str = "cancelled") -> bool:
+        """Cancel a job running in this manager; False if it is not (or done)."""
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        with job.lock:
+            if job.finished:
+                return False
+            job.token.cancel(reason)
+            # in-flight keywords notice the token; nothing waits for them
+            job.finished = True
+        self._finish_job(job)
+        return True
 
-    def start_keywords_job(self, keywords: List[str], country: str = "US"):
-        """Public API: start a keywords job asynchronously."""
+    def start_keywords_job(
+        self,
+        keywords: List[str],
+        country: str = "US",
+        priority: str = NORMAL,
+        weight: float = 1.0,
+        timeout_s: Optional[float] = None,
+    ) -> int:
+        """Public API: start a keywords job asynchronously; returns the job id.
+
+        ``priority`` is a scheduler class (``interactive``, ``normal``,
+        ``batch``); ``weight`` is the job's share among jobs of its class.
+        ``timeout_s`` cancels the job if it has not finished by then.
+        """
+        keywords = list(keywords)
+        with SessionLocal() as session:
+            job_id, tasks = job_store.create_job(
+                session,
+                keywords,
+                country,
+                priority=priority,
+                weight=weight,
+                owner=self.owner,
+                lease_s=self.lease_s,
+            )
+            session.commit()
         self.bus.publish(
             Event(
-                type="job.started", payload={"keywords": keywords, "country": country}
+                type="job.started",
+                payload={
+                    "keywords": keywords,
+                    "country": country,
+                    "job_id": job_id,
+                    "priority": priority,
+                },
             )
         )
+        job = _KeywordJob(
+            keywords, country, self.max_per_job, job_id, tasks, priority, weight
+        )
+        if timeout_s is not None:
+            job.timer = threading.Timer(
+                timeout_s, self.cancel_job, args=(job_id,), kwargs={"reason": "timeout"}
+            )
+            job.timer.daemon = True
+        self._start_job(job)
+        return job_id
+
+    def resume_jobs(self) -> List[int]:
+        """Adopt unfinished jobs whose owner stopped renewing its job lease."""
+        with SessionLocal() as session:
+            job_store.finish_completed_jobs(session)
+            adopted = []
+            for entry in job_store.resumable_jobs(session):
+                with self._jobs_lock:
+                    running_here = entry["id"] in self._jobs
+                # the conditional UPDATE decides between managers racing for it
+                won = job_store.adopt_job(
+                    session, entry["id"], self.owner, self.lease_s
+                )
+                if won and not running_here:
+                    adopted.append(entry)
+            session.commit()
+        resumed = []
+        for entry in adopted:
+            job = _KeywordJob(
+                entry["keywords"],
+                entry["country"],
+                self.max_per_job,
+                entry["id"],
+                entry["tasks"],
+                entry["priority"],
+                entry["weight"],
+            )
+            self.bus.publish(
+                Event(
+                    type="job.resumed",
+                    payload={
+                        "job_id": job.job_id,
+                        "keywords": job.keywords,
+                        "pending": job.work,
+                    },
+                )
+            )
+            self._start_job(job)
+            resumed.append(job.job_id)
+        return resumed
+
+    def _start_job(self, job: _KeywordJob):
+        with self._jobs_lock:
+            self._jobs[job.job_id] = job
+        if job.timer is not None:
+            job.timer.start()
         # dispatch to executor so caller isn't blocked
-        self.executor.submit(self._run_keywords_job, keywords, country)
+        self._dispatch(job)
 
-    def _run_keywords_job(self, keywords: List[str], country: str):
-        with self._lock:
-            for kw in keywords:
+    def _lease_loop(self):
+        # renew our task and job leases well before they expire; adopt the
+        # jobs of dead owners
+        while not self._stop.wait(self.lease_s / 3):
+            try:
+                with SessionLocal() as session:
+                    job_store.renew_leases(session, self.owner, self.lease_s)
+                    job_store.renew_job_leases(session, self.owner, self.lease_s)
+                    session.commit()
+                self.resume_jobs()
+            except Exception:
+                pass
+
+    def _dispatch(self, job: _KeywordJob):
+        """Submit the job's next keywords while it is under its concurrency limit."""
+        to_submit = []
+        with job.lock:
+            while job.in_flight < job.limit and job.next_index < len(job.work):
+                if job.token.cancelled:
+                    # cancel_job already finished the job
+                    job.next_index = len(job.work)
+                    break
                 if self._stop.is_set():
+                    # skipped keywords count as done so job.finished still fires;
+                    # their tasks stay pending for the next start()
+                    job.remaining -= len(job.work) - job.next_index
+                    job.next_index = len(job.work)
                     break
-                try:
-                    # start run record
-                    run_record = None
-                    start_ts = time.time()
-                    with SessionLocal() as session:
-                        run_record = KeywordRun(
-                            keyword=kw,
-                            started_at=None,
-                            duration_s=0.0,
-                            results_count=0,
-                            status="running",
-                        )
-                        session.add(run_record)
-                        session.commit()
-                        session.refresh(run_record)
+                to_submit.append(job.work[job.next_index])
+                job.next_index += 1
+                job.in_flight += 1
+            finished = job.claim_finish()
+        claimed = self._claim(job, to_submit) if to_submit else []
+        for kw in to_submit:
+            if kw not in claimed:
+                # another live manager holds it and will report the keyword
+                self._keyword_finished(job)
+                continue
+            try:
+                self.scheduler.submit(
+                    self._run_job_keyword,
+                    job,
+                    kw,
+                    flow=job.job_id,
+                    priority=job.priority,
+                    weight=job.weight,
+                    keys=self._rate_keys(job),
+                )
+            except RuntimeError:
+                # scheduler already shut down
+                self._release(job, kw)
+                self._keyword_finished(job)
+        if finished:
+            self._finish_job(job)
 
-                    self.bus.publish(
-                        Event(
-                            type="job.progress",
-                            payload={"keyword": kw, "status": "searching"},
-                        )
+    def _rate_keys(self, job: _KeywordJob):
+        adapter = getattr(self.adapter, "name", type(self.adapter).__name__)
+        return (f"country:{job.country}", f"adapter:{adapter}")
+
+    def _claim(self, job: _KeywordJob, keywords: List[str]) -> List[str]:
+        """Claim the tasks of ``keywords`` in one transaction; returns the won ones."""
+        try:
+            with SessionLocal() as session:
+                won = [
+                    kw
+                    for kw in keywords
+                    if job_store.claim_task(
+                        session, job.tasks[kw], self.owner, self.lease_s
                     )
-                    ads = self.adapter.search(kw, country=country)
-
-                    persisted: List[Dict] = []
-                    # persist in DB with safe upsert (query by unique_id then update/insert)
-                    with SessionLocal() as session:
-                        for ad in ads:
-                            unique_id = (
-                                ad.get("unique_id")
-                                or ad.get("id")
-                                or f"{kw}:{time.time()}"
-                            )
-                            existing = (
-                                session.query(Ad)
-                                .filter_by(unique_id=unique_id)
-                                .one_or_none()
-                            )
-                            if existing is not None:
-                                # update fields
-                                existing.keyword = kw
-                                existing.country = ad.get("country", country)
-                                existing.domain = ad.get("domain")
-                                existing.title = ad.get("title")
-                                existing.body = ad.get("body")
-                                existing.media_url = ad.get("media_url")
-                                session.add(existing)
-                            else:
-                                ad_obj = Ad(
-                                    unique_id=unique_id,
-                                    keyword=kw,
-                                    country=ad.get("country", country),
-                                    domain=ad.get("domain"),
-                                    title=ad.get("title"),
-                                    body=ad.get("body"),
-                                    media_url=ad.get("media_url"),
-                                )
-                                session.add(ad_obj)
-                            persisted.append({"unique_id": unique_id})
-                        session.commit()
-
-                    duration = time.time() - start_ts
-                    # update run_record with duration and results
-                    with SessionLocal() as session:
-                        rr = session.get(KeywordRun, run_record.id)
-                        rr.duration_s = duration
-                        rr.results_count = len(persisted)
-                        rr.status = "finished"
-                        session.add(rr)
-                        session.commit()
+                ]
+                session.commit()
+            return won
+        except Exception:
+            return []
+
+    def _release(self, job: _KeywordJob, kw: str):
+        with SessionLocal() as session:
+            job_store.release_task(session, job.tasks[kw], self.owner)
+            session.commit()
+
+    def _run_job_keyword(self, job: _KeywordJob, kw: str):
+        try:
+            self._run_job_keyword_once(job, kw)
+        finally:
+            # an adapter call given up on (timeout / cancel) is still running:
+            # keep this scheduler slot until it returns so max_workers holds
+            join_abandoned_calls(self._stop)
+
+    def _run_job_keyword_once(self, job: _KeywordJob, kw: str):
+        if job.token.cancelled:
+            # queued before the cancel; cancel_job settled its task
+            self._keyword_finished(job)
+            return
+        if self.worker_pool is None:
+            result = run_keyword(
+                self.bus,
+                self.adapter,
+                kw,
+                job.country,
+                task_id=job.tasks[kw],
+                owner=self.owner,
+                cancel=job.token,
+                timeout_s=self.keyword_timeout_s,
+            )
+        else:
+            # the scheduler slot stays taken while a worker process runs it
+            try:
+                future = self.worker_pool.submit(
+                    kw,
+                    job.country,
+                    task_id=job.tasks[kw],
+                    owner=self.owner,
+                    timeout_s=self.keyword_timeout_s,
+                )
+            except RuntimeError:
+                future = None
+            try:
+                if future is None:
+                    raise CancelledError()
+                # a keyword already in a worker finishes there; we stop waiting
+                result = job.token.call(future.result)
+            except JobCancelled:
+                self.worker_pool.cancel(future)
+                self._keyword_finished(job)
+                return
+            except WorkerPoolBroken as exc:
+                self.bus.publish(
+                    Event(type="job.error", payload={"keyword": kw, "error": str(exc)})
+                )
+                result = None
+            except (CancelledError, RuntimeError):
+                # shut down before it ran: hand the task back for the next start()
+                self._release(job, kw)
+                self._keyword_finished(job)
+                return
+        if job.token.cancelled:
+            self._keyword_finished(job)
+            return
+        self._task_finished(job, kw, result)
 
+    def _task_finished(self, job: _KeywordJob, kw: str, result: Optional[List[Dict]]):
+        """Replay the outcome for duplicate occurrences of ``kw``.
+
+        run_keyword completes the task in the transaction that stores its
+        results; a run that failed before that (or whose worker died) is
+        marked failed here.
+        """
+        try:
+            if result is None:
+                with SessionLocal() as session:
+                    job_store.complete_task(session, job.tasks[kw], self.owner, None)
+                    session.commit()
+            else:
+                for _ in range(job.occurrences[kw] - 1):
                     self.bus.publish(
                         Event(
                             type="job.keyword_done",
                             payload={
                                 "keyword": kw,
-                                "count": len(persisted),
-                                "ads": persisted,
+                                "count": len(result),
+                                "ads": result,
+                                "duplicate": True,
                             },
                         )
                     )
-                except Exception as e:
-                    self.bus.publish(
-                        Event(
-                            type="job.error", payload={"keyword": kw, "error": str(e)}
-                        )
-                    )
+        finally:
+            self._keyword_finished(job)
+
+    def _keyword_finished(self, job: _KeywordJob):
+        with job.lock:
+            job.in_flight -= 1
+            job.remaining -= 1
+            finished = job.claim_finish()
+        if finished:
+            self._finish_job(job)
+        else:
+            self._dispatch(job)
+
+    def _finish_job(self, job: _KeywordJob):
+        with self._jobs_lock:
+            self._jobs.pop(job.job_id, None)
+        if job.timer is not None:
+            job.timer.cancel()
+        if job.token.cancelled:
+            self._publish_cancelled(job)
+            return
+        with SessionLocal() as session:
+            # stays "running" if tasks were skipped, so they resume later
+            complete = job_store.finish_job(session, job.job_id)
+            session.commit()
+        self.bus.publish(
+            Event(
+                type="job.finished",
+                payload={
+                    "keywords": job.keywords,
+                    "job_id": job.job_id,
+                    "complete": complete,
+                },
+            )
+        )
+
+    def _publish_cancelled(self, job: _KeywordJob):
+        with SessionLocal() as session:
+            job_store.cancel_job(session, job.job_id)
+            # partial results: every keyword done so far, in any process
+            results = job_store.job_results(session, job.job_id)
+            session.commit()
+        self.bus.publish(
+            Event(
+                type="job.cancelled",
+                payload={
+                    "keywords": job.keywords,
+                    "job_id": job.job_id,
+                    "reason": job.token.reason,
+                    "results": results,
+                    "cancelled": [
+                        kw for kw in dict.fromkeys(job.keywords) if kw not in results
+                    ],
+                },
+            )
+        )
 
-            self.bus.publish(Event(type="job.finished", payload={"keywords": keywords}))
+
+def run_keyword(
+    bus,
+    adapter,
+    kw: str,
+    country: str,
+    task_id: Optional[int] = None,
+    owner: Optional[str] = None,
+    cancel: Optional[CancelToken] = None,
+    timeout_s: Optional[float] = None,
+) -> Optional[List[Dict]]:
+    """Search and persist a single keyword; all its events come from this call.
+
+    ``bus`` only needs ``publish``: process workers pass a pipe-backed stand-in.
+    Returns the ``ads`` payload of job.keyword_done, or None if the run failed.
+    Nothing is written while the adapter works (the claimed job task already
+    marks the keyword as in progress): afterwards record_keyword_run stores the
+    run, the ads and, for ``owner``, the task outcome in one transaction.
+    With ``cancel`` the run stops as soon as the token is cancelled and
+    nothing but a ``cancelled`` run row is written; ``timeout_s`` bounds the
+    adapter call.
+    """
+    start_ts = time.time()
+    try:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        bus.publish(
+            Event(
+                type="job.progress",
+                payload={"keyword": kw, "status": "searching"},
+            )
+        )
+        if cancel is None and timeout_s is None:
+            ads = adapter.search(kw, country=country)
+        else:
+            ads = (cancel or CancelToken()).call(
+                adapter.search, kw, country, timeout_s=timeout_s
+            )
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+        persisted = record_keyword_run(
+            kw, country, ads, start_ts, task_id=task_id, owner=owner
+        )
+
+        bus.publish(
+            Event(
+                type="job.keyword_done",
+                payload={
+                    "keyword": kw,
+                    "count": len(persisted),
+                    "ads": persisted,
+                },
+            )
+        )
+        return persisted
+    except JobCancelled:
+        record_unsuccessful_run(kw, country, start_ts, "cancelled", task_id, None)
+        return None
+    except Exception as e:
+        bus.publish(Event(type="job.error", payload={"keyword": kw, "error": str(e)}))
+        record_unsuccessful_run(kw, country, start_ts, "failed", task_id, owner)
+        return None
+
+
+def record_keyword_run(
+    kw: str,
+    country: str,
+    ads: List[Dict],
+    started: float,
+    status: str = "finished",
+    task_id: Optional[int] = None,
+    owner: Optional[str] = None,
+) -> List[Dict]:
+    """Store a keyword's outcome as one unit of work; returns ``[{"unique_id": ...}]``.
+
+    Inserts the KeywordRun (``started`` is a time.time() value), upserts the
+    ads and, with ``task_id``, links the run to its job task; with ``owner``
+    also completes the task (done if ``status`` is finished, else failed).
+    """
+    rows = ad_rows(ads, kw, country)
+    persisted = [{"unique_id": row["unique_id"]} for row in rows]
+    with unit_of_work() as session:
+        run_record = KeywordRun(
+            keyword=kw,
+            # naive UTC, like the server-side CURRENT_TIMESTAMP defaults
+            started_at=datetime.fromtimestamp(started, timezone.utc).replace(
+                tzinfo=None
+            ),
+            duration_s=time.time() - started,
+            results_count=len(rows),
+            status=status,
+        )
+        session.add(run_record)
+        session.flush()
+        # persist in DB with one batched upsert per keyword
+        upsert_ads(session, rows)
+        if task_id is not None:
+            job_store.set_task_run(session, task_id, run_record.id)
+            if owner is not None:
+                job_store.complete_task(
+                    session,
+                    task_id,
+                    owner,
+                    persisted if status == "finished" else None,
+                )
+    return persisted
+
+
+def record_unsuccessful_run(
+    kw: str,
+    country: str,
+    started: float,
+    status: str,
+    task_id: Optional[int],
+    owner: Optional[str],
+):
+    try:
+        record_keyword_run(kw, country, [], started, status, task_id, owner)
+    except Exception:
+        # the caller reports the failure; a task left claimed is retried
+        pass
 
 
 def run_manager_forever():
-    mgr = JobManager()
+    mgr = JobManager(persist_events=True)
     mgr.start()
     return mgr
 
@@ -0,0 +1,270 @@
+"""Priority + weighted-fair scheduler shared by all JobManager jobs.
+
+Replaces the FIFO thread pool: ``max_workers`` threads take tasks from the
+scheduler instead of a single queue.
+
+- Priority classes are strict: an ``interactive`` task always starts before a
+  ``normal`` one, which starts before ``batch``.
+- Within a class, flows (one per job) share the workers in proportion to their
+  ``weight`` using start-time fair queuing: each task gets a virtual start tag
+  ``max(V, flow's last finish tag)`` and finishes ``1 / weight`` later; the
+  smallest start tag runs next. A big job therefore cannot starve a small one
+  that arrives later, whatever their queue lengths.
+- Token buckets (``rate_limits``, e.g. ``{"country:US": 5, "adapter:mock":
+  (20, 40)}`` as rate/s or (rate/s, burst)) gate tasks carrying those keys; a
+  throttled task is skipped in favour of the next eligible one. Each class
+  keeps one heap per set of bucket keys, so a pick only looks at the head of
+  each heap: throttled tasks, however many, cost nothing to skip.
+
+``stats()`` reports queue depth per class/flow, running tasks, how many tasks
+had to wait for a token and per-class wait time (enqueue to start)
+percentiles.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+from data.sketch import QuantileSketch
+
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, NORMAL, BATCH)
+
+
+class TokenBucket:
+    def __init__(
+        self, rate: float, burst: Optional[float] = None, clock=time.monotonic
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        if self.burst < 1:
+            raise ValueError("burst must be at least 1 token")
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> bool:
+        self._refill()
+        return self.tokens >= 1.0
+
+    def take(self):
+        self.tokens -= 1.0
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available."""
+        self._refill()
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+class _Task:
+    __slots__ = (
+        "fn",
+        "args",
+        "future",
+        "flow",
+        "priority",
+        "keys",
+        "start",
+        "enqueued",
+        "throttled",
+    )
+
+    def __init__(self, fn, args, future, flow, priority, keys, start, enqueued):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.flow = flow
+        self.priority = priority
+        self.keys = keys
+        self.start = start
+        self.enqueued = enqueued
+        self.throttled = False
+
+
+RateLimit = Union[float, Tuple[float, float]]
+
+
+class Scheduler:
+    def __init__(
+        self,
+        max_workers: int = 4,
+        rate_limits: Optional[Dict[str, RateLimit]] = None,
+        clock=time.monotonic,
+    ):
+        self.max_workers = max_workers
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        for key, limit in (rate_limits or {}).items():
+            rate, burst = limit if isinstance(limit, tuple) else (limit, None)
+            self._buckets[key] = TokenBucket(rate, burst, clock=clock)
+        self._cond = threading.Condition()
+        # per priority class and set of bucket keys: heap of (start tag, seq, task)
+        self._queues: Dict[str, Dict[Tuple[str, ...], list]] = {
+            p: {} for p in PRIORITIES
+        }
+        self._queued: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._virtual_time: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        # (priority, flow) -> last finish tag
+        self._finish_tags: Dict[Tuple[str, object], float] = {}
+        self._queued_per_flow: Dict[object, int] = {}
+        self._seq = itertools.count()
+        self._shutdown = False
+        self.running = 0
+        self.completed = 0
+        # tasks that had to wait for a rate-limit token
+        self.throttled = 0
+        self._waits = {p: QuantileSketch() for p in PRIORITIES}
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"scheduler-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        flow=None,
+        priority: str = NORMAL,
+        weight: float = 1.0,
+        keys: Iterable[str] = (),
+    ) -> Future:
+        """Queue ``fn(*args)`` for ``flow`` (e.g. a job id); returns its Future.
+
+        ``keys`` name the token buckets the task needs (unknown keys are free).
+        Raises RuntimeError after shutdown, like ThreadPoolExecutor.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}")
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new tasks after shutdown")
+            flow_key = (priority, flow)
+            start = max(
+                self._virtual_time[priority], self._finish_tags.get(flow_key, 0.0)
+            )
+            self._finish_tags[flow_key] = start + 1.0 / weight
+            task = _Task(
+                fn,
+                args,
+                future,
+                flow,
+                priority,
+                tuple(k for k in keys if k in self._buckets),
+                start,
+                self.clock(),
+            )
+            heap = self._queues[priority].setdefault(task.keys, [])
+            heapq.heappush(heap, (start, next(self._seq), task))
+            self._queued[priority] += 1
+            self._queued_per_flow[flow] = self._queued_per_flow.get(flow, 0) + 1
+            self._cond.notify()
+        return future
+
+    def _pick(self) -> Tuple[Optional[_Task], Optional[float]]:
+        # must hold self._cond; returns (task, None) or (None, seconds to wait)
+        retry_in = None
+        for priority in PRIORITIES:
+            best = None
+            for keys, heap in self._queues[priority].items():
+                head = heap[0]
+                if best is not None and head[:2] >= best[1][:2]:
+                    continue
+                buckets = [self._buckets[k] for k in keys]
+                if all(b.available() for b in buckets):
+                    best = (keys, head)
+                    continue
+                head[2].throttled = True
+                wait = max(b.wait_time() for b in buckets)
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+            if best is not None:
+                keys, _ = best
+                heap = self._queues[priority][keys]
+                task = heapq.heappop(heap)[2]
+                if not heap:
+                    del self._queues[priority][keys]
+                self._queued[priority] -= 1
+                for k in keys:
+                    self._buckets[k].take()
+                if task.throttled:
+                    self.throttled += 1
+                self._virtual_time[priority] = task.start
+                return task, None
+        return None, retry_in
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    task, retry_in = self._pick()
+                    if task is not None:
+                        break
+                    if self._shutdown and not any(self._queued.values()):
+                        return
+                    self._cond.wait(timeout=retry_in)
+                self._queued_per_flow[task.flow] -= 1
+                if not self._queued_per_flow[task.flow]:
+                    del self._queued_per_flow[task.flow]
+                    # an idle flow starts afresh at the current virtual time
+                    self._finish_tags.pop((task.priority, task.flow), None)
+                self.running += 1
+                self._waits[task.priority].add(self.clock() - task.enqueued)
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args))
+                except BaseException as exc:
+                    task.future.set_exception(exc)
+            with self._cond:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "running": self.running,
+                "completed": self.completed,
+                "throttled": self.throttled,
+                "queued": dict(self._queued),
+                "queued_per_flow": dict(self._queued_per_flow),
+                "wait_s": {
+                    p: {
+                        "count": sketch.count,
+                        "p50": sketch.quantile(0.5),
+                        "p95": sketch.quantile(0.95),
+                    }
+                    for p, sketch in self._waits.items()
+                },
+            }
+
+    def shutdown(self, wait: bool = True, cancel_queued: bool = False):
+        """Stop accepting tasks; queued ones still run unless ``cancel_queued``."""
+        with self._cond:
+            self._shutdown = True
+            if cancel_queued:
+                for priority, heaps in self._queues.items():
+                    for heap in heaps.values():
+                        for _, _, task in heap:
+                            task.future.cancel()
+                    heaps.clear()
+                    self._queued[priority] = 0
+                self._queued_per_flow.clear()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
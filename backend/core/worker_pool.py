@@ -0,0 +1,360 @@
+"""Supervised worker processes for JobManager(worker_mode="process").
+
+Each worker process builds its own adapter (from a picklable factory) and, by
+being a fresh interpreter, its own DB engine; it runs keywords one at a time
+with job_manager.run_keyword, so searching, parsing/dedup of the ads and the
+upsert all happen outside the parent's GIL. Events published in the worker are
+encoded with app.codec and sent back over the worker's pipe, followed by a
+"done" message; a supervisor thread in the parent republishes them on the bus
+and resolves the task's future. A worker that dies is restarted and its
+in-flight keyword reported as ``job.error`` (its future resolves to None).
+A keyword submitted with ``timeout_s`` that is still running after that long
+gets its worker killed (and restarted) the same way.
+
+Replacements are spawned by the supervisor, outside the pool lock, after an
+exponential backoff. More than ``max_restarts`` restarts within
+``restart_window_s`` (e.g. an adapter that crashes on startup) trips a
+circuit breaker: queued and later keywords fail with ``WorkerPoolBroken``
+instead of feeding a crash loop.
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from app.codec import decode_event, encode_event
+from app.events import Event
+
+_EVENT = b"E"
+_DONE = b"D"
+
+
+class _PipeBus:
+    """The ``publish`` half of EventBus, forwarding to the parent."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def publish(self, event: Event):
+        self.conn.send_bytes(_EVENT + encode_event(event))
+
+
+def _worker_main(conn, adapter_factory: Callable):
+    from backend.core.job_manager import run_keyword
+
+    adapter = adapter_factory()
+    try:
+        adapter.start()
+    except Exception:
+        pass
+    bus = _PipeBus(conn)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        pool_id, kw, country, task_id, owner = task
+        result = run_keyword(bus, adapter, kw, country, task_id=task_id, owner=owner)
+        done = Event(type="done", payload={"id": pool_id, "result": result})
+        conn.send_bytes(_DONE + encode_event(done))
+    try:
+        adapter.stop()
+    except Exception:
+        pass
+
+
+class WorkerPoolBroken(RuntimeError):
+    """The pool's workers kept crashing; it no longer runs keywords."""
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        # (pool task id, keyword) being processed, None when idle
+        self.task: Optional[Tuple[int, str]] = None
+        # monotonic time after which the task is killed, and its timeout
+        self.deadline: Optional[float] = None
+        self.timeout_s: Optional[float] = None
+        self.timed_out = False
+
+
+class WorkerPool:
+    """``processes`` supervised workers fed from one FIFO of keywords."""
+
+    def __init__(
+        self,
+        bus,
+        adapter_factory: Callable,
+        processes: int = 4,
+        mp_context: Optional[str] = "spawn",
+        max_restarts: int = 5,
+        restart_window_s: float = 30.0,
+        backoff_base_s: float = 0.1,
+        backoff_max_s: float = 5.0,
+    ):
+        self.bus = bus
+        self.adapter_factory = adapter_factory
+        self.processes = processes
+        self._ctx = multiprocessing.get_context(mp_context)
+        self._lock = threading.Lock()
+        self._workers: list = []
+        # (pool task id, keyword, country, job_tasks id, lease owner)
+        self._pending: Deque[Tuple[int, str, str, Optional[int], Optional[str]]] = (
+            deque()
+        )
+        self._futures: Dict[int, Future] = {}
+        # pool task id -> timeout_s, for tasks submitted with one
+        self._timeouts: Dict[int, float] = {}
+        self._next_id = 0
+        self._closed = False
+        self._wake_r, self._wake_w = self._ctx.Pipe(duplex=False)
+        self._supervisor: Optional[threading.Thread] = None
+        self.max_restarts = max_restarts
+        self.restart_window_s = restart_window_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        # monotonic times of recent worker deaths, and of scheduled respawns
+        self._deaths: Deque[float] = deque()
+        self._respawn_at: List[float] = []
+        self.broken = False
+        self.restarts = 0
+
+    def start(self):
+        workers = [self._spawn() for _ in range(self.processes)]
+        with self._lock:
+            self._workers = workers
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="worker-pool", daemon=True
+        )
+        self._supervisor.start()
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.adapter_factory),
+            name="keyword-worker",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def submit(
+        self,
+        kw: str,
+        country: str,
+        task_id: Optional[int] = None,
+        owner: Optional[str] = None,
+        timeout_s: Optional[float] = None,
+    ) -> Future:
+        """Queue one keyword; the future resolves to run_keyword's return value.
+
+        ``task_id`` is the job_tasks row the run is linked to, if any; the
+        worker completes it on behalf of lease ``owner``. A run taking longer
+        than ``timeout_s`` (counted from when a worker gets it) is killed with
+        its worker and reported as ``job.error``; the future resolves to None.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("worker pool is shut down")
+            if self.broken:
+                future.set_exception(WorkerPoolBroken("workers keep crashing"))
+                return future
+            pool_id = self._next_id
+            self._next_id += 1
+            self._futures[pool_id] = future
+            if timeout_s is not None:
+                self._timeouts[pool_id] = timeout_s
+            self._pending.append((pool_id, kw, country, task_id, owner))
+            self._assign()
+        return future
+
+    def cancel(self, future: Future) -> bool:
+        """Drop a queued keyword before a worker gets it; False once it was sent."""
+        with self._lock:
+            for task in self._pending:
+                if self._futures.get(task[0]) is future:
+                    self._pending.remove(task)
+                    del self._futures[task[0]]
+                    self._timeouts.pop(task[0], None)
+                    break
+            else:
+                return False
+        future.cancel()
+        return True
+
+    def _assign(self):
+        # must hold self._lock
+        for worker in self._workers:
+            if not self._pending:
+                return
+            if worker.task is None:
+                task = self._pending.popleft()
+                worker.task = task[:2]
+                worker.timeout_s = self._timeouts.pop(task[0], None)
+                worker.deadline = (
+                    time.monotonic() + worker.timeout_s
+                    if worker.timeout_s is not None
+                    else None
+                )
+                try:
+                    worker.conn.send(task)
+                except OSError:
+                    # dead worker; the supervisor restarts it and fails the task
+                    pass
+
+    def _supervise(self):
+        # runs until shutdown and the last worker has exited
+        while True:
+            with self._lock:
+                if not self._workers and (self._closed or not self._respawn_at):
+                    return
+                by_conn = {w.conn: w for w in self._workers}
+                by_sentinel = {w.process.sentinel: w for w in self._workers}
+                deadlines = [
+                    w.deadline for w in self._workers if w.deadline is not None
+                ] + self._respawn_at
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            ready = wait(list(by_conn) + list(by_sentinel) + [self._wake_r], timeout)
+            self._kill_overdue()
+            self._respawn_due()
+            if self._wake_r in ready:
+                self._wake_r.recv_bytes()
+            for obj in ready:
+                worker = by_conn.get(obj) or by_sentinel.get(obj)
+                if worker is None:
+                    continue
+                # read what the worker sent before noticing that it exited
+                self._read(worker)
+                if obj in by_sentinel and not worker.process.is_alive():
+                    self._restart(worker)
+
+    def _kill_overdue(self):
+        # the sentinel of a killed worker wakes wait(); _restart reports it
+        now = time.monotonic()
+        with self._lock:
+            for worker in self._workers:
+                if worker.deadline is not None and worker.deadline <= now:
+                    worker.deadline = None
+                    worker.timed_out = True
+                    worker.process.kill()
+
+    def _read(self, worker: _Worker):
+        try:
+            # drain everything already buffered before going back to wait()
+            while worker.conn.poll():
+                msg = worker.conn.recv_bytes()
+                if msg[:1] == _EVENT:
+                    self.bus.publish(decode_event(msg[1:]))
+                else:
+                    done = decode_event(msg[1:]).payload
+                    self._task_done(worker, done["id"], done["result"])
+        except (EOFError, OSError):
+            worker.process.join(1)
+            self._restart(worker)
+
+    def _task_done(self, worker: _Worker, pool_id: int, result):
+        with self._lock:
+            worker.task = None
+            worker.deadline = None
+            future = self._futures.pop(pool_id, None)
+            self._assign()
+        if future is not None:
+            future.set_result(result)
+
+    def _restart(self, worker: _Worker):
+        """Report the dead worker's keyword and schedule its replacement."""
+        failed: List[Future] = []
+        with self._lock:
+            if worker not in self._workers:
+                return
+            task, worker.task = worker.task, None
+            worker.conn.close()
+            self._workers.remove(worker)
+            future = self._futures.pop(task[0], None) if task else None
+            if not self._closed and not self.broken:
+                now = time.monotonic()
+                self._deaths.append(now)
+                while self._deaths and self._deaths[0] < now - self.restart_window_s:
+                    self._deaths.popleft()
+                if len(self._deaths) > self.max_restarts:
+                    # crash loop: stop respawning and fail what is queued
+                    self.broken = True
+                    failed = [self._futures.pop(t[0]) for t in self._pending]
+                    self._pending.clear()
+                    self._timeouts.clear()
+                else:
+                    delay = min(
+                        self.backoff_base_s * 2 ** (len(self._deaths) - 1),
+                        self.backoff_max_s,
+                    )
+                    self._respawn_at.append(now + delay)
+            self._assign()
+        for pending in failed:
+            pending.set_exception(WorkerPoolBroken("workers keep crashing"))
+        if task is not None:
+            if worker.timed_out:
+                error = f"no result within {worker.timeout_s}s"
+            else:
+                error = f"worker process exited with code {worker.process.exitcode}"
+            self.bus.publish(
+                Event(type="job.error", payload={"keyword": task[1], "error": error})
+            )
+            if future is not None:
+                future.set_result(None)
+
+    def _respawn_due(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [t for t in self._respawn_at if t <= now]
+            self._respawn_at = [t for t in self._respawn_at if t > now]
+            if self._closed:
+                return
+        # starting a process is slow: never hold the lock (and submit) for it
+        spawned = [self._spawn() for _ in due]
+        with self._lock:
+            if self._closed:
+                for worker in spawned:
+                    worker.conn.send(None)
+                return
+            self._workers.extend(spawned)
+            self.restarts += len(spawned)
+            self._assign()
+
+    def shutdown(self, wait_for_workers: bool = True, timeout: float = 5.0):
+        """Stop the workers; with ``wait_for_workers`` in-flight keywords finish.
+
+        Keywords still queued are cancelled (their futures report cancelled).
+        """
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            pending = [self._futures.pop(t[0]) for t in self._pending]
+            self._pending.clear()
+            self._timeouts.clear()
+            for worker in workers:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        for future in pending:
+            future.cancel()
+        if not wait_for_workers:
+            for worker in workers:
+                worker.process.terminate()
+        if self._supervisor is not None:
+            self._wake_w.send_bytes(b"")
+            self._supervisor.join(timeout)
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.process.join(1)
@@ -0,0 +1,241 @@
+"""Live stream of bus events for remote clients (SSE / WebSocket).
+
+``EventStreamHub`` subscribes once to an ``EventBus`` and fans its events out
+to any number of ``StreamClient``s. Every event gets an id ``<epoch>-<seq>``
+and the last ``replay_size`` events are kept in a ring, so a client that
+reconnects with its last id gets what it missed. Each client has its own
+bounded buffer (oldest events dropped first) and an optional topic filter
+(``job.*``, ``adapter.limit``, ...), so one slow dashboard never holds up the
+bus or the other clients.
+
+When a client can not be resumed exactly - unknown epoch (the service
+restarted), an id that already left the ring, or events dropped from its full
+buffer - it receives a ``stream.reset`` event first and should reload its state
+through the REST endpoints.
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from app.events import DROP_OLDEST, Event, EventBus, Subscription, topic_matches
+
+DEFAULT_REPLAY_SIZE = 1024
+DEFAULT_CLIENT_MAXSIZE = 1000
+DEFAULT_HEARTBEAT_S = 15.0
+RESET = "stream.reset"
+
+# (id, event); the id is None for synthetic events such as stream.reset
+StreamItem = Tuple[Optional[str], Event]
+
+
+def event_record(event_id: Optional[str], event: Event) -> dict:
+    return {
+        "id": event_id,
+        "type": event.type,
+        "payload": event.payload,
+        "timestamp": event.timestamp,
+    }
+
+
+def to_json(event_id: Optional[str], event: Event) -> str:
+    # payloads may carry datetimes, exceptions, ...: sent as their str()
+    return json.dumps(event_record(event_id, event), default=str)
+
+
+def format_sse(event_id: Optional[str], event: Event) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event.type}")
+    lines.append(f"data: {to_json(event_id, event)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamClient:
+    """One remote subscriber; read it with ``async for item in client.stream()``."""
+
+    def __init__(
+        self,
+        hub: "EventStreamHub",
+        topics: Optional[Tuple[str, ...]],
+        maxsize: int,
+    ):
+        self.hub = hub
+        self.topics = topics
+        self.buffer = Subscription(
+            maxsize=maxsize, policy=DROP_OLDEST, name="stream-client"
+        )
+        # replayed events, sent before anything from the buffer
+        self.backlog: List[StreamItem] = []
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._seen_dropped = 0
+
+    def wants(self, event_type: str) -> bool:
+        return self.topics is None or any(
+            topic_matches(p, event_type) for p in self.topics
+        )
+
+    def offer(self, items: List[StreamItem]):
+        """Called from the hub's pump thread."""
+        added = False
+        for item in items:
+            if self.wants(item[1].type):
+                self.buffer.put(item)
+                added = True
+        if added:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                # loop already closed: the client is going away
+                pass
+
+    def _take(self) -> List[StreamItem]:
+        if self.backlog:
+            items, self.backlog = self.backlog, []
+            return items
+        items = self.buffer.get_batch(timeout=0)
+        dropped = self.buffer.dropped
+        if dropped != self._seen_dropped:
+            self._seen_dropped = dropped
+            reset = Event(RESET, {"reason": "overflow"})
+            items.insert(0, (None, reset))
+        return items
+
+    async def stream(
+        self, heartbeat_s: float = DEFAULT_HEARTBEAT_S
+    ) -> AsyncIterator[Optional[StreamItem]]:
+        """Yield events as they arrive; None every ``heartbeat_s`` of silence."""
+        while True:
+            items = self._take()
+            if not items:
+                self._wake.clear()
+                # re-check after clearing so a wake-up in between is not lost
+                items = self._take()
+            if not items:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), heartbeat_s)
+                except asyncio.TimeoutError:
+                    yield None
+                continue
+            for item in items:
+                yield item
+
+    def close(self):
+        self.hub.disconnect(self)
+        self.buffer.close()
+
+
+class EventStreamHub:
+    """Single bus subscription shared by all stream clients."""
+
+    def __init__(
+        self,
+        bus: EventBus,
+        replay_size: int = DEFAULT_REPLAY_SIZE,
+        client_maxsize: int = DEFAULT_CLIENT_MAXSIZE,
+    ):
+        self.bus = bus
+        self.client_maxsize = client_maxsize
+        self.epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._ring: "deque[Tuple[int, Event]]" = deque(maxlen=replay_size)
+        self._clients: List[StreamClient] = []
+        self._lock = threading.Lock()
+        self._sub: Optional[Subscription] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stopping.clear()
+        self._sub = self.bus.register(policy=DROP_OLDEST, name="event-stream")
+        self._thread = threading.Thread(
+            target=self._pump, name="event-stream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        self._stopping.set()
+        if self._sub is not None:
+            self.bus.unregister(self._sub)
+            self._sub.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "last_id": self._seq,
+                "replay": len(self._ring),
+                "clients": len(self._clients),
+            }
+
+    # ------------------ bus side ------------------
+    def _pump(self):
+        while not self._stopping.is_set():
+            batch = self._sub.get_batch()
+            if batch:
+                self.dispatch(batch)
+
+    def dispatch(self, batch: Iterable[Event]):
+        with self._lock:
+            items = []
+            for event in batch:
+                self._seq += 1
+                items.append((self._seq, event))
+            self._ring.extend(items)
+            clients = tuple(self._clients)
+        tagged = [(f"{self.epoch}-{seq}", event) for seq, event in items]
+        for client in clients:
+            client.offer(tagged)
+
+    # ------------------ client side ------------------
+    def _parse_id(self, last_event_id: str) -> Optional[int]:
+        epoch, _, seq = last_event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def connect(
+        self,
+        topics: Optional[Iterable[str]] = None,
+        last_event_id: Optional[str] = None,
+    ) -> StreamClient:
+        """Register a client (from a coroutine), replaying after ``last_event_id``."""
+        client = StreamClient(
+            self, tuple(topics) if topics else None, self.client_maxsize
+        )
+        with self._lock:
+            if last_event_id:
+                client.backlog = self._replay(last_event_id, client)
+            # under the lock: later dispatches go to the client, not the backlog
+            self._clients.append(client)
+        return client
+
+    def _replay(self, last_event_id: str, client: StreamClient) -> List[StreamItem]:
+        # must hold self._lock
+        backlog: List[StreamItem] = []
+        seq = self._parse_id(last_event_id)
+        oldest = self._ring[0][0] if self._ring else self._seq + 1
+        if seq is None or seq > self._seq:
+            backlog.append((None, Event(RESET, {"reason": "unknown_id"})))
+            seq = self._seq
+        elif seq < oldest - 1:
+            backlog.append((None, Event(RESET, {"reason": "expired"})))
+        backlog.extend(
+            (f"{self.epoch}-{s}", event)
+            for s, event in self._ring
+            if s > seq and client.wants(event.type)
+        )
+        return backlog
+
+    def disconnect(self, client: StreamClient):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
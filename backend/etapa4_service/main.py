@@ -1,32 +1,90 @@
-from fastapi import FastAPI, Depends
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from collections import defaultdict
+import asyncio
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from data.db import get_session
-from data.models import EventRecord, KeywordRun, Ad
+from fastapi import (
+    Depends,
+    FastAPI,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
 
+from backend.etapa4_service.export import (
+    DEFAULT_CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    MEDIA_TYPES,
+    stream_ads,
+)
+from app.events import get_event_bus
+from backend.etapa4_service.event_stream import (
+    DEFAULT_HEARTBEAT_S,
+    EventStreamHub,
+    format_sse,
+    to_json,
+)
+from backend.etapa4_service.response_cache import ResponseCacheMiddleware
+from data.data_version import read_data_version
+from data.db import get_async_sessionmaker
+from data.metrics_store import ads_per_keyword, read_metrics
+from data.models import Ad, Domain, EventRecord, KeywordRun
 
 app = FastAPI(title="Etapa4 Service - V3.1")
 
+# polled by the GUI and dashboards; served from memory until the data changes
+CACHED_PATHS = ("/metrics", "/ads", "/domains", "/runs")
+
 
-def get_db():
-    db = get_session()
+async def _data_version() -> Optional[str]:
     try:
-        yield db
-    finally:
-        db.close()
+        async with get_async_sessionmaker()() as db:
+            return await db.run_sync(read_data_version)
+    except SQLAlchemyError:
+        # e.g. a database created before the data_version table: no caching
+        return None
+
+
+app.add_middleware(ResponseCacheMiddleware, paths=CACHED_PATHS, version=_data_version)
+
+
+# requests using the database at once; the others queue here rather than
+# interleaving their many small driver round trips with the running ones
+DB_CONCURRENCY = int(os.environ.get("V3_DB_ASYNC_CONCURRENCY", "8"))
+_db_slots: Optional[asyncio.Semaphore] = None
+
+
+async def get_db():
+    # async session: requests wait on the database without holding a thread
+    global _db_slots
+    if _db_slots is None:
+        _db_slots = asyncio.Semaphore(DB_CONCURRENCY)
+    async with _db_slots:
+        async with get_async_sessionmaker()() as db:
+            yield db
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 @app.get("/events")
-def list_events(limit: int = 50, db: Session = Depends(get_db)):
-    rows = db.query(EventRecord).order_by(EventRecord.id.desc()).limit(limit).all()
+async def list_events(limit: int = 50, db: AsyncSession = Depends(get_db)):
+    rows = (
+        await db.scalars(
+            select(EventRecord).order_by(EventRecord.id.desc()).limit(limit)
+        )
+    ).all()
     return JSONResponse(
         [
             {
@@ -40,111 +98,385 @@ def list_events(limit: int = 50, db: Session = Depends(get_db)):
     )
 
 
-def _percentile(values, p: float):
-    if not values:
-        return None
-    k = (len(values) - 1) * p
-    f = int(k)
-    c = min(f + 1, len(values) - 1)
-    if f == c:
-        return values[int(k)]
-    d0 = values[f] * (c - k)
-    d1 = values[c] * (k - f)
-    return d0 + d1
+# live events: the hub joins the process bus (set V3_EVENT_BUS_URL to receive
+# the events of a JobManager running in another process)
+STREAM_HEARTBEAT_S = float(
+    os.environ.get("V3_STREAM_HEARTBEAT_S", str(DEFAULT_HEARTBEAT_S))
+)
+_event_hub: Optional[EventStreamHub] = None
 
 
-@app.get("/metrics")
-def metrics(db: Session = Depends(get_db)):
-    total_ads = db.query(func.count(Ad.id)).scalar() or 0
-    total_runs = db.query(func.count(KeywordRun.id)).scalar() or 0
-    avg_duration = db.query(func.avg(KeywordRun.duration_s)).scalar()
-    # collect durations and compute percentiles in Python (SQLite compatibility)
-    flat = [
-        d
-        for (d,) in db.query(KeywordRun.duration_s)
-        .filter(KeywordRun.duration_s.is_not(None))
-        .all()
-    ]
-    p50 = None
-    p95 = None
-    if flat:
-        flat_sorted = sorted(flat)
-
-        def pct(arr, q):
-            if not arr:
-                return None
-            n = len(arr)
-            idx = (n - 1) * q
-            lo = int(idx)
-            hi = min(lo + 1, n - 1)
-            if lo == hi:
-                return arr[lo]
-            return arr[lo] * (hi - idx) + arr[hi] * (idx - lo)
-
-        p50 = pct(flat_sorted, 0.5)
-        p95 = pct(flat_sorted, 0.95)
+def get_event_hub() -> EventStreamHub:
+    global _event_hub
+    if _event_hub is None:
+        _event_hub = EventStreamHub(
+            get_event_bus(),
+            replay_size=int(os.environ.get("V3_STREAM_REPLAY", "1024")),
+            client_maxsize=int(os.environ.get("V3_STREAM_CLIENT_BUFFER", "1000")),
+        )
+        _event_hub.start()
+    return _event_hub
 
-    # per-keyword breakdown
-    per_keyword = defaultdict(lambda: {"runs": 0, "ads": 0, "avg_duration": None})
-    runs = db.query(KeywordRun).all()
-    ads = db.query(Ad).all()
-    for r in runs:
-        pk = per_keyword[r.keyword]
-        pk["runs"] += 1
-        if r.duration_s is not None:
-            if pk["avg_duration"] is None:
-                pk["avg_duration"] = float(r.duration_s)
+
+def _parse_topics(raw: Optional[str]) -> List[str]:
+    return [part.strip() for part in (raw or "").split(",") if part.strip()]
+
+
+@app.get("/events/stream")
+async def stream_events(
+    request: Request,
+    topics: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+):
+    """Server-Sent Events; ``topics=job.*,adapter.limit`` filters by type.
+
+    Browsers resume with the ``Last-Event-ID`` header on reconnect; other
+    clients can pass ``last_event_id`` instead.
+    """
+    hub = get_event_hub()
+    resume = request.headers.get("last-event-id") or last_event_id
+
+    async def body():
+        client = hub.connect(_parse_topics(topics), resume)
+        try:
+            yield "retry: 1000\n\n"
+            async for item in client.stream(STREAM_HEARTBEAT_S):
+                # a comment line keeps proxies from closing an idle stream
+                yield ": heartbeat\n\n" if item is None else format_sse(*item)
+        finally:
+            client.close()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/events/stream")
+async def stream_events_ws(
+    websocket: WebSocket,
+    topics: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+):
+    """The same stream as JSON text messages; heartbeats are ``{"type": "heartbeat"}``."""
+    await websocket.accept()
+    client = get_event_hub().connect(_parse_topics(topics), last_event_id)
+    try:
+        async for item in client.stream(STREAM_HEARTBEAT_S):
+            if item is None:
+                await websocket.send_text('{"type": "heartbeat"}')
             else:
-                # simple running average (not weighted)
-                pk["avg_duration"] = (pk["avg_duration"] + float(r.duration_s)) / 2
-    for a in ads:
-        per_keyword[a.keyword]["ads"] += 1
+                await websocket.send_text(to_json(*item))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        client.close()
+
 
-    # convert defaultdict to plain dict for JSON
-    per_keyword = {k: v for k, v in per_keyword.items()}
+def _parse_quantiles(raw: Optional[str]) -> List[float]:
+    if not raw:
+        return []
+    try:
+        qs = [float(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="quantiles must be numbers")
+    if any(not 0.0 <= q <= 1.0 for q in qs):
+        raise HTTPException(status_code=422, detail="quantiles must be in [0, 1]")
+    return qs
+
+
+@app.get("/metrics")
+async def metrics(quantiles: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """Run/ad metrics; ``quantiles=0.99,0.999`` adds extra duration percentiles."""
+    extra_quantiles = _parse_quantiles(quantiles)
+    return await db.run_sync(compute_metrics, extra_quantiles)
+
+
+def compute_metrics(db: Session, extra_quantiles: Sequence[float] = ()) -> Dict:
+    """The /metrics payload, computed on a sync session."""
+    # run aggregates come pre-computed from keyword_stats (see data.metrics_store),
+    # so the cost no longer depends on how many runs were recorded
+    summary = read_metrics(db)
+    total_ads = db.execute(select(func.count(Ad.id))).scalar() or 0
+    sketch = summary["sketch"]
+    p50 = sketch.quantile(0.5)
+    p95 = sketch.quantile(0.95)
+
+    # per-keyword breakdown
+    per_keyword = {
+        kw: {"runs": s["runs"], "ads": 0, "avg_duration": s["avg_duration"]}
+        for kw, s in summary["per_keyword"].items()
+    }
+    for kw, count in ads_per_keyword(db).items():
+        pk = per_keyword.setdefault(kw, {"runs": 0, "ads": 0, "avg_duration": None})
+        pk["ads"] = count
 
-    return {
+    avg_duration = summary["avg_duration"]
+    result = {
         "total_ads": int(total_ads),
-        "total_runs": int(total_runs),
+        "total_runs": int(summary["total_runs"]),
         "avg_duration": float(avg_duration) if avg_duration is not None else None,
         "p50_duration": float(p50) if p50 is not None else None,
         "p95_duration": float(p95) if p95 is not None else None,
         "per_keyword": per_keyword,
     }
+    if extra_quantiles:
+        result["duration_quantiles"] = {
+            f"p{q * 100:g}": sketch.quantile(q) for q in extra_quantiles
+        }
+    return result
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_key(value, row_id: int) -> str:
+    raw = json.dumps([value, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_key(cursor: str) -> Tuple[object, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="invalid cursor")
+
+
+def _encode_cursor(ts: Optional[datetime], row_id: int) -> str:
+    return _encode_key(ts.isoformat() if ts is not None else None, row_id)
+
+
+def _decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    ts, row_id = _decode_key(cursor)
+    try:
+        return (datetime.fromisoformat(ts) if ts is not None else None, row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="invalid cursor")
+
+
+def _check_limit(limit: int):
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}"
+        )
+
+
+async def _keyset_page(
+    db: AsyncSession,
+    stmt,
+    ts_col,
+    id_col,
+    limit: int,
+    after: Optional[str],
+    response: Response,
+):
+    """Newest-first keyset page of ``stmt`` on (ts_col, id_col).
+
+    Rows with a timestamp come first, through a row-value comparison that an
+    index on (ts_col, id_col) serves as a range seek at any depth; rows with a
+    NULL timestamp follow in id order (a cursor with a null timestamp resumes
+    there). One extra row is fetched to tell whether another page exists; its
+    cursor goes to the ``X-Next-Cursor`` header.
+    """
+    _check_limit(limit)
+    ts, row_id = _decode_cursor(after) if after else (None, None)
+    rows = []
+    if ts is not None or row_id is None:
+        dated = stmt.where(ts_col.is_not(None))
+        if ts is not None:
+            # bound with the columns' types: SQLite compares stored text
+            cursor = tuple_(ts, row_id, types=(ts_col.type, id_col.type))
+            dated = dated.where(tuple_(ts_col, id_col) < cursor)
+        dated = dated.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1)
+        rows = (await db.execute(dated)).all()
+        row_id = None
+    if len(rows) <= limit:
+        undated = stmt.where(ts_col.is_(None))
+        if row_id is not None:
+            undated = undated.where(id_col < row_id)
+        undated = undated.order_by(id_col.desc()).limit(limit + 1 - len(rows))
+        rows += (await db.execute(undated)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(
+            getattr(last, ts_col.key), last.id
+        )
+    return rows
 
 
 @app.get("/ads")
-def list_ads(db: Session = Depends(get_db)):
-    rows = db.query(Ad).order_by(Ad.created_at.desc()).all()
+async def list_ads(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    keyword: Optional[str] = None,
+    country: Optional[str] = None,
+    domain: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Newest ads first, one page at a time.
+
+    Pass the ``X-Next-Cursor`` response header back as ``after`` to get the next
+    page; the header is absent on the last page.
+    """
+    stmt = select(Ad.id, Ad.keyword, Ad.title, Ad.domain, Ad.created_at)
+    if keyword is not None:
+        stmt = stmt.where(Ad.keyword == keyword)
+    if country is not None:
+        stmt = stmt.where(Ad.country == country)
+    if domain is not None:
+        stmt = stmt.where(Ad.domain == domain)
+    rows = await _keyset_page(db, stmt, Ad.created_at, Ad.id, limit, after, response)
     return [
         {
             "id": r.id,
             "keyword": r.keyword,
             "title": r.title,
             "domain": r.domain,
-            "created_at": r.created_at.isoformat() if r.created_at is not None else None,
+            "created_at": (
+                r.created_at.isoformat() if r.created_at is not None else None
+            ),
         }
         for r in rows
     ]
 
 
+@app.get("/ads/export")
+async def export_ads(
+    format: str = "ndjson",
+    gzip: bool = False,
+    since_id: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """Stream the ads table as NDJSON or CSV in id order.
+
+    ``since_id`` makes the export incremental (only rows with a larger id), so a
+    nightly sync can resume from the last id it stored. ``gzip=true`` compresses
+    the stream on the fly (``Content-Encoding: gzip``).
+    """
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=422, detail="format must be ndjson or csv")
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}",
+        )
+    headers = {
+        "Content-Disposition": f'attachment; filename="ads-since-{since_id}.{format}"'
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_ads(format, since_id=since_id, gzip=gzip, chunk_size=chunk_size),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
 @app.get("/runs")
-def list_runs(db: Session = Depends(get_db)):
-    rows = db.query(KeywordRun).order_by(KeywordRun.started_at.desc()).all()
+async def list_runs(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    keyword: Optional[str] = None,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Newest runs first, paginated like ``/ads`` (keyset on started_at, id)."""
+    stmt = select(
+        KeywordRun.id,
+        KeywordRun.keyword,
+        KeywordRun.started_at,
+        KeywordRun.duration_s,
+        KeywordRun.results_count,
+        KeywordRun.status,
+    )
+    if keyword is not None:
+        stmt = stmt.where(KeywordRun.keyword == keyword)
+    if status is not None:
+        stmt = stmt.where(KeywordRun.status == status)
+    rows = await _keyset_page(
+        db, stmt, KeywordRun.started_at, KeywordRun.id, limit, after, response
+    )
     return [
         {
             "id": r.id,
             "keyword": r.keyword,
-            "started_at": r.started_at.isoformat() if r.started_at is not None else None,
+            "started_at": (
+                r.started_at.isoformat() if r.started_at is not None else None
+            ),
             "duration_s": float(r.duration_s) if r.duration_s is not None else None,
-            "results_count": int(r.results_count) if r.results_count is not None else None,
+            "results_count": (
+                int(r.results_count) if r.results_count is not None else None
+            ),
             "status": r.status,
         }
         for r in rows
     ]
 
 
+# /domains orders: column, biggest / newest first, type of its cursor value
+DOMAIN_SORTS = {
+    "count": (Domain.ads_count, True, int),
+    "domain": (Domain.domain, False, str),
+    "last_seen": (Domain.last_seen_at, True, datetime),
+}
+
+
 @app.get("/domains")
-def list_domains(db: Session = Depends(get_db)):
-    rows = db.query(Ad.domain, func.count(Ad.id)).group_by(Ad.domain).all()
-    return [{"domain": d, "count": int(c)} for d, c in rows]
+async def list_domains(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+    sort: str = "count",
+    db: AsyncSession = Depends(get_db),
+):
+    """Top domains by ad count; ``sort=domain`` or ``last_seen`` for other orders.
+
+    Reads the counters materialized in ``domains`` (see data.domain_store) and
+    pages like /ads: pass ``X-Next-Cursor`` back as ``after``.
+    """
+    if sort not in DOMAIN_SORTS:
+        raise HTTPException(
+            status_code=422, detail=f"sort must be one of {', '.join(DOMAIN_SORTS)}"
+        )
+    stmt = select(
+        Domain.id, Domain.domain, Domain.ads_count, Domain.last_seen_at
+    ).where(Domain.ads_count > 0)
+    col, descending, kind = DOMAIN_SORTS[sort]
+    if kind is datetime:
+        # NULLs (rebuilt from ads without created_at) last, as for /ads
+        rows = await _keyset_page(db, stmt, col, Domain.id, limit, after, response)
+    else:
+        _check_limit(limit)
+        if after:
+            value, row_id = _decode_key(after)
+            if not isinstance(value, kind):
+                raise HTTPException(status_code=422, detail="invalid cursor")
+            # row values: a range seek on the (col, id) index at any depth
+            key = tuple_(col, Domain.id)
+            cursor = tuple_(value, row_id, types=(col.type, Domain.id.type))
+            stmt = stmt.where(key < cursor if descending else key > cursor)
+        order = (col.desc(), Domain.id.desc()) if descending else (col, Domain.id)
+        rows = (await db.execute(stmt.order_by(*order).limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = _encode_key(
+                getattr(last, col.key), last.id
+            )
+    return [
+        {
+            "domain": r.domain,
+            "count": r.ads_count,
+            "last_seen_at": (
+                r.last_seen_at.isoformat() if r.last_seen_at is not None else None
+            ),
+        }
+        for r in rows
+    ]
@@ -0,0 +1,212 @@
+"""Response cache with ETag / conditional GET for the polled read endpoints.
+
+``ResponseCacheMiddleware`` keeps the last successful response of each
+``(path, query)`` together with the data version (see data.data_version) it
+was computed from. While the version is unchanged the stored body is served
+without running the endpoint; a request whose ``If-None-Match`` matches the
+ETag (a hash of the body) gets an empty ``304 Not Modified`` - also after a
+recompute that produced the same body. Bodies are compressed on demand (gzip,
+or brotli when the ``brotli`` package is installed) and the compressed
+variants are cached with the entry.
+"""
+
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+DEFAULT_MAX_ENTRIES = 512
+# bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 512
+# response headers of the endpoint kept in the cache (lower-case)
+KEPT_HEADERS = ("content-type", "x-next-cursor")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as RFC 9110 requires for If-None-Match
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Entry:
+    __slots__ = ("version", "etag", "headers", "body", "encoded")
+
+    def __init__(self, version: str, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.version = version
+        # weak: the same tag covers the gzip / brotli / identity variants
+        self.etag = 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.headers = headers
+        self.body = body
+        # encoding -> compressed body
+        self.encoded: Dict[str, bytes] = {}
+
+    def body_for(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self.encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6, mtime=0)
+            self.encoded[encoding] = data
+        return data
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware caching GET responses of ``paths`` per data version.
+
+    ``version`` is an async callable returning the current data version (or
+    None, which disables caching for that request). Concurrent requests share
+    one in-flight ``version`` call, so a burst of polls costs one query; a
+    request may thus see the version read just before it arrived. At most
+    ``max_entries`` responses are kept, least recently used first out.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Iterable[str],
+        version: Callable[[], Awaitable[Optional[str]]],
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.version = version
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._version_read: Optional[asyncio.Future] = None
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+        version = await self._current_version()
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+        query = scope.get("query_string", b"").decode("latin-1")
+        key = (
+            scope["path"],
+            urlencode(sorted(parse_qsl(query, keep_blank_values=True))),
+        )
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = await self._compute(scope, receive, send, version)
+            if entry is None:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        await self._respond(scope, send, entry)
+
+    async def _current_version(self) -> Optional[str]:
+        read = self._version_read
+        if read is None:
+            read = self._version_read = asyncio.ensure_future(self.version())
+            read.add_done_callback(self._version_read_done)
+        return await asyncio.shield(read)
+
+    def _version_read_done(self, read: asyncio.Future):
+        if self._version_read is read:
+            self._version_read = None
+
+    async def _compute(self, scope, receive, send, version: str) -> Optional[_Entry]:
+        """Run the endpoint; returns its entry, or None if it was not cacheable
+        (in which case the response has already been sent as is)."""
+        messages = []
+
+        async def capture(message):
+            messages.append(message)
+
+        await self.app(scope, receive, capture)
+        start = messages[0] if messages else None
+        if start is None or start["status"] != 200:
+            for message in messages:
+                await send(message)
+            return None
+        body = b"".join(m.get("body", b"") for m in messages[1:])
+        headers = [
+            (name, value)
+            for name, value in start.get("headers", [])
+            if name.decode("latin-1").lower() in KEPT_HEADERS
+        ]
+        return _Entry(version, headers, body)
+
+    async def _respond(self, scope, send, entry: _Entry):
+        request_headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        headers = list(entry.headers) + [
+            (b"etag", entry.etag.encode()),
+            # clients may keep the body but must revalidate before reusing it
+            (b"cache-control", b"no-cache"),
+            (b"vary", b"accept-encoding"),
+        ]
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, entry.etag):
+            self.not_modified += 1
+            await send(
+                {"type": "http.response.start", "status": 304, "headers": headers}
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+        encoding = None
+        if len(entry.body) >= MIN_COMPRESS_BYTES:
+            encoding = _accepted_encoding(request_headers.get("accept-encoding", ""))
+        body = entry.body_for(encoding)
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,184 @@
+"""Load-test the Etapa4 FastAPI service through a local uvicorn.
+
+Seeds a throwaway SQLite database, starts ``uvicorn`` in a subprocess and
+keeps ``--concurrency`` httpx clients busy on a mix of dashboard endpoints
+for ``--duration`` seconds, then reports requests/s and p50/p99 latency per
+endpoint. ``--app-dir`` points at another checkout (e.g. a ``git worktree``
+of an older commit) to measure the service before and after a change against
+the same data; ``--output`` saves the numbers as JSON.
+
+Usage: python benchmarks/bench_api_load.py [--concurrency 64] [--duration 10]
+           [--ads 20000] [--app-dir ../old-checkout] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+ENDPOINTS = ("/metrics", "/ads?limit=50", "/runs?limit=50", "/domains", "/health")
+
+
+def seed(db_url: str, ads: int, runs: int):
+    os.environ["V3_DATABASE_URL"] = db_url
+    from data.db import SessionLocal, engine
+    from data.models import Base, KeywordRun
+    from data.persistence import upsert_ads
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        upsert_ads(
+            session,
+            [
+                {
+                    "unique_id": f"ad{i}",
+                    "keyword": f"kw{i % 200}",
+                    "country": "US",
+                    "domain": f"d{i % 500}.example.com",
+                    "title": f"Ad {i}",
+                    "body": "x" * 200,
+                    "media_url": None,
+                }
+                for i in range(ads)
+            ],
+        )
+        session.add_all(
+            KeywordRun(
+                keyword=f"kw{i % 200}",
+                duration_s=0.1 + (i % 97) / 100,
+                results_count=i % 20,
+                status="finished",
+            )
+            for i in range(runs)
+        )
+        session.commit()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+async def load(base_url: str, concurrency: int, duration: float):
+    import httpx
+
+    latencies = {path: [] for path in ENDPOINTS}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(idx: int, client):
+        nonlocal errors
+        n = idx
+        while time.perf_counter() < deadline:
+            path = ENDPOINTS[n % len(ENDPOINTS)]
+            n += 1
+            t0 = time.perf_counter()
+            try:
+                resp = await client.get(path)
+                resp.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies[path].append(time.perf_counter() - t0)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        await asyncio.gather(*(worker(i, client) for i in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--ads", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--app-dir", default=ROOT)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    seed(db_url, args.ads, args.runs)
+
+    port = _free_port()
+    env = dict(os.environ, V3_DATABASE_URL=db_url)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.etapa4_service.main:app",
+            "--app-dir",
+            os.path.abspath(args.app_dir),
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=os.path.abspath(args.app_dir),
+        env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        asyncio.run(load(base_url, 4, 1.0))  # warm-up
+        latencies, errors = asyncio.run(load(base_url, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    total = sum(len(v) for v in latencies.values())
+    every = [x for v in latencies.values() for x in v]
+    report = {
+        "app_dir": os.path.abspath(args.app_dir),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "requests_per_s": total / args.duration,
+        "errors": errors,
+        "p50_ms": 1000 * _percentile(every, 0.5),
+        "p99_ms": 1000 * _percentile(every, 0.99),
+        "endpoints": {
+            path: {
+                "requests": len(v),
+                "p50_ms": 1000 * _percentile(v, 0.5) if v else None,
+                "p99_ms": 1000 * _percentile(v, 0.99) if v else None,
+            }
+            for path, v in latencies.items()
+        },
+    }
+    print(
+        f"{report['requests_per_s']:.1f} req/s  p50 {report['p50_ms']:.1f}ms"
+        f"  p99 {report['p99_ms']:.1f}ms  errors {errors}"
+    )
+    for path, stats in report["endpoints"].items():
+        print(f"  {path:18s} {stats['requests']:6d} req  p99 {stats['p99_ms']:.1f}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare per-event and batched consumption of a busy subscription.
+
+A producer thread publishes ``--events`` events while one consumer drains them
+either one ``get`` per event (the old run_consumer_loop) or with ``get_batch``.
+The "drain" figures time the consumer alone on a pre-filled subscription, i.e.
+the per-event locking cost without the producer as the bottleneck.
+
+Usage: python benchmarks/bench_consumer_loop.py [--events 500000] [--max-batch 256]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.events import BLOCK, Event, EventBus  # noqa: E402
+
+
+def run(events: int, max_batch: int) -> float:
+    bus = EventBus()
+    # BLOCK so nothing is dropped and both modes handle every event
+    sub = bus.register(maxsize=10000, policy=BLOCK)
+    ev = Event(type="job.progress", payload=None)
+
+    def produce():
+        for _ in range(events):
+            bus.publish(ev)
+
+    seen = 0
+    t0 = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    if max_batch == 1:
+        while seen < events:
+            sub.get(timeout=0.5)
+            seen += 1
+    else:
+        while seen < events:
+            seen += len(sub.get_batch(max_batch))
+    producer.join()
+    return time.perf_counter() - t0
+
+
+def drain(events: int, max_batch: int) -> float:
+    sub = EventBus().register(maxsize=0)
+    ev = Event(type="job.progress", payload=None)
+    for _ in range(events):
+        sub.put(ev)
+    seen = 0
+    t0 = time.perf_counter()
+    if max_batch == 1:
+        while seen < events:
+            sub.get(timeout=0.5)
+            seen += 1
+    else:
+        while seen < events:
+            seen += len(sub.get_batch(max_batch))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=500000)
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    for label, max_batch in (("per-event", 1), ("batched", args.max_batch)):
+        for mode, fn in (("pipeline", run), ("drain", drain)):
+            elapsed = fn(args.events, max_batch)
+            print(
+                f"{label:10s} {mode:8s} {args.events / elapsed:>12,.0f} events/s"
+                f" ({elapsed:.2f}s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""End-to-end JobManager throughput on simulated adapters.
+
+Runs each scenario (a SimulatedAdapter configuration) through a fresh
+JobManager against a throwaway SQLite database and reports keywords/s,
+ads persisted/s, bus events/s, p50/p99 keyword latency (job.progress to
+job.keyword_done) and peak RSS. Results are printed and, with ``--output``,
+written as JSON; ``--compare`` prints the change against an earlier file.
+
+Usage: python benchmarks/bench_e2e.py [--keywords 200] [--workers 8]
+           [--scenario baseline ...] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.core.adapters.simulator import SimulatedAdapter  # noqa: E402
+
+SCENARIOS = {
+    "baseline": {
+        "latency": "fixed",
+        "latency_s": 0.01,
+        "results": "fixed",
+        "results_mean": 10,
+    },
+    "heavy-tail": {"latency": "pareto", "latency_s": 0.02, "latency_sigma": 1.5},
+    "large-payloads": {"results_mean": 50, "payload_bytes": 4096},
+    "duplicates": {"results_mean": 20, "duplicate_ratio": 0.5, "duplicate_pool": 50},
+    "errors": {"latency": "exponential", "error_rate": 0.1},
+}
+# metrics where a larger value is better, for --compare
+HIGHER_IS_BETTER = ("keywords_per_s", "ads_per_s", "events_per_s")
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / scale
+
+
+def run_scenario(
+    name: str, options: dict, keywords: int, workers: int, mode: str
+) -> dict:
+    from app.events import EventBus
+    from backend.core.job_manager import JobManager
+
+    factory = functools.partial(SimulatedAdapter, name=name, **options)
+    adapter = factory()
+    adapter.start()
+    bus = EventBus()
+    mgr = JobManager(
+        bus=bus,
+        max_workers=workers,
+        worker_mode=mode,
+        adapter=adapter,
+        adapter_factory=factory,
+    )
+    counts = {"events": 0, "ads": 0, "errors": 0}
+    started = {}
+    latencies = []
+    finished = threading.Event()
+
+    def consume():
+        sub = bus.register(name="bench", maxsize=0)
+        while not finished.is_set():
+            for ev in sub.get_batch(timeout=0.1):
+                counts["events"] += 1
+                kw = ev.payload.get("keyword")
+                if ev.type == "job.progress":
+                    started[kw] = ev.timestamp
+                elif ev.type == "job.keyword_done" and not ev.payload.get("duplicate"):
+                    counts["ads"] += ev.payload["count"]
+                    if kw in started:
+                        latencies.append(ev.timestamp - started[kw])
+                elif ev.type == "job.error":
+                    counts["errors"] += 1
+                elif (
+                    ev.type == "job.finished" and ev.payload.get("job_id") == job_id[0]
+                ):
+                    finished.set()
+        bus.unregister(sub)
+
+    job_id = [None]
+    mgr.start()
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    t0 = time.perf_counter()
+    job_id[0] = mgr.start_keywords_job([f"{name}-kw{i}" for i in range(keywords)])
+    finished.wait(600)
+    elapsed = time.perf_counter() - t0
+    consumer.join(5)
+    mgr.shutdown()
+    return {
+        "scenario": name,
+        "options": options,
+        "keywords": keywords,
+        "elapsed_s": elapsed,
+        "keywords_per_s": keywords / elapsed,
+        "ads_per_s": counts["ads"] / elapsed,
+        "events_per_s": counts["events"] / elapsed,
+        "errors": counts["errors"],
+        "p50_latency_s": _percentile(latencies, 0.5),
+        "p99_latency_s": _percentile(latencies, 0.99),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        before = {r["scenario"]: r for r in json.load(f)["results"]}
+    for r in results:
+        old = before.get(r["scenario"])
+        if old is None:
+            continue
+        parts = []
+        for key in HIGHER_IS_BETTER + ("p50_latency_s", "p99_latency_s", "peak_rss_mb"):
+            if old.get(key) and r.get(key) is not None:
+                parts.append(f"{key} {100 * (r[key] / old[key] - 1):+.1f}%")
+        print(f"{r['scenario']:15s} vs {baseline_path}: " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keywords", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), help="default: all"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    # set before importing data.db so process workers (spawned) inherit it too
+    os.environ["V3_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from data.db import engine
+    from data.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        r = run_scenario(name, SCENARIOS[name], args.keywords, args.workers, args.mode)
+        results.append(r)
+        print(
+            f"{name:15s} {r['keywords_per_s']:8.1f} kw/s {r['ads_per_s']:9.1f} ads/s"
+            f" {r['events_per_s']:9.1f} events/s"
+            f"  p50 {r['p50_latency_s'] * 1000:7.1f}ms p99 {r['p99_latency_s'] * 1000:7.1f}ms"
+            f"  rss {r['peak_rss_mb']:.0f}MB  errors {r['errors']}"
+        )
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workers": args.workers,
+        "mode": args.mode,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
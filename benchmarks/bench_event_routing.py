@@ -0,0 +1,56 @@
+"""Measure topic-routed publish cost with many subscribers.
+
+By default 100 subscribers are registered, spread over 10 topic prefixes, and
+1M events are published round-robin over those topics. A shorter run with
+every subscriber taking all events shows the unfiltered fan-out cost.
+
+Usage: python benchmarks/bench_event_routing.py [--events 1000000] [--subscribers 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.events import Event, EventBus  # noqa: E402
+
+
+def run(events: int, subscribers: int, topics: int, filtered: bool) -> float:
+    bus = EventBus()
+    for i in range(subscribers):
+        # maxsize=1 keeps memory flat; delivery cost is what is measured
+        bus.register(
+            maxsize=1,
+            topics=[f"topic{i % topics}.*"] if filtered else None,
+        )
+    batch = [Event(type=f"topic{i % topics}.evt", payload=None) for i in range(topics)]
+    t0 = time.perf_counter()
+    for i in range(events // topics):
+        for ev in batch:
+            bus.publish(ev)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--baseline-events", type=int, default=100000)
+    args = parser.parse_args()
+
+    for filtered, events in ((True, args.events), (False, args.baseline_events)):
+        elapsed = run(events, args.subscribers, args.topics, filtered)
+        label = "topic-filtered" if filtered else "all subscribers"
+        print(
+            f"{label:16s} {events:,} events x {args.subscribers} subs:"
+            f" {elapsed:.2f}s ({events / elapsed:,.0f} events/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
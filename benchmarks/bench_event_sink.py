@@ -0,0 +1,68 @@
+"""Measure EventSink throughput (events persisted per second) on SQLite WAL.
+
+Usage: python benchmarks/bench_event_sink.py [--events 200000] [--batch-size 500]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.events import Event, EventBus  # noqa: E402
+from backend.core.event_sink import EventSink  # noqa: E402
+from data.models import Base  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        @event.listens_for(engine, "connect")
+        def _wal(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            cur.close()
+
+        Base.metadata.create_all(bind=engine)
+        bus = EventBus()
+        sink = EventSink(
+            bus=bus,
+            batch_size=args.batch_size,
+            flush_interval_s=args.flush_interval,
+            max_pending=args.events,
+            session_factory=sessionmaker(bind=engine),
+        )
+        sink.start()
+        t0 = time.perf_counter()
+        for i in range(args.events):
+            bus.publish(Event(type="job.progress", payload={"keyword": f"k{i}"}))
+        publish_s = time.perf_counter() - t0
+        sink.stop(timeout=None)
+        total_s = time.perf_counter() - t0
+        stats = sink.stats()
+        print(f"published {args.events} events in {publish_s:.2f}s")
+        print(
+            f"persisted {stats['written']} events in {total_s:.2f}s"
+            f" -> {stats['written'] / total_s:,.0f} events/s"
+            f" ({stats['batches']} batches, dropped={stats['dropped']})"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
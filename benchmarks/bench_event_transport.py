@@ -0,0 +1,84 @@
+"""Measure the event codec against pickle and the Unix-socket relay throughput.
+
+Usage: python benchmarks/bench_event_transport.py [--events 100000]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.codec import decode_event, encode_event  # noqa: E402
+from app.events import BLOCK, Event, EventBus  # noqa: E402
+from app.transport import EventBroker, SocketTransport  # noqa: E402
+
+
+def sample_event(i: int) -> Event:
+    return Event(
+        type="job.keyword_done",
+        payload={
+            "keyword": f"kw{i}",
+            "count": 3,
+            "ads": [{"unique_id": f"mock-{i}-{n}"} for n in range(3)],
+        },
+    )
+
+
+def bench_codec(events: int):
+    ev = sample_event(0)
+    for name, enc, dec in (
+        ("codec", encode_event, decode_event),
+        ("pickle", pickle.dumps, pickle.loads),
+    ):
+        t0 = time.perf_counter()
+        for _ in range(events):
+            dec(enc(ev))
+        elapsed = time.perf_counter() - t0
+        print(
+            f"{name:7s} {len(enc(ev)):4d} bytes/event,"
+            f" {events / elapsed:>10,.0f} round trips/s"
+        )
+
+
+def bench_socket(events: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bus.sock")
+        # BLOCK instead of the default DROP_OLDEST: measure without losses
+        broker = EventBroker(path, policy=BLOCK)
+        broker.start()
+        sender = EventBus(transport=SocketTransport(path, policy=BLOCK))
+        receiver = EventBus(transport=SocketTransport(path))
+        inbox = receiver.register(maxsize=0)
+        batch = [sample_event(i) for i in range(100)]
+        t0 = time.perf_counter()
+        for i in range(events):
+            sender.publish(batch[i % 100])
+        seen = 0
+        while seen < events:
+            got = inbox.get_batch(1024, timeout=5)
+            if not got:
+                break
+            seen += len(got)
+        elapsed = time.perf_counter() - t0
+        print(f"socket  {seen:,} events relayed, {seen / elapsed:>10,.0f} events/s")
+        sender.close()
+        receiver.close()
+        broker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+    bench_codec(args.events)
+    bench_socket(args.events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare ways of computing the /metrics per-keyword breakdown.
+
+- legacy: hydrate every KeywordRun and Ad as ORM objects and loop in Python
+- sql: GROUP BY keyword aggregates (data.metrics_store.sql_keyword_breakdown)
+- store: the pre-aggregated keyword_stats rows behind /metrics
+
+Usage: python benchmarks/bench_metrics.py [--runs 1000000] [--ads 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.etapa4_service.main import metrics  # noqa: E402
+from data.metrics_store import (  # noqa: E402
+    ads_per_keyword,
+    rebuild_keyword_stats,
+    sql_keyword_breakdown,
+)
+from data.models import Ad, Base, KeywordRun  # noqa: E402
+
+
+def seed(Session, runs: int, ads: int, keywords: int):
+    rng = random.Random(0)
+    with Session() as session:
+        chunk = 50000
+        for start in range(0, runs, chunk):
+            session.execute(
+                insert(KeywordRun),
+                [
+                    {
+                        "keyword": f"kw{i % keywords}",
+                        "duration_s": rng.lognormvariate(0, 0.5),
+                        "results_count": i % 7,
+                        "status": "finished",
+                    }
+                    for i in range(start, min(start + chunk, runs))
+                ],
+            )
+        for start in range(0, ads, chunk):
+            session.execute(
+                insert(Ad),
+                [
+                    {"unique_id": f"ad{i}", "keyword": f"kw{i % keywords}"}
+                    for i in range(start, min(start + chunk, ads))
+                ],
+            )
+        rebuild_keyword_stats(session)
+        session.commit()
+
+
+def legacy(session):
+    per_keyword = {}
+    for r in session.query(KeywordRun).all():
+        pk = per_keyword.setdefault(r.keyword, {"runs": 0, "ads": 0, "sum": 0.0})
+        pk["runs"] += 1
+        pk["sum"] += r.duration_s or 0.0
+    for a in session.query(Ad).all():
+        per_keyword.setdefault(a.keyword, {"runs": 0, "ads": 0, "sum": 0.0})
+        per_keyword[a.keyword]["ads"] += 1
+    return per_keyword
+
+
+def sql(session):
+    breakdown = sql_keyword_breakdown(session)
+    ads_per_keyword(session)
+    return breakdown
+
+
+def store(session):
+    return metrics(db=session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=1000000)
+    parser.add_argument("--ads", type=int, default=100000)
+    parser.add_argument("--keywords", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        t0 = time.perf_counter()
+        seed(Session, args.runs, args.ads, args.keywords)
+        print(
+            f"seeded {args.runs} runs / {args.ads} ads / {args.keywords} keywords"
+            f" in {time.perf_counter() - t0:.1f}s"
+        )
+        for name, fn in (("legacy", legacy), ("sql", sql), ("store", store)):
+            best = None
+            for _ in range(args.repeat):
+                with Session() as session:
+                    t0 = time.perf_counter()
+                    fn(session)
+                    elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{name:>8}: {best * 1000:10.1f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
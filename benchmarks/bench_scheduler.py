@@ -0,0 +1,75 @@
+"""Interactive latency while a batch backfill saturates the workers.
+
+A backfill queues ``--batch`` tasks up front; meanwhile ``--interactive``
+small jobs arrive every ``--interval`` seconds. Reports the interactive tasks'
+queue wait (p50/p95) when everything is FIFO versus when the backfill runs in
+the ``batch`` class and GUI runs in ``interactive``.
+
+Usage: python benchmarks/bench_scheduler.py [--batch 2000] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.core.scheduler import BATCH, INTERACTIVE, NORMAL, Scheduler  # noqa: E402
+from data.sketch import QuantileSketch  # noqa: E402
+
+
+def run(args, prioritised: bool) -> QuantileSketch:
+    sched = Scheduler(max_workers=args.workers)
+    for _ in range(args.batch):
+        sched.submit(
+            time.sleep,
+            args.task_s,
+            # FIFO baseline: one flow, one class, i.e. plain arrival order
+            flow="backfill" if prioritised else None,
+            priority=BATCH if prioritised else NORMAL,
+        )
+    waits = QuantileSketch()
+    futures = []
+    for i in range(args.interactive):
+        submitted = time.monotonic()
+
+        def task(submitted=submitted):
+            waits.add(time.monotonic() - submitted)
+            time.sleep(args.task_s)
+
+        futures.append(
+            sched.submit(
+                task,
+                flow=f"gui{i}" if prioritised else None,
+                priority=INTERACTIVE if prioritised else NORMAL,
+            )
+        )
+        time.sleep(args.interval)
+    for f in futures:
+        f.result()
+    sched.shutdown(cancel_queued=True)
+    return waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--task-s", type=float, default=0.005)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for label, prioritised in (("fifo", False), ("scheduled", True)):
+        waits = run(args, prioritised)
+        print(
+            f"{label:10s} interactive wait p50={waits.quantile(0.5) * 1000:8.1f}ms"
+            f" p95={waits.quantile(0.95) * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
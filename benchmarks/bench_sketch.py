@@ -0,0 +1,68 @@
+"""Show that QuantileSketch memory stays flat as the number of runs grows.
+
+Usage: python benchmarks/bench_sketch.py [--sizes 1000 100000 10000000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from data.sketch import QuantileSketch  # noqa: E402
+
+QUANTILES = (0.5, 0.95, 0.99, 0.999)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 100000, 1000000, 10000000]
+    )
+    parser.add_argument(
+        "--exact-max",
+        type=int,
+        default=1000000,
+        help="also keep raw values (to report relative error) up to this size",
+    )
+    args = parser.parse_args()
+
+    header = (
+        f"{'runs':>10} {'bins':>6} {'json bytes':>10} {'peak KiB':>9} {'add/s':>10}"
+    )
+    print(header + "".join(f" {'err p' + format(q * 100, 'g'):>10}" for q in QUANTILES))
+    for n in args.sizes:
+        sketch = QuantileSketch()
+        rng = random.Random(n)
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            sketch.add(rng.lognormvariate(0, 1.0))
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        errors = []
+        if n <= args.exact_max:
+            # replay the same stream to get exact quantiles for the error columns
+            rng = random.Random(n)
+            raw = sorted(rng.lognormvariate(0, 1.0) for _ in range(n))
+            for q in QUANTILES:
+                exact = raw[round(q * (n - 1))]
+                errors.append(f"{abs(sketch.quantile(q) - exact) / exact:>10.4%}")
+        else:
+            errors = [f"{'-':>10}"] * len(QUANTILES)
+        print(
+            f"{n:>10} {sketch.memory_bins():>6} {len(json.dumps(sketch.to_dict())):>10}"
+            f" {peak / 1024:>9.1f} {n / elapsed:>10.0f} " + " ".join(errors)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare per-row vs batched ad persistence (ads/sec).
+
+Usage: python benchmarks/bench_upsert.py [--sizes 10 1000 100000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from data.models import Ad, Base  # noqa: E402
+from data.persistence import ad_rows, upsert_ads  # noqa: E402
+
+
+def make_ads(n: int, keyword: str):
+    return [
+        {
+            "unique_id": f"{keyword}:us:{i}",
+            "title": f"Ad {i} for {keyword}",
+            "domain": f"d{i % 50}.example.com",
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_upsert(session, ads, keyword, country):
+    # the pre-batching loop from JobManager: one SELECT per ad
+    for ad in ads:
+        existing = session.query(Ad).filter_by(unique_id=ad["unique_id"]).one_or_none()
+        if existing is not None:
+            existing.title = ad.get("title")
+            existing.domain = ad.get("domain")
+        else:
+            session.add(
+                Ad(
+                    unique_id=ad["unique_id"],
+                    keyword=keyword,
+                    country=country,
+                    domain=ad.get("domain"),
+                    title=ad.get("title"),
+                )
+            )
+    session.commit()
+
+
+def batched_upsert(session, ads, keyword, country):
+    upsert_ads(session, ad_rows(ads, keyword, country))
+    session.commit()
+
+
+def run_once(url, fn, ads):
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    timings = []
+    # first pass inserts, second pass hits the update path
+    for _ in range(2):
+        with Session() as session:
+            t0 = time.perf_counter()
+            fn(session, ads, "bench", "us")
+            timings.append(time.perf_counter() - t0)
+    engine.dispose()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument(
+        "--url", default=None, help="database URL (default: temp SQLite)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        print(f"{'ads':>8} {'mode':>8} {'insert ads/s':>14} {'update ads/s':>14}")
+        for n in args.sizes:
+            ads = make_ads(n, "bench")
+            for name, fn in (("legacy", legacy_upsert), ("batched", batched_upsert)):
+                insert_s, update_s = run_once(url, fn, ads)
+                print(f"{n:>8} {name:>8} {n / insert_s:>14.0f} {n / update_s:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
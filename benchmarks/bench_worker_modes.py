@@ -0,0 +1,100 @@
+"""Compare JobManager thread and process worker modes on CPU-bound keywords.
+
+Each search builds ``--ads`` ads and hashes every one ``--rounds`` times
+(standing in for parsing/normalisation/dedup hashing), then the ads go through
+the normal upsert path. Uses a throwaway SQLite database.
+
+Usage: python benchmarks/bench_worker_modes.py [--keywords 32] [--workers 4]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class CpuAdapter:
+    name = "cpu"
+
+    def __init__(self):
+        # read from the environment so spawned workers see the CLI settings
+        self.ads = int(os.environ.get("BENCH_ADS", "200"))
+        self.rounds = int(os.environ.get("BENCH_ROUNDS", "200"))
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        ads = []
+        for i in range(self.ads):
+            digest = f"{keyword}:{i}".encode()
+            for _ in range(self.rounds):
+                digest = hashlib.sha256(digest).digest()
+            ads.append(
+                {"unique_id": digest.hex(), "title": keyword, "domain": "x.example.com"}
+            )
+        return ads
+
+
+def run(mode: str, keywords: int, workers: int) -> float:
+    from app.events import EventBus
+    from backend.core.job_manager import JobManager
+
+    bus = EventBus()
+    mgr = JobManager(
+        bus=bus,
+        max_workers=workers,
+        worker_mode=mode,
+        adapter=CpuAdapter(),
+        adapter_factory=CpuAdapter,
+    )
+    mgr.start()
+    q = bus.register(topics=["job.finished"])
+    # warm-up job so process start-up (imports, engine) is not timed
+    mgr.start_keywords_job([f"warmup{i}" for i in range(workers)])
+    q.get(timeout=600)
+    t0 = time.perf_counter()
+    mgr.start_keywords_job([f"kw{i}" for i in range(keywords)])
+    q.get(timeout=600)
+    elapsed = time.perf_counter() - t0
+    mgr.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keywords", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ads", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    # set before importing data.db so the workers (spawned) inherit it too
+    os.environ["V3_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["BENCH_ADS"] = str(args.ads)
+    os.environ["BENCH_ROUNDS"] = str(args.rounds)
+
+    from data.db import engine
+    from data.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    for mode in ("thread", "process"):
+        elapsed = run(mode, args.keywords, args.workers)
+        print(
+            f"{mode:8s} {args.keywords} keywords x {args.ads} ads:"
+            f" {elapsed:.2f}s ({args.keywords / elapsed:.1f} keywords/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
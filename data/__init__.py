@@ -1 +1,9 @@
 # data package
+# register the mapper events that keep keyword_stats in sync with keyword_runs
+from data import metrics_store  # noqa: F401
+
+# and the data_version counter bumped by writes to ads / keyword_runs
+from data import data_version  # noqa: F401
+
+# and the domains counters for ads written through the ORM
+from data import domain_store  # noqa: F401
@@ -0,0 +1,63 @@
+"""The ``data_version`` counter behind the API's response cache.
+
+Any transaction that writes ads or keyword runs bumps the counter once, in
+the same transaction: ORM flushes of Ad / KeywordRun rows through a session
+event, and Core writes (``upsert_ads``) by calling ``bump_data_version``.
+Readers compare ``read_data_version`` with the version a cached response was
+built from, so a response is reused exactly until the data behind it changes,
+whichever process wrote it.
+"""
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from data.models import Ad, DataVersion, KeywordRun
+
+ROW_ID = 1
+_table = DataVersion.__table__
+# session.info flag: this transaction already bumped the counter
+_BUMPED = "data_version_bumped"
+
+
+@event.listens_for(_table, "after_create")
+def _insert_row(target, connection, **kw):
+    connection.execute(
+        _table.insert().values(id=ROW_ID, epoch=uuid.uuid4().hex[:12], version=0)
+    )
+
+
+def bump_data_version(session: Session):
+    """Increment the counter in ``session``'s transaction (once per transaction)."""
+    if session.info.get(_BUMPED):
+        return
+    session.info[_BUMPED] = True
+    session.connection().execute(
+        update(_table).where(_table.c.id == ROW_ID).values(version=_table.c.version + 1)
+    )
+
+
+def data_version_query():
+    return select(_table.c.epoch, _table.c.version).where(_table.c.id == ROW_ID)
+
+
+def read_data_version(session: Session) -> Optional[str]:
+    """``"<epoch>-<version>"``, or None if the table has no counter row."""
+    row = session.execute(data_version_query()).first()
+    return f"{row.epoch}-{row.version}" if row is not None else None
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Ad, KeywordRun)):
+            bump_data_version(session)
+            return
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_BUMPED, None)
@@ -1,17 +1,155 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+"""Engine and session setup.
+
+``make_engine`` tunes the engine for the backend in use. On SQLite every new
+connection gets the PRAGMAs in ``SQLITE_PRAGMAS`` (WAL, so readers never block
+the writer; ``synchronous=NORMAL``, which in WAL mode only fsyncs at
+checkpoints; a memory map, a bigger page cache and a ``busy_timeout`` so
+concurrent writers wait instead of failing with "database is locked"). Other
+backends get a sized connection pool with pre-ping and recycling. Every value
+can be overridden with a ``V3_DB_*`` environment variable.
+
+``get_async_sessionmaker`` gives the same database through SQLAlchemy's
+asyncio extension (aiosqlite / asyncpg, see ``async_url``) for the FastAPI
+service; the engine is only created on first use, so the sync code paths do
+not need the async drivers installed.
+"""
+
 import os
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 DATABASE_URL = os.environ.get("V3_DATABASE_URL") or "sqlite:///./v31.db"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=(
-        {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-    ),
-)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("V3_DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("V3_DB_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("V3_DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # negative = size in KiB rather than pages
+    "cache_size": int(os.environ.get("V3_DB_CACHE_SIZE", str(-64 * 1024))),
+    "busy_timeout": int(os.environ.get("V3_DB_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+POOL_OPTIONS = {
+    "pool_size": int(os.environ.get("V3_DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.environ.get("V3_DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": float(os.environ.get("V3_DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.environ.get("V3_DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": True,
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, pragmas: Dict):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _sqlite_pragmas(url: str, overrides: Optional[Dict]) -> Dict:
+    pragmas = dict(SQLITE_PRAGMAS, **(overrides or {}))
+    if ":memory:" in url or url.split("://")[-1].strip("/") == "":
+        # WAL needs a file; an in-memory database ignores it anyway
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    return pragmas
+
+
+def _on_connect(engine: Engine, pragmas: Dict):
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        _set_sqlite_pragmas(dbapi_connection, pragmas)
+
+
+def make_engine(
+    url: str = DATABASE_URL,
+    sqlite_pragmas: Optional[Dict] = None,
+    **engine_kwargs,
+) -> Engine:
+    """Create an engine tuned for ``url``; ``engine_kwargs`` go to create_engine."""
+    if url.startswith("sqlite"):
+        engine_kwargs.setdefault("connect_args", {"check_same_thread": False})
+        engine = create_engine(url, **engine_kwargs)
+        _on_connect(engine, _sqlite_pragmas(url, sqlite_pragmas))
+        return engine
+    for name, value in POOL_OPTIONS.items():
+        engine_kwargs.setdefault(name, value)
+    return create_engine(url, **engine_kwargs)
+
+
+def async_url(url: str) -> str:
+    """``url`` with its async driver: aiosqlite for SQLite, asyncpg for PostgreSQL."""
+    scheme, sep, rest = url.partition("://")
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme in ("postgresql", "postgres", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+def make_async_engine(
+    url: str = DATABASE_URL,
+    sqlite_pragmas: Optional[Dict] = None,
+    **engine_kwargs,
+) -> "AsyncEngine":
+    """Async counterpart of make_engine (same PRAGMAs / pool settings)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_url(url)
+    if url.startswith("sqlite"):
+        engine = create_async_engine(url, **engine_kwargs)
+        _on_connect(engine.sync_engine, _sqlite_pragmas(url, sqlite_pragmas))
+        return engine
+    for name, value in POOL_OPTIONS.items():
+        engine_kwargs.setdefault(name, value)
+    return create_async_engine(url, **engine_kwargs)
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 def get_session():
     return SessionLocal()
+
+
+_async_sessionmaker = None
+
+
+def get_async_sessionmaker() -> "async_sessionmaker[AsyncSession]":
+    """Session factory bound to the process-wide async engine (created lazily)."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_sessionmaker = async_sessionmaker(
+            make_async_engine(), expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+
+@contextmanager
+def unit_of_work(session_factory=SessionLocal) -> Iterator[Session]:
+    """One transaction for a group of writes: commit at the end, or roll back.
+
+    Callers put everything one piece of work produces (e.g. a keyword's run
+    row, its ads and its job task) through the yielded session, so it costs a
+    single commit - and on SQLite a single fsync - instead of one per step.
+    """
+    session = session_factory()
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,75 @@
+"""Materialized per-domain ad counters backing ``/domains``.
+
+``domains.ads_count`` is kept equal to ``SELECT count(*) FROM ads GROUP BY
+domain`` inside the transaction that writes the ads: ``upsert_ads`` adjusts
+it for the bulk upsert, and the mapper events below for Ad objects written
+through the ORM (insert, delete, and an update that moves an ad to another
+domain). ``last_seen_at`` is when an ad of the domain was last written.
+``rebuild_domains`` recomputes the table from ``ads`` in one statement, for
+databases that predate it or to repair drift.
+"""
+
+from typing import Dict
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from data.data_version import bump_data_version
+from data.models import Ad, Domain
+from data.persistence import update_domain_counts
+
+
+@event.listens_for(Ad, "after_insert")
+def _ad_inserted(mapper, connection, target):
+    if target.domain is not None:
+        update_domain_counts(connection, {target.domain: 1}, [target.domain])
+
+
+@event.listens_for(Ad, "after_update")
+def _ad_updated(mapper, connection, target):
+    history = inspect(target).attrs.domain.history
+    if not history.has_changes():
+        return
+    deltas: Dict[str, int] = {}
+    for old in history.deleted or ():
+        if old is not None:
+            deltas[old] = deltas.get(old, 0) - 1
+    seen = [target.domain] if target.domain is not None else []
+    if seen:
+        deltas[target.domain] = deltas.get(target.domain, 0) + 1
+    update_domain_counts(connection, deltas, seen)
+
+
+@event.listens_for(Ad, "after_delete")
+def _ad_deleted(mapper, connection, target):
+    # the committed value: a pending domain change never reached the counters
+    history = inspect(target).attrs.domain.history
+    domain = (history.deleted or history.unchanged or [target.domain])[0]
+    if domain is not None:
+        update_domain_counts(connection, {domain: -1})
+
+
+def rebuild_domains(session: Session) -> int:
+    """Recompute ``domains`` from ``ads`` (no commit); returns the domain count."""
+    bump_data_version(session)
+    table = Domain.__table__
+    session.execute(delete(table))
+    counts = (
+        select(Ad.domain, func.count(Ad.id), func.max(Ad.created_at))
+        .where(Ad.domain.is_not(None))
+        .group_by(Ad.domain)
+    )
+    session.execute(
+        table.insert().from_select(["domain", "ads_count", "last_seen_at"], counts)
+    )
+    return session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def sql_domain_counts(session: Session) -> Dict[str, int]:
+    """``GROUP BY domain`` over ``ads``: what ``domains.ads_count`` must hold."""
+    rows = session.execute(
+        select(Ad.domain, func.count(Ad.id))
+        .where(Ad.domain.is_not(None))
+        .group_by(Ad.domain)
+    ).all()
+    return {domain: int(count) for domain, count in rows}
@@ -0,0 +1,287 @@
+"""Durable job queue: ``jobs`` / ``job_tasks`` rows behind JobManager.
+
+Every distinct keyword of a job is a task. A worker must *claim* a task before
+running it: a single conditional UPDATE that succeeds only if the task is
+pending or its previous lease has expired, so two workers can never both win.
+Claims carry a lease (``lease_expires_at``) that the owner renews while it is
+alive; when an owner dies its leases run out and the tasks become claimable
+again. Nothing of a task's run is stored until it completes (see
+JobManager's record_keyword_run), so a dead owner leaves no half-written run
+behind. Jobs carry a lease of their own (``Job.owner``): only the
+manager holding it dispatches the job's tasks, and another manager adopts the
+job (``adopt_job``) only after that lease has expired. None of these
+functions commit.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from data.models import Job, JobTask
+
+DEFAULT_LEASE_S = 60.0
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def create_job(
+    session: Session,
+    keywords: Iterable[str],
+    country: str,
+    priority: str = "normal",
+    weight: float = 1.0,
+    owner: Optional[str] = None,
+    lease_s: float = DEFAULT_LEASE_S,
+    now: Optional[float] = None,
+) -> Tuple[int, Dict[str, int]]:
+    """Insert a job and one task per distinct keyword; returns (job id, task ids).
+
+    With ``owner`` the job starts leased to it for ``lease_s`` seconds.
+    """
+    keywords = list(keywords)
+    now = time.time() if now is None else now
+    job = Job(
+        country=country,
+        keywords=keywords,
+        status="running",
+        priority=priority,
+        weight=weight,
+        owner=owner,
+        owner_lease_expires_at=now + lease_s if owner is not None else None,
+    )
+    session.add(job)
+    session.flush()
+    distinct = list(dict.fromkeys(keywords))
+    if distinct:
+        session.execute(
+            JobTask.__table__.insert(),
+            [{"job_id": job.id, "keyword": kw, "status": PENDING} for kw in distinct],
+        )
+    return job.id, task_ids(session, job.id)
+
+
+def task_ids(session: Session, job_id: int) -> Dict[str, int]:
+    rows = session.execute(
+        select(JobTask.keyword, JobTask.id).where(JobTask.job_id == job_id)
+    ).all()
+    return {kw: task_id for kw, task_id in rows}
+
+
+def _claimable(now: float):
+    return or_(
+        JobTask.status == PENDING,
+        and_(JobTask.status == CLAIMED, JobTask.lease_expires_at < now),
+    )
+
+
+def claim_task(
+    session: Session,
+    task_id: int,
+    owner: str,
+    lease_s: float = DEFAULT_LEASE_S,
+    now: Optional[float] = None,
+) -> bool:
+    """Atomically take ``task_id`` for ``owner``; False if someone else holds it."""
+    now = time.time() if now is None else now
+    result = session.execute(
+        update(JobTask)
+        .where(JobTask.id == task_id, _claimable(now))
+        .values(
+            status=CLAIMED,
+            lease_owner=owner,
+            lease_expires_at=now + lease_s,
+            attempts=JobTask.attempts + 1,
+            run_id=None,
+        )
+    )
+    return result.rowcount == 1
+
+
+def set_task_run(session: Session, task_id: int, run_id: int):
+    session.execute(update(JobTask).where(JobTask.id == task_id).values(run_id=run_id))
+
+
+def complete_task(
+    session: Session, task_id: int, owner: str, result: Optional[List[Dict]]
+) -> bool:
+    """Record the outcome (``result`` None = failed) if ``owner`` still holds the lease."""
+    res = session.execute(
+        update(JobTask)
+        .where(
+            JobTask.id == task_id,
+            JobTask.status == CLAIMED,
+            JobTask.lease_owner == owner,
+        )
+        .values(
+            status=DONE if result is not None else FAILED,
+            result=result,
+            lease_expires_at=None,
+        )
+    )
+    return res.rowcount == 1
+
+
+def release_task(session: Session, task_id: int, owner: str):
+    """Give a claimed task back (e.g. cancelled on shutdown) without running it."""
+    session.execute(
+        update(JobTask)
+        .where(JobTask.id == task_id, JobTask.lease_owner == owner)
+        .where(JobTask.status == CLAIMED)
+        .values(status=PENDING, lease_owner=None, lease_expires_at=None)
+    )
+
+
+def renew_leases(session: Session, owner: str, lease_s: float = DEFAULT_LEASE_S) -> int:
+    """Extend every lease ``owner`` holds; returns how many were renewed."""
+    res = session.execute(
+        update(JobTask)
+        .where(JobTask.lease_owner == owner, JobTask.status == CLAIMED)
+        .values(lease_expires_at=time.time() + lease_s)
+    )
+    return res.rowcount
+
+
+def finish_job(session: Session, job_id: int) -> bool:
+    """Mark the job finished if every task is done or failed."""
+    res = session.execute(
+        update(Job)
+        .where(
+            Job.id == job_id,
+            Job.status == "running",
+            ~select(JobTask.id)
+            .where(JobTask.job_id == job_id, JobTask.status.in_((PENDING, CLAIMED)))
+            .exists(),
+        )
+        .values(status="finished", finished_at=func.now())
+    )
+    return res.rowcount == 1
+
+
+def cancel_job(session: Session, job_id: int) -> bool:
+    """Mark a running job and its unfinished tasks cancelled; False if not running.
+
+    Cancelled jobs are never resumed. Tasks already done keep their results.
+    """
+    res = session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == "running")
+        .values(status=CANCELLED, finished_at=func.now())
+    )
+    if res.rowcount != 1:
+        return False
+    session.execute(
+        update(JobTask)
+        .where(JobTask.job_id == job_id, JobTask.status.in_((PENDING, CLAIMED)))
+        .values(status=CANCELLED, lease_owner=None, lease_expires_at=None)
+    )
+    return True
+
+
+def job_results(session: Session, job_id: int) -> Dict[str, List[Dict]]:
+    """``keyword -> result`` for the tasks of ``job_id`` that are done."""
+    rows = session.execute(
+        select(JobTask.keyword, JobTask.result).where(
+            JobTask.job_id == job_id, JobTask.status == DONE
+        )
+    ).all()
+    return {kw: result or [] for kw, result in rows}
+
+
+def _adoptable(now: float):
+    return or_(
+        Job.owner.is_(None),
+        Job.owner_lease_expires_at.is_(None),
+        Job.owner_lease_expires_at < now,
+    )
+
+
+def adopt_job(
+    session: Session,
+    job_id: int,
+    owner: str,
+    lease_s: float = DEFAULT_LEASE_S,
+    now: Optional[float] = None,
+) -> bool:
+    """Take over a running job whose owner lease expired (or that ``owner`` holds)."""
+    now = time.time() if now is None else now
+    res = session.execute(
+        update(Job)
+        .where(
+            Job.id == job_id,
+            Job.status == "running",
+            or_(Job.owner == owner, _adoptable(now)),
+        )
+        .values(owner=owner, owner_lease_expires_at=now + lease_s)
+    )
+    return res.rowcount == 1
+
+
+def renew_job_leases(
+    session: Session, owner: str, lease_s: float = DEFAULT_LEASE_S
+) -> int:
+    """Extend the lease of every running job ``owner`` holds."""
+    res = session.execute(
+        update(Job)
+        .where(Job.owner == owner, Job.status == "running")
+        .values(owner_lease_expires_at=time.time() + lease_s)
+    )
+    return res.rowcount
+
+
+def release_jobs(session: Session, owner: str) -> int:
+    """Drop ``owner``'s job leases (clean shutdown) so others adopt at once."""
+    res = session.execute(
+        update(Job)
+        .where(Job.owner == owner, Job.status == "running")
+        .values(owner=None, owner_lease_expires_at=None)
+    )
+    return res.rowcount
+
+
+def resumable_jobs(session: Session, now: Optional[float] = None) -> List[Dict]:
+    """Running jobs nobody holds (owner lease expired) with a claimable task.
+
+    Each entry has id, country, keywords, priority, weight and the claimable
+    ``tasks`` (keyword -> task id) in keyword order.
+    """
+    now = time.time() if now is None else now
+    rows = session.execute(
+        select(
+            Job.id,
+            Job.country,
+            Job.keywords,
+            Job.priority,
+            Job.weight,
+            JobTask.keyword,
+            JobTask.id,
+        )
+        .join(JobTask, JobTask.job_id == Job.id)
+        .where(Job.status == "running", _adoptable(now), _claimable(now))
+        .order_by(Job.id, JobTask.id)
+    ).all()
+    jobs: Dict[int, Dict] = {}
+    for job_id, country, keywords, priority, weight, kw, task_id in rows:
+        entry = jobs.setdefault(
+            job_id,
+            {
+                "id": job_id,
+                "country": country,
+                "keywords": keywords,
+                "priority": priority or "normal",
+                "weight": weight or 1.0,
+                "tasks": {},
+            },
+        )
+        entry["tasks"][kw] = task_id
+    return list(jobs.values())
+
+
+def finish_completed_jobs(session: Session) -> List[int]:
+    """Close running jobs whose tasks are all settled (e.g. crash before finish)."""
+    running = session.execute(select(Job.id).where(Job.status == "running")).scalars()
+    return [job_id for job_id in list(running) if finish_job(session, job_id)]
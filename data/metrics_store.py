@@ -0,0 +1,223 @@
+"""Incrementally maintained run aggregates backing ``/metrics``.
+
+Every KeywordRun that is inserted as, or moves to, ``status="finished"`` is
+folded into its ``keyword_stats`` row inside the same transaction (via mapper
+events), so the endpoint reads O(keywords) rows instead of the whole history.
+Rows are updated optimistically: the ``version`` column guards the
+read-modify-write of the sketch against concurrent writers. Besides one row per
+keyword there is a ``GLOBAL_KEY`` row aggregating every run, so global
+percentiles come from a single sketch.
+"""
+
+from typing import Dict, Optional
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from data.models import Ad, KeywordRun, KeywordStat
+from data.persistence import dialect_insert
+from data.sketch import QuantileSketch
+
+MAX_RETRIES = 20
+# reserved keyword_stats.keyword holding the all-keywords aggregate
+GLOBAL_KEY = "__global__"
+
+_stats = KeywordStat.__table__
+
+
+def _ensure_row(connection, keyword: str):
+    native_insert = dialect_insert(connection.dialect.name)
+    if native_insert is not None:
+        stmt = native_insert(_stats).values(keyword=keyword)
+        connection.execute(stmt.on_conflict_do_nothing(index_elements=["keyword"]))
+        return
+    exists = connection.execute(
+        select(_stats.c.id).where(_stats.c.keyword == keyword)
+    ).first()
+    if exists is None:
+        connection.execute(_stats.insert().values(keyword=keyword))
+
+
+def record_run(
+    connection, keyword: Optional[str], duration: Optional[float], results_count
+):
+    """Fold one finished run into the keyword and global aggregates (no commit)."""
+    _record(connection, keyword or "", duration, results_count)
+    _record(connection, GLOBAL_KEY, duration, results_count)
+
+
+def _record(connection, key: str, duration: Optional[float], results_count):
+    _ensure_row(connection, key)
+    for _ in range(MAX_RETRIES):
+        row = connection.execute(
+            select(_stats.c.version, _stats.c.duration_sketch).where(
+                _stats.c.keyword == key
+            )
+        ).one()
+        values = {
+            "runs": _stats.c.runs + 1,
+            "results_sum": _stats.c.results_sum + int(results_count or 0),
+            "version": _stats.c.version + 1,
+        }
+        if duration is not None:
+            sketch = QuantileSketch.from_dict(row.duration_sketch)
+            sketch.add(duration)
+            values["duration_sum"] = _stats.c.duration_sum + float(duration)
+            values["duration_count"] = _stats.c.duration_count + 1
+            values["duration_sketch"] = sketch.to_dict()
+        result = connection.execute(
+            update(_stats)
+            .where(_stats.c.keyword == key, _stats.c.version == row.version)
+            .values(**values)
+        )
+        if result.rowcount == 1:
+            return
+    raise RuntimeError(f"could not update keyword_stats for {key!r}")
+
+
+@event.listens_for(KeywordRun, "after_insert")
+def _run_inserted(mapper, connection, target):
+    if target.status == "finished":
+        record_run(connection, target.keyword, target.duration_s, target.results_count)
+
+
+@event.listens_for(KeywordRun, "after_update")
+def _run_updated(mapper, connection, target):
+    if target.status != "finished":
+        return
+    history = inspect(target).attrs.status.history
+    # only count the transition into "finished", not later edits of the row
+    if history.added and "finished" not in (history.deleted or ()):
+        record_run(connection, target.keyword, target.duration_s, target.results_count)
+
+
+def read_metrics(session: Session) -> Dict:
+    """Read the stored aggregates; cost grows with keywords only."""
+    rows = session.execute(
+        select(
+            KeywordStat.keyword,
+            KeywordStat.runs,
+            KeywordStat.duration_sum,
+            KeywordStat.duration_count,
+            KeywordStat.results_sum,
+        ).where(KeywordStat.keyword != GLOBAL_KEY)
+    ).all()
+    per_keyword = {
+        row.keyword: {
+            "runs": row.runs,
+            "results": row.results_sum,
+            "avg_duration": (
+                row.duration_sum / row.duration_count if row.duration_count else None
+            ),
+        }
+        for row in rows
+    }
+    overall = read_sketch(session, GLOBAL_KEY)
+    return {
+        "total_runs": sum(pk["runs"] for pk in per_keyword.values()),
+        "avg_duration": overall.sum / overall.count if overall.count else None,
+        "sketch": overall,
+        "per_keyword": per_keyword,
+    }
+
+
+def read_sketch(session: Session, keyword: str) -> QuantileSketch:
+    """Duration sketch for one keyword (or ``GLOBAL_KEY``); empty if unknown."""
+    data = session.execute(
+        select(KeywordStat.duration_sketch).where(KeywordStat.keyword == keyword)
+    ).scalar()
+    return QuantileSketch.from_dict(data)
+
+
+def ads_per_keyword(session: Session) -> Dict[Optional[str], int]:
+    """``GROUP BY keyword`` count of ads (index-only on ix_ads_keyword_created_at)."""
+    rows = session.execute(
+        select(Ad.keyword, func.count(Ad.id)).group_by(Ad.keyword)
+    ).all()
+    return {keyword: int(count) for keyword, count in rows}
+
+
+def sql_keyword_breakdown(session: Session) -> Dict[str, Dict]:
+    """Per-keyword counters of finished runs computed entirely in SQL.
+
+    This is the exact answer keyword_stats maintains incrementally; it scans the
+    runs table (using ix_keyword_runs_keyword_duration) and is what rebuilds
+    and consistency checks use.
+    """
+    rows = session.execute(
+        select(
+            KeywordRun.keyword,
+            func.count(KeywordRun.id),
+            func.count(KeywordRun.duration_s),
+            func.sum(KeywordRun.duration_s),
+            func.avg(KeywordRun.duration_s),
+            func.sum(KeywordRun.results_count),
+        )
+        .where(KeywordRun.status == "finished")
+        .group_by(KeywordRun.keyword)
+    ).all()
+    return {
+        keyword
+        or "": {
+            "runs": int(runs),
+            "duration_count": int(duration_count),
+            "duration_sum": float(duration_sum or 0.0),
+            "avg_duration": float(avg) if avg is not None else None,
+            "results": int(results or 0),
+        }
+        for keyword, runs, duration_count, duration_sum, avg, results in rows
+    }
+
+
+def rebuild_keyword_stats(session: Session, chunk_size: int = 10000) -> int:
+    """Recompute keyword_stats from the keyword_runs history (no commit).
+
+    Used to backfill databases created before the aggregates existed. Counters
+    come from one GROUP BY; only the sketches need the durations themselves,
+    which are streamed in keyword order so one sketch is built at a time.
+    Returns the number of keywords written (not counting the global row).
+    """
+    session.execute(_stats.delete())
+    breakdown = sql_keyword_breakdown(session)
+    overall = QuantileSketch()
+    sketches: Dict[str, QuantileSketch] = {}
+    stream = session.execute(
+        select(KeywordRun.keyword, KeywordRun.duration_s)
+        .where(KeywordRun.status == "finished", KeywordRun.duration_s.is_not(None))
+        .order_by(KeywordRun.keyword)
+        .execution_options(yield_per=chunk_size)
+    )
+    for keyword, duration in stream:
+        key = keyword or ""
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = QuantileSketch()
+        sketch.add(duration)
+        overall.add(duration)
+
+    rows = [
+        {
+            "keyword": key,
+            "runs": stat["runs"],
+            "results_sum": stat["results"],
+            "duration_sum": stat["duration_sum"],
+            "duration_count": stat["duration_count"],
+            "duration_sketch": sketches.get(key, QuantileSketch()).to_dict(),
+            "version": 0,
+        }
+        for key, stat in breakdown.items()
+    ]
+    if breakdown:
+        rows.append(
+            {
+                "keyword": GLOBAL_KEY,
+                "runs": sum(stat["runs"] for stat in breakdown.values()),
+                "results_sum": sum(stat["results"] for stat in breakdown.values()),
+                "duration_sum": overall.sum,
+                "duration_count": overall.count,
+                "duration_sketch": overall.to_dict(),
+                "version": 0,
+            }
+        )
+        session.execute(_stats.insert(), rows)
+    return len(breakdown)
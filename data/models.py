@@ -1,8 +1,31 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, func, Float
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Text,
+    JSON,
+    func,
+    Float,
+    Index,
+    ForeignKey,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind datetimes in the same
+# format so keyset cursors compare equal to the server-generated values
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d "
+        "%(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 
 class Ad(Base):
     __tablename__ = "ads"
@@ -14,25 +37,45 @@ class Ad(Base):
     title = Column(String(1024))
     body = Column(Text)
     media_url = Column(String(2048))
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_ads_keyword_created_at", "keyword", "created_at"),
+        # keyset pagination order for /ads
+        Index("ix_ads_created_at_id", "created_at", "id"),
+    )
 
 
 class KeywordRun(Base):
     __tablename__ = "keyword_runs"
     id = Column(Integer, primary_key=True, index=True)
     keyword = Column(String(255), index=True)
-    started_at = Column(DateTime, server_default=func.now())
+    started_at = Column(Timestamp, server_default=func.now())
     duration_s = Column(Float)
     results_count = Column(Integer)
     status = Column(String(50), default="finished")
 
+    # covers per-keyword GROUP BY aggregates over durations without table lookups
+    __table_args__ = (
+        Index("ix_keyword_runs_keyword_duration", "keyword", "duration_s"),
+        # keyset pagination order for /runs
+        Index("ix_keyword_runs_started_at_id", "started_at", "id"),
+    )
+
 
 class Domain(Base):
     __tablename__ = "domains"
     id = Column(Integer, primary_key=True)
     domain = Column(String(255), unique=True, nullable=False)
-    ads_count = Column(Integer, default=0)
-    last_seen_at = Column(DateTime)
+    # maintained with the ads (see data.domain_store)
+    ads_count = Column(Integer, default=0, nullable=False)
+    last_seen_at = Column(Timestamp)
+
+    __table_args__ = (
+        # top-N / keyset orders for /domains
+        Index("ix_domains_ads_count_id", "ads_count", "id"),
+        Index("ix_domains_last_seen_at_id", "last_seen_at", "id"),
+    )
 
 
 class EventRecord(Base):
@@ -41,3 +84,76 @@ class EventRecord(Base):
     type = Column(String(255), index=True)
     payload = Column(JSON)
     created_at = Column(DateTime, server_default=func.now())
+
+
+class KeywordStat(Base):
+    """Per-keyword aggregates of finished KeywordRun rows (see data.metrics_store)."""
+
+    __tablename__ = "keyword_stats"
+    id = Column(Integer, primary_key=True)
+    keyword = Column(String(255), unique=True, nullable=False)
+    runs = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0.0)
+    duration_count = Column(Integer, nullable=False, default=0)
+    results_sum = Column(Integer, nullable=False, default=0)
+    duration_sketch = Column(JSON)
+    # optimistic-concurrency counter, bumped on every update
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class Job(Base):
+    """A start_keywords_job call, kept so unfinished runs survive a restart."""
+
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    country = Column(String(10))
+    # the keywords as requested (duplicates included), for events and resume
+    keywords = Column(JSON, nullable=False)
+    status = Column(String(50), nullable=False, default="running", index=True)
+    # scheduling class and fair-share weight (see backend.core.scheduler)
+    priority = Column(String(20), nullable=False, default="normal")
+    weight = Column(Float, nullable=False, default=1.0)
+    # the manager running the job; it renews the lease while it is alive and
+    # others only adopt the job once the lease has expired
+    owner = Column(String(255))
+    owner_lease_expires_at = Column(Float)  # epoch seconds
+    created_at = Column(Timestamp, server_default=func.now())
+    finished_at = Column(DateTime)
+
+
+class JobTask(Base):
+    """One distinct keyword of a Job, claimed by a worker under a lease."""
+
+    __tablename__ = "job_tasks"
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
+    keyword = Column(String(255), nullable=False)
+    # pending -> claimed -> done / failed; claimed with an expired lease is
+    # claimable again
+    status = Column(String(50), nullable=False, default="pending")
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(Float)  # epoch seconds
+    attempts = Column(Integer, nullable=False, default=0)
+    run_id = Column(Integer)
+    # the job.keyword_done "ads" payload, replayed for duplicate keywords
+    result = Column(JSON)
+
+    __table_args__ = (
+        UniqueConstraint("job_id", "keyword", name="uq_job_tasks_job_keyword"),
+        Index("ix_job_tasks_job_status", "job_id", "status"),
+    )
+
+
+class DataVersion(Base):
+    """Single-row counter bumped by every write to ads / keyword_runs.
+
+    Read endpoints use ``(epoch, version)`` to validate cached responses; the
+    epoch is new whenever the table is (re)created, so a rebuilt database
+    never matches responses cached against the old one.
+    """
+
+    __tablename__ = "data_version"
+    id = Column(Integer, primary_key=True)
+    epoch = Column(String(32), nullable=False)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,189 @@
+"""Batched persistence helpers for scraped ads.
+
+Adapters hand back plain dicts; these helpers turn them into ``ads`` rows and
+write them in batches instead of one SELECT + INSERT/UPDATE per ad. The
+``domains`` counters move in the same transaction: the native upsert adjusts
+them here, ORM writes through the mapper events in data.domain_store.
+"""
+
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from data.data_version import bump_data_version
+from data.models import Ad, Domain
+
+DEFAULT_BATCH_SIZE = 500
+
+# columns refreshed when an ad with the same unique_id is seen again
+AD_UPDATE_FIELDS = ("keyword", "country", "domain", "title", "body", "media_url")
+
+_NATIVE_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def dialect_insert(dialect_name: str):
+    """Return the dialect's ``insert`` supporting ON CONFLICT, or None."""
+    return _NATIVE_INSERTS.get(dialect_name)
+
+
+def ad_rows(ads: Iterable[Dict], keyword: str, country: str) -> List[Dict]:
+    """Normalise adapter results into ``ads`` rows.
+
+    Duplicated unique_ids inside the same result set collapse into one row (the
+    last one wins), mirroring what sequential upserts would have stored.
+    """
+    rows: Dict[str, Dict] = {}
+    for idx, ad in enumerate(ads):
+        unique_id = (
+            ad.get("unique_id") or ad.get("id") or f"{keyword}:{time.time()}:{idx}"
+        )
+        rows.pop(unique_id, None)
+        rows[unique_id] = {
+            "unique_id": unique_id,
+            "keyword": keyword,
+            "country": ad.get("country", country),
+            "domain": ad.get("domain"),
+            "title": ad.get("title"),
+            "body": ad.get("body"),
+            "media_url": ad.get("media_url"),
+        }
+    return list(rows.values())
+
+
+def upsert_ads(
+    session: Session, rows: List[Dict], batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Insert or update ``rows`` keyed on ``unique_id``; returns the row count.
+
+    SQLite and PostgreSQL use a native ``INSERT ... ON CONFLICT DO UPDATE``; other
+    dialects fall back to one ``WHERE unique_id IN (...)`` lookup per batch.
+    The caller owns the transaction (nothing is committed here); it also
+    carries the data_version bump that invalidates cached API responses and
+    the ``domains`` counter updates.
+    """
+    if rows:
+        bump_data_version(session)
+    native_insert = dialect_insert(session.get_bind().dialect.name)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        if native_insert is not None:
+            _upsert_native(session, native_insert, batch)
+        else:
+            _upsert_lookup(session, batch)
+    return len(rows)
+
+
+def _upsert_native(session: Session, native_insert, batch: List[Dict]):
+    # the domain each ad had before, to move its count when the domain changed
+    previous = dict(
+        session.execute(
+            select(Ad.unique_id, Ad.domain).where(
+                Ad.unique_id.in_([row["unique_id"] for row in batch])
+            )
+        ).all()
+    )
+    deltas: Counter = Counter()
+    for row in batch:
+        domain = row.get("domain")
+        if row["unique_id"] in previous:
+            old = previous[row["unique_id"]]
+            if old == domain:
+                continue
+            if old is not None:
+                deltas[old] -= 1
+        if domain is not None:
+            deltas[domain] += 1
+    seen = {row.get("domain") for row in batch} - {None}
+    update_domain_counts(session.connection(), deltas, seen)
+    stmt = native_insert(Ad)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Ad.unique_id],
+        set_={field: stmt.excluded[field] for field in AD_UPDATE_FIELDS},
+    )
+    # executemany lets the driver reuse one compiled statement for the batch
+    session.execute(stmt, batch)
+
+
+def _upsert_lookup(session: Session, batch: List[Dict]):
+    ids = [row["unique_id"] for row in batch]
+    existing = {
+        ad.unique_id: ad
+        for ad in session.scalars(select(Ad).where(Ad.unique_id.in_(ids)))
+    }
+    for row in batch:
+        ad = existing.get(row["unique_id"])
+        if ad is None:
+            session.add(Ad(**row))
+            continue
+        for field in AD_UPDATE_FIELDS:
+            setattr(ad, field, row[field])
+
+
+def _utcnow() -> datetime:
+    # naive UTC, like the server-side CURRENT_TIMESTAMP of ads.created_at
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def update_domain_counts(
+    connection,
+    deltas: Dict[str, int],
+    seen: Iterable[str] = (),
+    seen_at: Optional[datetime] = None,
+):
+    """Add ``deltas`` to ``domains.ads_count`` (no commit).
+
+    Domains in ``seen`` (ads of theirs were just written) are created when
+    missing and get ``last_seen_at = seen_at`` (now by default); the others
+    only have their counter adjusted.
+    """
+    seen = set(seen)
+    seen_at = seen_at or _utcnow()
+    table = Domain.__table__
+    if seen:
+        rows = [
+            {"domain": d, "ads_count": deltas.get(d, 0), "last_seen_at": seen_at}
+            for d in sorted(seen)
+        ]
+        native_insert = dialect_insert(connection.dialect.name)
+        if native_insert is not None:
+            stmt = native_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.domain],
+                set_={
+                    "ads_count": table.c.ads_count + stmt.excluded.ads_count,
+                    "last_seen_at": stmt.excluded.last_seen_at,
+                },
+            )
+            connection.execute(stmt, rows)
+        else:
+            for row in rows:
+                result = connection.execute(
+                    update(table)
+                    .where(table.c.domain == row["domain"])
+                    .values(
+                        ads_count=table.c.ads_count + row["ads_count"],
+                        last_seen_at=seen_at,
+                    )
+                )
+                if result.rowcount == 0:
+                    connection.execute(table.insert().values(**row))
+    changed = [
+        {"d": d, "delta": delta}
+        for d, delta in sorted(deltas.items())
+        if delta and d not in seen
+    ]
+    if changed:
+        connection.execute(
+            update(table)
+            .where(table.c.domain == bindparam("d"))
+            .values(ads_count=table.c.ads_count + bindparam("delta")),
+            changed,
+        )
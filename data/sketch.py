@@ -0,0 +1,183 @@
+"""Mergeable quantile sketch for run durations.
+
+Small samples are kept verbatim (quantiles are then exact, interpolated the
+same way the old /metrics code did); past ``exact_limit`` values the sketch
+switches to DDSketch-style logarithmic buckets, whose quantile estimates are
+within ``relative_accuracy`` of the true value. The number of buckets is capped
+at ``max_bins`` by folding the lowest ones together, so memory stays constant
+however many values are added; only quantiles that land in the folded low
+buckets lose the accuracy guarantee.
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_EXACT_LIMIT = 64
+# with 1% accuracy, 2048 buckets cover ~18 orders of magnitude
+DEFAULT_MAX_BINS = 2048
+# durations at or below this are counted in a single "zero" bucket
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+def _interpolate(sorted_values, q: float) -> float:
+    n = len(sorted_values)
+    idx = (n - 1) * q
+    lo = int(idx)
+    hi = min(lo + 1, n - 1)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] * (hi - idx) + sorted_values[hi] * (idx - lo)
+
+
+class QuantileSketch:
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        exact_limit: int = DEFAULT_EXACT_LIMIT,
+        max_bins: int = DEFAULT_MAX_BINS,
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.exact_limit = exact_limit
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        # exact samples while small; None once switched to buckets
+        self.values: Optional[list] = []
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+
+    def add(self, value: float):
+        value = float(value)
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.values is not None:
+            self.values.append(value)
+            if len(self.values) > self.exact_limit:
+                self._to_bins()
+        else:
+            self._add_to_bins(value, 1)
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.count == 0:
+            return
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        if self.values is not None and other.values is not None:
+            self.values.extend(other.values)
+            if len(self.values) > self.exact_limit:
+                self._to_bins()
+            return
+        if self.values is not None:
+            self._to_bins()
+        if other.values is not None:
+            for value in other.values:
+                self._add_to_bins(value, 1)
+        else:
+            self.zero_count += other.zero_count
+            for idx, n in other.bins.items():
+                self.bins[idx] = self.bins.get(idx, 0) + n
+            self._collapse()
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
+
+    def memory_bins(self) -> int:
+        """Number of stored buckets/samples (what bounds the sketch's size)."""
+        return len(self.values) if self.values is not None else len(self.bins)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("quantile must be between 0 and 1")
+        if self.values is not None:
+            return _interpolate(sorted(self.values), q)
+        rank = q * (self.count - 1)
+        if rank >= self.count - 1:
+            return self.max
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for idx in sorted(self.bins):
+            seen += self.bins[idx]
+            if rank < seen:
+                estimate = 2 * self.gamma**idx / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _add_to_bins(self, value: float, n: int):
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += n
+            return
+        idx = self._index(value)
+        if idx in self.bins:
+            self.bins[idx] += n
+            return
+        self.bins[idx] = n
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        # fold the lowest buckets into one so at most max_bins remain
+        if len(self.bins) <= self.max_bins:
+            return
+        ordered = sorted(self.bins)
+        keep = ordered[-(self.max_bins - 1) :] if self.max_bins > 1 else []
+        folded = ordered[: len(ordered) - len(keep)]
+        target = folded[-1]
+        self.bins[target] = sum(self.bins.pop(idx) for idx in folded)
+
+    def _to_bins(self):
+        values, self.values = self.values, None
+        for value in values:
+            self._add_to_bins(value, 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            "a": self.relative_accuracy,
+            "e": self.exact_limit,
+            "m": self.max_bins,
+            "n": self.count,
+            "s": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "v": self.values,
+            "b": {str(idx): n for idx, n in self.bins.items()},
+            "z": self.zero_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "QuantileSketch":
+        if not data:
+            return cls()
+        sketch = cls(
+            relative_accuracy=data["a"],
+            exact_limit=data["e"],
+            max_bins=data.get("m", DEFAULT_MAX_BINS),
+        )
+        sketch.count = data["n"]
+        sketch.sum = data["s"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.values = data["v"]
+        sketch.bins = {int(idx): n for idx, n in data["b"].items()}
+        sketch.zero_count = data["z"]
+        return sketch
@@ -0,0 +1,30 @@
+import argparse
+import os
+import sys
+
+# ensure project root is on sys.path so package imports work when running this script directly
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.transport import EventBroker
+
+
+def main():
+    # start once, then run the API, GUI and workers with
+    # V3_EVENT_BUS_URL=unix://<path> so they share one event stream
+    parser = argparse.ArgumentParser(description="Event bus broker")
+    parser.add_argument("--path", default="/tmp/v3-bus.sock")
+    args = parser.parse_args()
+    broker = EventBroker(args.path)
+    print(f"event broker listening on unix://{args.path}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
+
+
+if __name__ == "__main__":
+    main()
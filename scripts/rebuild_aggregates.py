@@ -0,0 +1,33 @@
+import os
+import sys
+
+# ensure project root is on sys.path so package imports work when running this script directly
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from data.db import SessionLocal, engine
+from data.domain_store import rebuild_domains
+from data.metrics_store import rebuild_keyword_stats
+from data.models import Base
+
+
+def rebuild():
+    # make sure aggregate tables and indexes added after the DB was created exist
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with SessionLocal() as session:
+        print("Rebuilding keyword_stats from keyword_runs...")
+        count = rebuild_keyword_stats(session)
+        session.commit()
+        print(f"Done ({count} keywords).")
+        print("Rebuilding domains from ads...")
+        count = rebuild_domains(session)
+        session.commit()
+        print(f"Done ({count} domains).")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -20,7 +20,7 @@ def main():
     from backend.core.job_manager import JobManager
 
     bus = get_event_bus()
-    mgr = JobManager(bus=bus, max_workers=2)
+    mgr = JobManager(bus=bus, max_workers=2, cache_ttl_s=300)
     mgr.start()
 
     stop = threading.Event()
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from app.events import EventBus
+from backend.core.adapters.cache import CachingAdapter
+
+
+class CountingAdapter:
+    name = "counting"
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return [{"unique_id": f"{keyword}:{country}:1", "title": "x" * 10}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_events():
+    bus = EventBus()
+    q = bus.register()
+    inner = CountingAdapter()
+    cache = CachingAdapter(inner, bus=bus)
+    first = cache.search("k1")
+    first[0]["title"] = "mutated"
+    assert cache.search("k1")[0]["title"] == "x" * 10
+    cache.search("k1", country="br")
+    assert inner.calls == 2
+    assert cache.stats()["hits"] == 1
+    events = [
+        (ev.type, ev.payload["hits"], ev.payload["misses"]) for ev in bus.drain()[0]
+    ]
+    assert events == [("cache.miss", 0, 1), ("cache.hit", 1, 1), ("cache.miss", 1, 2)]
+    bus.unregister(q)
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    inner = CountingAdapter()
+    cache = CachingAdapter(inner, ttl_s=10, clock=clock)
+    cache.search("k1")
+    clock.now = 9.9
+    cache.search("k1")
+    clock.now = 10.0
+    cache.search("k1")
+    assert inner.calls == 2
+
+
+def test_lru_bounds():
+    inner = CountingAdapter()
+    cache = CachingAdapter(inner, max_entries=2)
+    cache.search("a")
+    cache.search("b")
+    cache.search("a")  # a becomes most recent
+    cache.search("c")  # evicts b
+    assert cache.stats()["entries"] == 2
+    cache.search("a")
+    cache.search("b")
+    assert inner.calls == 4
+    assert cache.stats()["evictions"] == 2
+
+    size_one = CachingAdapter(CountingAdapter(), max_bytes=1)
+    size_one.search("a")
+    assert size_one.stats()["entries"] == 0
+
+
+def test_concurrent_lookups_share_one_search():
+    inner = CountingAdapter(delay=0.1)
+    cache = CachingAdapter(inner)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.search("k1")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert inner.calls == 1
+    assert len(results) == 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_errors_are_not_cached():
+    inner = CountingAdapter(fail=True)
+    cache = CachingAdapter(inner)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.search("k1")
+    assert inner.calls == 2
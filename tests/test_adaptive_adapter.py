@@ -0,0 +1,192 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.events import EventBus
+from backend.core.adapters.adaptive import AdaptiveAdapter
+from backend.core.adapters.mock_adapter import MockAdapter, ThrottledError
+
+
+class FlakyAdapter:
+    name = "flaky"
+
+    def __init__(self, failures: int, exc=ConnectionError):
+        self.failures = failures
+        self.exc = exc
+        self.calls = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.exc("boom")
+        return [{"unique_id": f"{keyword}:{country}:1"}]
+
+
+def test_retries_until_success_with_bounded_backoff():
+    delays = []
+    bus = EventBus()
+    q = bus.register(topics=["adapter.*"])
+    adapter = AdaptiveAdapter(
+        FlakyAdapter(failures=2),
+        bus=bus,
+        base_delay_s=1.0,
+        max_delay_s=1.5,
+        sleep=delays.append,
+    )
+    assert adapter.search("python") == [{"unique_id": "python:us:1"}]
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 1.0 and 0 <= delays[1] <= 1.5
+    stats = adapter.stats()
+    assert stats["retries"] == 2 and stats["failures"] == 2 and stats["successes"] == 1
+    retries = [e for e in q.get_batch(timeout=0) if e.type == "adapter.retry"]
+    assert [e.payload["attempt"] for e in retries] == [1, 2]
+
+
+def test_gives_up_after_max_retries():
+    inner = FlakyAdapter(failures=10)
+    adapter = AdaptiveAdapter(inner, max_retries=2, sleep=lambda s: None)
+    with pytest.raises(ConnectionError):
+        adapter.search("python")
+    assert inner.calls == 3
+
+
+def test_non_retryable_error_is_raised_immediately():
+    inner = FlakyAdapter(failures=1, exc=ValueError)
+    adapter = AdaptiveAdapter(inner, retry_on=(ThrottledError,), sleep=lambda s: None)
+    with pytest.raises(ValueError):
+        adapter.search("python")
+    assert inner.calls == 1
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type("Response", (), {"status_code": status})()
+
+
+@pytest.mark.parametrize(
+    "exc, transient",
+    [
+        (TimeoutError(), True),
+        (ConnectionResetError(), True),
+        (ThrottledError(), True),
+        (HTTPError(429), True),
+        (HTTPError(503), True),
+        (HTTPError(404), False),
+        (ValueError("bad keyword"), False),
+        (RuntimeError("bug"), False),
+    ],
+)
+def test_only_transient_errors_are_retried_by_default(exc, transient):
+    class Failing(FlakyAdapter):
+        def search(self, keyword, country="us"):
+            self.calls += 1
+            raise exc
+
+    inner = Failing(failures=0)
+    adapter = AdaptiveAdapter(
+        inner, initial_limit=8, max_retries=2, sleep=lambda s: None
+    )
+    with pytest.raises(type(exc)):
+        adapter.search("python")
+    assert inner.calls == (3 if transient else 1)
+    # a permanent error says nothing about congestion
+    assert adapter.limit == (4 if transient else 8)
+
+
+def test_limit_grows_additively_and_halves_on_failure():
+    now = [0.0]
+    adapter = AdaptiveAdapter(
+        FlakyAdapter(failures=0),
+        initial_limit=4,
+        max_limit=8,
+        max_retries=0,
+        clock=lambda: now[0],
+    )
+    for _ in range(4):
+        adapter.search("python")
+    assert adapter.limit == pytest.approx(5, abs=0.1)
+    for _ in range(200):
+        adapter.search("python")
+    assert adapter.limit == 8
+
+    adapter.adapter = FlakyAdapter(failures=10)
+    with pytest.raises(ConnectionError):
+        adapter.search("python")
+    assert adapter.limit == 4
+    # a second failure inside the cooldown is the same congestion episode
+    with pytest.raises(ConnectionError):
+        adapter.search("python")
+    assert adapter.limit == 4
+
+
+def test_slow_searches_reduce_the_limit():
+    now = [0.0]
+
+    class SlowAdapter(FlakyAdapter):
+        def search(self, keyword, country="us"):
+            now[0] += 2.0
+            return super().search(keyword, country)
+
+    adapter = AdaptiveAdapter(
+        SlowAdapter(failures=0),
+        initial_limit=8,
+        latency_target_s=1.0,
+        clock=lambda: now[0],
+    )
+    adapter.search("python")
+    assert adapter.limit == 4
+
+
+def test_converges_below_backend_capacity():
+    backend = MockAdapter(latency_s=0.01, capacity=3)
+    backend.start()
+    adapter = AdaptiveAdapter(
+        backend,
+        initial_limit=16,
+        cooldown_s=0.02,
+        base_delay_s=0.005,
+        max_retries=20,
+        retry_on=(ThrottledError,),
+    )
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda i: adapter.search(f"kw{i}"), range(160)))
+    assert all(len(r) == 1 for r in results)
+    stats = adapter.stats()
+    assert stats["failures"] > 0
+    assert stats["limit"] < 16
+    assert stats["in_flight"] == 0
+
+
+def test_waiting_callers_respect_the_limit():
+    release = threading.Event()
+    seen = []
+
+    class BlockingAdapter(FlakyAdapter):
+        def search(self, keyword, country="us"):
+            seen.append(keyword)
+            release.wait(5)
+            return []
+
+    adapter = AdaptiveAdapter(BlockingAdapter(failures=0), initial_limit=2)
+    threads = [
+        threading.Thread(target=adapter.search, args=(f"kw{i}",)) for i in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for _ in range(100):
+        if adapter.in_flight == 2:
+            break
+        threading.Event().wait(0.01)
+    assert adapter.in_flight == 2 and len(seen) == 2
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(seen) == 5 and adapter.stats()["peak_in_flight"] <= 3
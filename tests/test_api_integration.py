@@ -1,3 +1,7 @@
+import csv
+import io
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
@@ -55,9 +59,8 @@ def test_ads_runs_domains_metrics():
 
     # /domains
     resp = client.get("/domains")
-    domains = resp.json()
-    assert {"domain": "example.com", "count": 2} in domains
-    assert {"domain": "another.com", "count": 1} in domains
+    domains = [(d["domain"], d["count"]) for d in resp.json()]
+    assert domains == [("example.com", 2), ("another.com", 1)]
 
     # /metrics
     resp = client.get("/metrics")
@@ -67,3 +70,80 @@ def test_ads_runs_domains_metrics():
     assert "per_keyword" in metrics
     assert metrics["per_keyword"]["python"]["ads"] == 2
     assert metrics["per_keyword"]["tkinter"]["ads"] == 1
+
+
+def test_ads_keyset_pagination_and_filters():
+    with SessionLocal() as db:
+        db.add_all(
+            [
+                models.Ad(
+                    unique_id=f"ad{i}",
+                    keyword="even" if i % 2 == 0 else "odd",
+                    country="us",
+                    domain=f"d{i % 3}.com",
+                    title=f"Ad{i}",
+                )
+                for i in range(7)
+            ]
+        )
+        db.commit()
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 3}
+        if after:
+            params["after"] = after
+        resp = client.get("/ads", params=params)
+        assert resp.status_code == 200
+        page = resp.json()
+        assert len(page) <= 3
+        seen.extend(ad["id"] for ad in page)
+        after = resp.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+    # newest first (same created_at second, so ties fall back to id) without gaps
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == 7
+
+    resp = client.get("/ads", params={"keyword": "even", "domain": "d0.com"})
+    assert [ad["title"] for ad in resp.json()] == ["Ad6", "Ad0"]
+    assert client.get("/ads", params={"country": "br"}).json() == []
+    assert client.get("/ads", params={"after": "garbage"}).status_code == 422
+    assert client.get("/ads", params={"limit": 0}).status_code == 422
+
+
+def test_runs_pagination():
+    seed_data()
+    resp = client.get("/runs", params={"limit": 1})
+    assert len(resp.json()) == 1
+    cursor = resp.headers["X-Next-Cursor"]
+    resp = client.get("/runs", params={"limit": 1, "after": cursor})
+    assert len(resp.json()) == 1
+    assert "X-Next-Cursor" not in resp.headers
+    resp = client.get("/runs", params={"keyword": "python"})
+    assert [run["keyword"] for run in resp.json()] == ["python"]
+
+
+def test_export_ads_streams_ndjson_csv_and_gzip():
+    seed_data()
+    resp = client.get("/ads/export", params={"chunk_size": 2})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["unique_id"] for r in rows] == [
+        "python:example.com:1",
+        "python:example.com:2",
+        "tkinter:another.com:1",
+    ]
+
+    # incremental mode: only rows after the last id already synced
+    resp = client.get("/ads/export", params={"since_id": rows[0]["id"]})
+    assert len(resp.text.splitlines()) == 2
+
+    resp = client.get("/ads/export", params={"format": "csv", "gzip": True})
+    assert resp.headers["content-encoding"] == "gzip"
+    parsed = list(csv.DictReader(io.StringIO(resp.text)))
+    assert len(parsed) == 3 and parsed[2]["domain"] == "another.com"
+
+    assert client.get("/ads/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.events import EventBus
+from backend.core.adapters.base import AsyncAdapter, SyncAdapterShim, as_async_adapter
+from backend.core.adapters.mock_adapter import AsyncMockAdapter, MockAdapter
+from backend.core.async_job_manager import AsyncJobManager
+from data.db import SessionLocal, engine
+from data.models import Ad, Base, KeywordRun
+
+
+@pytest.fixture(autouse=True)
+def prepare_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+class CountingAdapter(AsyncMockAdapter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.peak = 0
+
+    async def search(self, keyword, country="us"):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await super().search(keyword, country)
+        finally:
+            self.active -= 1
+
+
+def test_as_async_adapter_wraps_sync_only():
+    assert isinstance(as_async_adapter(MockAdapter()), SyncAdapterShim)
+    adapter = AsyncMockAdapter()
+    assert as_async_adapter(adapter) is adapter
+    assert isinstance(adapter, AsyncAdapter)
+
+
+def test_shim_runs_sync_mock_adapter():
+    async def main():
+        shim = as_async_adapter(MockAdapter())
+        await shim.start()
+        results = await asyncio.gather(*(shim.search(f"k{i}") for i in range(4)))
+        await shim.stop()
+        return results
+
+    results = asyncio.run(main())
+    assert [r[0]["unique_id"] for r in results] == [f"k{i}:us:1" for i in range(4)]
+
+
+def test_searches_overlap_and_respect_semaphore():
+    adapter = CountingAdapter(latency_s=0.2)
+    bus = EventBus()
+    q = bus.register()
+
+    async def main():
+        mgr = AsyncJobManager(bus=bus, adapter=adapter, max_concurrency=30)
+        await mgr.start()
+        try:
+            return await mgr.run_keywords_job([f"kw{i}" for i in range(60)])
+        finally:
+            await mgr.shutdown()
+
+    results = asyncio.run(main())
+    assert len(results) == 60 and all(r is not None for r in results)
+    assert 1 < adapter.peak <= 30
+    types = [ev.type for ev in bus.drain()[0]]
+    assert types[0] == "job.started" and types[-1] == "job.finished"
+    assert types.count("job.keyword_done") == 60
+    bus.unregister(q)
+    with SessionLocal() as session:
+        assert session.query(Ad).count() == 60
+        assert session.query(KeywordRun).filter_by(status="finished").count() == 60
+
+
+class FailingAdapter(AsyncMockAdapter):
+    async def search(self, keyword, country="us"):
+        if keyword.startswith("bad"):
+            raise RuntimeError("adapter down")
+        return await super().search(keyword, country)
+
+
+def test_adapter_error_records_a_failed_run():
+    bus = EventBus()
+
+    async def main():
+        mgr = AsyncJobManager(bus=bus, adapter=FailingAdapter(latency_s=0.01))
+        await mgr.start()
+        try:
+            return await mgr.run_keywords_job(["good", "bad"])
+        finally:
+            await mgr.shutdown()
+
+    results = asyncio.run(main())
+    assert results[0] is not None and results[1] is None
+    with SessionLocal() as session:
+        runs = {r.keyword: r for r in session.query(KeywordRun).all()}
+    assert runs["good"].status == "finished"
+    assert runs["bad"].status == "failed" and runs["bad"].results_count == 0
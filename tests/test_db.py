@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import event, select, text
+
+from app.events import EventBus
+from backend.core.job_manager import JobManager, run_keyword
+from data import job_store
+from data.db import SessionLocal, engine, make_engine, unit_of_work
+from data.models import Ad, Base, JobTask, KeywordRun
+
+
+@pytest.fixture(autouse=True)
+def prepare_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+class OneAdAdapter:
+    name = "one"
+
+    def search(self, keyword, country="us"):
+        return [{"unique_id": f"{keyword}:{country}:1", "domain": "x.example.com"}]
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    eng = make_engine(
+        f"sqlite:///{tmp_path / 'tuned.db'}", sqlite_pragmas={"busy_timeout": 1234}
+    )
+    with eng.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # 1 = NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -64 * 1024
+    eng.dispose()
+
+
+def test_in_memory_sqlite_skips_file_only_pragmas():
+    eng = make_engine("sqlite://")
+    with eng.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_server_engine_gets_pool_settings():
+    pytest.importorskip("psycopg2")
+    eng = make_engine("postgresql://user:pw@localhost/db", pool_size=3)
+    assert eng.pool.size() == 3
+    assert eng.pool._pre_ping
+
+
+def test_unit_of_work_rolls_back_on_error():
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as session:
+            session.add(KeywordRun(keyword="a", status="finished"))
+            session.flush()
+            raise RuntimeError("boom")
+    with SessionLocal() as session:
+        assert session.query(KeywordRun).count() == 0
+
+
+def test_keyword_run_is_one_transaction():
+    with SessionLocal() as session:
+        job_id, tasks = job_store.create_job(session, ["python"], "US")
+        job_store.claim_task(session, tasks["python"], "me")
+        session.commit()
+
+    commits = []
+    listener = lambda conn: commits.append(conn)  # noqa: E731
+    event.listen(engine, "commit", listener)
+    try:
+        result = run_keyword(
+            EventBus(),
+            OneAdAdapter(),
+            "python",
+            "US",
+            task_id=tasks["python"],
+            owner="me",
+        )
+    finally:
+        event.remove(engine, "commit", listener)
+
+    assert result == [{"unique_id": "python:US:1"}]
+    assert len(commits) == 1
+    with SessionLocal() as session:
+        task = session.get(JobTask, tasks["python"])
+        run = session.execute(select(KeywordRun)).scalar_one()
+        assert task.status == "done" and task.run_id == run.id
+        assert run.status == "finished" and run.results_count == 1
+        assert run.started_at is not None
+        assert session.query(Ad).count() == 1
+
+
+def test_failed_keyword_is_recorded_and_settles_its_task():
+    class Broken:
+        name = "broken"
+
+        def start(self):
+            pass
+
+        def search(self, keyword, country="us"):
+            raise RuntimeError("down")
+
+    bus = EventBus()
+    q = bus.register(topics=["job.finished"])
+    mgr = JobManager(bus=bus, max_workers=1, adapter=Broken())
+    job_id = mgr.start_keywords_job(["python"])
+    assert q.get(timeout=5).payload["complete"]
+    mgr.shutdown()
+    with SessionLocal() as session:
+        run = session.execute(select(KeywordRun)).scalar_one()
+        assert run.status == "failed"
+        assert session.query(JobTask).filter_by(job_id=job_id).one().status == "failed"
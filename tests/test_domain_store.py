@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.etapa4_service.main import app
+from data.db import SessionLocal, engine
+from data.domain_store import rebuild_domains, sql_domain_counts
+from data.models import Ad, Base, Domain
+from data.persistence import ad_rows, upsert_ads
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def stored_counts(session):
+    return {d.domain: d.ads_count for d in session.query(Domain) if d.ads_count != 0}
+
+
+def upsert(*ads):
+    with SessionLocal() as session:
+        upsert_ads(session, ad_rows(ads, "k", "BR"))
+        session.commit()
+
+
+def test_bulk_upsert_counts_new_ads_and_moves_changed_domains():
+    upsert(
+        {"unique_id": "a", "domain": "x.com"},
+        {"unique_id": "b", "domain": "x.com"},
+        {"unique_id": "c", "domain": "y.com"},
+        {"unique_id": "d"},
+    )
+    # seen again: "a" unchanged, "b" moved to y.com, "d" gained a domain
+    upsert(
+        {"unique_id": "a", "domain": "x.com"},
+        {"unique_id": "b", "domain": "y.com"},
+        {"unique_id": "d", "domain": "z.com"},
+    )
+    with SessionLocal() as session:
+        assert stored_counts(session) == {"x.com": 1, "y.com": 2, "z.com": 1}
+        assert stored_counts(session) == sql_domain_counts(session)
+        assert session.query(Domain).filter_by(domain="x.com").one().last_seen_at
+
+
+def test_orm_writes_keep_counters_in_sync():
+    with SessionLocal() as session:
+        session.add_all(
+            [
+                Ad(unique_id="a", domain="x.com"),
+                Ad(unique_id="b", domain="x.com"),
+                Ad(unique_id="c", domain="y.com"),
+            ]
+        )
+        session.commit()
+        ad = session.query(Ad).filter_by(unique_id="b").one()
+        ad.domain = "y.com"
+        session.commit()
+        session.delete(session.query(Ad).filter_by(unique_id="a").one())
+        session.commit()
+        assert stored_counts(session) == {"y.com": 2}
+        assert stored_counts(session) == sql_domain_counts(session)
+
+
+def test_rebuild_repairs_drift():
+    upsert({"unique_id": "a", "domain": "x.com"}, {"unique_id": "b", "domain": "y.com"})
+    with SessionLocal() as session:
+        session.query(Domain).filter_by(domain="x.com").update({"ads_count": 7})
+        session.add(Domain(domain="gone.com", ads_count=3))
+        session.commit()
+        assert rebuild_domains(session) == 2
+        session.commit()
+        assert stored_counts(session) == {"x.com": 1, "y.com": 1}
+
+
+def test_domains_endpoint_top_n_sorting_and_pages():
+    upsert(
+        *(
+            {"unique_id": f"{d}{i}", "domain": f"{d}.com"}
+            for d, n in (("a", 1), ("b", 3), ("c", 2), ("d", 2))
+            for i in range(n)
+        )
+    )
+    top = client.get("/domains", params={"limit": 2})
+    # ties on the count go to the newer domain row (higher id) first
+    assert [(d["domain"], d["count"]) for d in top.json()] == [
+        ("b.com", 3),
+        ("d.com", 2),
+    ]
+    rest = client.get(
+        "/domains", params={"limit": 2, "after": top.headers["x-next-cursor"]}
+    )
+    assert [d["domain"] for d in rest.json()] == ["c.com", "a.com"]
+    assert "x-next-cursor" not in rest.headers
+
+    by_name = client.get("/domains", params={"sort": "domain", "limit": 3})
+    assert [d["domain"] for d in by_name.json()] == ["a.com", "b.com", "c.com"]
+    last = client.get(
+        "/domains",
+        params={"sort": "domain", "after": by_name.headers["x-next-cursor"]},
+    )
+    assert [d["domain"] for d in last.json()] == ["d.com"]
+
+    assert len(client.get("/domains", params={"sort": "last_seen"}).json()) == 4
+    assert client.get("/domains", params={"sort": "size"}).status_code == 422
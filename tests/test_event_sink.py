@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.events import Event, EventBus
+from backend.core.event_sink import EventSink
+from data.db import SessionLocal, engine
+from data.models import Base, EventRecord
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+class BlockingSessions:
+    """Session factory that stalls the writer until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.release.wait(5)
+        return SessionLocal()
+
+
+def test_events_are_persisted_in_batches():
+    bus = EventBus()
+    sink = EventSink(bus=bus, batch_size=10, flush_interval_s=0.05)
+    sink.start()
+    for i in range(25):
+        bus.publish(Event(type="job.progress", payload={"i": i, "obj": object()}))
+    sink.stop()
+
+    stats = sink.stats()
+    assert stats["written"] == 25
+    assert stats["batches"] >= 3
+    with SessionLocal() as session:
+        rows = session.query(EventRecord).order_by(EventRecord.id).all()
+    assert [r.payload["i"] for r in rows] == list(range(25))
+    # non-JSON values are stored as strings instead of failing the batch
+    assert rows[0].payload["obj"].startswith("<object")
+
+
+def test_overflow_drops_without_blocking_publish():
+    bus = EventBus()
+    sessions = BlockingSessions()
+    sink = EventSink(bus=bus, batch_size=5, max_pending=5, session_factory=sessions)
+    sink.start()
+    for i in range(50):
+        bus.publish(Event(type="t", payload={"i": i}))
+    assert sink.stats()["dropped"] > 0
+    sessions.release.set()
+    sink.stop()
+    stats = sink.stats()
+    assert stats["written"] + stats["dropped"] == 50
+
+
+def test_overflow_spills_and_replays(tmp_path):
+    spill = str(tmp_path / "events.spill")
+    bus = EventBus()
+    sessions = BlockingSessions()
+    sink = EventSink(
+        bus=bus,
+        batch_size=5,
+        max_pending=10,
+        spill_path=spill,
+        session_factory=sessions,
+    )
+    sink.start()
+    t0 = time.monotonic()
+    # fits in the queue plus the overflow buffer (max_pending each)
+    for i in range(20):
+        bus.publish(Event(type="t", payload={"i": i}))
+    # publish does no file I/O: the stalled writer thread spills later
+    assert time.monotonic() - t0 < 1
+    assert sink.stats()["overflowed"] > 0 and sink.stats()["spilled"] == 0
+    sessions.release.set()
+    sink.stop()
+    assert sink.stats()["spilled"] > 0 and sink.stats()["dropped"] == 0
+
+    # the next sink start re-ingests the spill file
+    replay = EventSink(bus=bus, spill_path=spill)
+    replay.start()
+    replay.stop()
+    with SessionLocal() as session:
+        assert session.query(EventRecord).count() == 20
+
+
+def test_replay_skips_bad_lines_and_keeps_an_interrupted_replay(tmp_path):
+    spill = tmp_path / "events.spill"
+    line = '{"type": "t", "payload": {"i": %d}, "timestamp": 1.0}\n'
+    # left over by a replay that crashed half-way
+    (tmp_path / "events.spill.replay").write_text(line % 0 + "not json\n")
+    spill.write_text(line % 1 + '{"type": "t", "payl' + "\n" + line % 2)
+    sink = EventSink(bus=EventBus(), spill_path=str(spill))
+    sink.start()
+    sink.stop()
+
+    assert sink.stats()["replay_errors"] == 2
+    assert not os.listdir(tmp_path)
+    with SessionLocal() as session:
+        rows = session.query(EventRecord).order_by(EventRecord.id).all()
+    assert [r.payload["i"] for r in rows] == [0, 1, 2]
+
+
+def test_created_at_is_naive_utc_and_payload_encoded_once():
+    bus = EventBus()
+    sink = EventSink(bus=bus, flush_interval_s=0.01)
+    sink.start()
+    ts = 1700000000.25
+    bus.publish(Event(type="t", payload={"when": datetime(2024, 1, 2)}, timestamp=ts))
+    sink.stop()
+    with SessionLocal() as session:
+        row = session.query(EventRecord).one()
+    expected = datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+    assert row.created_at == expected
+    # stored as a JSON object, not as a JSON string holding one
+    assert row.payload == json.loads(json.dumps({"when": "2024-01-02 00:00:00"}))
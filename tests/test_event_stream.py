@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.events import Event, EventBus
+from backend.etapa4_service import main
+from backend.etapa4_service.event_stream import RESET, EventStreamHub, format_sse
+
+
+async def take(client, n, heartbeat_s=5.0):
+    out = []
+    stream = client.stream(heartbeat_s)
+    while len(out) < n:
+        out.append(await asyncio.wait_for(stream.__anext__(), 5))
+    await stream.aclose()
+    return out
+
+
+def types(items):
+    return [None if item is None else item[1].type for item in items]
+
+
+def test_fans_out_with_topic_filters_and_ids():
+    async def scenario():
+        hub = EventStreamHub(EventBus())
+        jobs = hub.connect(["job.*"])
+        everything = hub.connect()
+        hub.dispatch([Event("job.started", {}), Event("adapter.limit", {})])
+        hub.dispatch([Event("job.finished", {"results": 3})])
+        got_jobs = await take(jobs, 2)
+        got_all = await take(everything, 3)
+        return hub, got_jobs, got_all
+
+    hub, got_jobs, got_all = asyncio.run(scenario())
+    assert types(got_jobs) == ["job.started", "job.finished"]
+    assert [i for i, _ in got_all] == [f"{hub.epoch}-{n}" for n in (1, 2, 3)]
+
+
+def test_resume_replays_missed_events_once():
+    async def scenario():
+        hub = EventStreamHub(EventBus())
+        hub.dispatch([Event(f"job.e{n}", {}) for n in range(5)])
+        client = hub.connect(last_event_id=f"{hub.epoch}-3")
+        hub.dispatch([Event("job.e5", {})])
+        return await take(client, 3)
+
+    assert types(asyncio.run(scenario())) == ["job.e3", "job.e4", "job.e5"]
+
+
+@pytest.mark.parametrize(
+    "last_id, reason",
+    [("deadbeef-1", "unknown_id"), ("{epoch}-1", "expired")],
+)
+def test_resume_that_can_not_be_exact_starts_with_a_reset(last_id, reason):
+    async def scenario():
+        hub = EventStreamHub(EventBus(), replay_size=2)
+        hub.dispatch([Event(f"job.e{n}", {}) for n in range(4)])
+        client = hub.connect(last_event_id=last_id.format(epoch=hub.epoch))
+        hub.dispatch([Event("job.e4", {})])
+        return await take(client, 2 if reason == "unknown_id" else 4)
+
+    items = asyncio.run(scenario())
+    assert items[0][1].type == RESET and items[0][1].payload["reason"] == reason
+    assert types(items)[-1] == "job.e4"
+
+
+def test_slow_client_buffer_is_bounded_and_signals_the_gap():
+    async def scenario():
+        hub = EventStreamHub(EventBus(), client_maxsize=3)
+        client = hub.connect()
+        hub.dispatch([Event(f"job.e{n}", {}) for n in range(10)])
+        return await take(client, 4)
+
+    items = asyncio.run(scenario())
+    assert types(items) == [RESET, "job.e7", "job.e8", "job.e9"]
+
+
+def test_heartbeat_on_silence_and_disconnect():
+    async def scenario():
+        hub = EventStreamHub(EventBus())
+        client = hub.connect()
+        items = await take(client, 1, heartbeat_s=0.01)
+        client.close()
+        return hub, items
+
+    hub, items = asyncio.run(scenario())
+    assert items == [None]
+    assert hub.stats()["clients"] == 0
+
+
+def test_sse_format():
+    frame = format_sse("ab-7", Event("job.finished", {"n": 1}, timestamp=1.0))
+    lines = frame.split("\n")
+    assert lines[:2] == ["id: ab-7", "event: job.finished"]
+    assert json.loads(lines[2][len("data: ") :])["payload"] == {"n": 1}
+    assert frame.endswith("\n\n")
+
+
+def test_websocket_stream_pushes_bus_events(monkeypatch):
+    bus = EventBus()
+    hub = EventStreamHub(bus)
+    hub.start()
+    monkeypatch.setattr(main, "_event_hub", hub)
+    try:
+        with TestClient(main.app).websocket_connect(
+            "/events/stream?topics=job.*"
+        ) as ws:
+            # the client registers once the endpoint runs
+            deadline = time.monotonic() + 5
+            while hub.stats()["clients"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            bus.publish(Event("scheduler.tick", {}))
+            bus.publish(Event("job.finished", {"job_id": "j1"}))
+            message = json.loads(ws.receive_text())
+        assert message["type"] == "job.finished"
+        assert message["payload"] == {"job_id": "j1"}
+        assert message["id"] == f"{hub.epoch}-2"
+    finally:
+        hub.stop()
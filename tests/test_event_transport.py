@@ -0,0 +1,175 @@
+import multiprocessing
+import queue
+import socket
+import time
+
+import pytest
+
+from app.codec import decode_event, encode_event
+from app.events import Event, EventBus
+from app.transport import EventBroker, MultiprocessingHub, SocketTransport
+
+
+def test_codec_round_trip():
+    ev = Event(
+        type="job.keyword_done",
+        payload={
+            "keyword": "café",
+            "count": 3,
+            "big": 2**40,
+            "huge": 2**80,
+            "ratio": 0.5,
+            "ok": True,
+            "missing": None,
+            "ads": [{"unique_id": "a"}, {"unique_id": "b"}],
+            "raw": b"\x00\x01",
+        },
+    )
+    decoded = decode_event(encode_event(ev))
+    assert decoded == ev
+
+
+def test_codec_stringifies_unknown_values():
+    decoded = decode_event(
+        encode_event(Event(type="t", payload={"e": ValueError("x")}))
+    )
+    assert decoded.payload == {"e": "x"}
+
+
+def test_codec_rejects_trailing_bytes():
+    with pytest.raises(ValueError):
+        decode_event(encode_event(Event(type="t", payload=1)) + b"N")
+
+
+def test_socket_broker_relays_between_buses(tmp_path):
+    path = str(tmp_path / "bus.sock")
+    broker = EventBroker(path)
+    broker.start()
+    a = EventBus(transport=SocketTransport(path))
+    b = EventBus(transport=SocketTransport(path))
+    try:
+        sub_a = a.register()
+        sub_b = b.register(topics=["job.*"])
+        a.publish(Event(type="job.progress", payload={"keyword": "k1"}))
+        a.publish(Event(type="cache.hit", payload={}))
+        received = sub_b.get(timeout=2)
+        assert received.type == "job.progress"
+        assert received.payload == {"keyword": "k1"}
+        # local subscribers still see local events, and nothing echoes back
+        assert [ev.type for ev in sub_a.get_batch(10, timeout=0.1)] == [
+            "job.progress",
+            "cache.hit",
+        ]
+        assert sub_a.get_batch(10, timeout=0.1) == []
+    finally:
+        a.close()
+        b.close()
+        broker.close()
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_stalled_client_does_not_hold_up_the_others(tmp_path):
+    path = str(tmp_path / "bus.sock")
+    broker = EventBroker(path, client_maxsize=1500)
+    broker.start()
+    # connected but never reads: its socket buffers fill up quickly
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(path)
+    a = EventBus(transport=SocketTransport(path))
+    b = EventBus(transport=SocketTransport(path))
+    try:
+        inbox = b.register(maxsize=0)
+        assert wait_until(lambda: len(broker._peers) == 3)
+        blob = "x" * 2000
+        t0 = time.monotonic()
+        for n in range(2000):
+            a.publish(Event(type="job.progress", payload={"n": n, "blob": blob}))
+        assert time.monotonic() - t0 < 2  # publish only queues
+        seen = []
+        while len(seen) < 2000:
+            batch = inbox.get_batch(1000, timeout=5)
+            assert batch, f"relay stalled after {len(seen)} events"
+            seen.extend(ev.payload["n"] for ev in batch)
+        assert seen == list(range(2000))
+        assert broker.dropped > 0  # the stalled client's overflow
+    finally:
+        stalled.close()
+        a.close()
+        b.close()
+        broker.close()
+
+
+def test_bus_works_locally_until_the_broker_comes_up(tmp_path):
+    path = str(tmp_path / "bus.sock")
+    a = EventBus(
+        transport=SocketTransport(path, reconnect_min_s=0.5, reconnect_max_s=0.5)
+    )
+    broker = EventBroker(path)
+    b = None
+    try:
+        local = a.register()
+        a.publish(Event(type="job.started", payload={}))
+        assert local.get(timeout=1).type == "job.started"
+        assert not a.transport.connected
+
+        broker.start()
+        # b joins well before a's next reconnect attempt
+        b = EventBus(transport=SocketTransport(path, reconnect_max_s=0.1))
+        remote = b.register()
+        assert wait_until(lambda: len(broker._peers) == 1)
+        assert wait_until(lambda: a.transport.connected)
+        # queued while the broker was down, flushed on connect
+        assert remote.get(timeout=2).type == "job.started"
+        a.publish(Event(type="job.finished", payload={}))
+        assert remote.get(timeout=2).type == "job.finished"
+
+        # broker restart: both sides reconnect
+        broker.close()
+        assert wait_until(lambda: not a.transport.connected)
+        broker = EventBroker(path)
+        broker.start()
+        assert wait_until(lambda: a.transport.connected and b.transport.connected)
+        assert wait_until(lambda: len(broker._peers) == 2)
+        a.publish(Event(type="job.progress", payload={}))
+        assert remote.get(timeout=2).type == "job.progress"
+    finally:
+        a.close()
+        if b is not None:
+            b.close()
+        broker.close()
+
+
+def _child(hub):
+    bus = EventBus(transport=hub.transport(1))
+    inbox = bus.register(topics=["ping"])
+    # events that arrive before a subscriber registers are not kept
+    bus.publish(Event(type="ready", payload={}))
+    ping = inbox.get(timeout=5)
+    bus.publish(Event(type="pong", payload={"echo": ping.payload["n"]}))
+    bus.close()
+
+
+def test_multiprocessing_hub_between_processes():
+    ctx = multiprocessing.get_context("fork")
+    hub = MultiprocessingHub(2, context=ctx)
+    bus = EventBus(transport=hub.transport(0))
+    inbox = bus.register(topics=["ready", "pong"])
+    child = ctx.Process(target=_child, args=(hub,))
+    child.start()
+    try:
+        assert inbox.get(timeout=5).type == "ready"
+        bus.publish(Event(type="ping", payload={"n": 7}))
+        try:
+            pong = inbox.get(timeout=5)
+        except queue.Empty:
+            pytest.fail("no reply from child process")
+        assert pong.payload == {"echo": 7}
+    finally:
+        child.join(5)
+        bus.close()
@@ -0,0 +1,196 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from app.events import (
+    BLOCK,
+    COALESCE,
+    DROP_NEWEST,
+    DROP_OLDEST,
+    Event,
+    EventBus,
+    Subscription,
+    get_event_bus,
+    run_batch_consumer_loop,
+)
+
+
+def bus_items(sub):
+    out = []
+    while True:
+        try:
+            out.append(sub.get_nowait())
+        except queue.Empty:
+            return out
+
+
+def _ids(sub):
+    return [ev.payload["i"] for ev in bus_items(sub)]
+
+
+def test_every_subscriber_gets_every_event():
+    bus = EventBus()
+    a, b = bus.register(), bus.register()
+    for i in range(5):
+        bus.publish(Event(type="t", payload={"i": i}))
+    assert _ids(a) == _ids(b) == list(range(5))
+    bus.unregister(a)
+    bus.publish(Event(type="t", payload={"i": 5}))
+    assert a.qsize() == 0 and b.qsize() == 1
+
+
+def test_drop_oldest_keeps_latest_events():
+    bus = EventBus()
+    sub = bus.register(maxsize=3, policy=DROP_OLDEST)
+    for i in range(10):
+        bus.publish(Event(type="t", payload={"i": i}))
+    assert _ids(sub) == [7, 8, 9]
+    stats = sub.stats()
+    assert stats["dropped"] == 7 and stats["max_lag"] == 3 and stats["lag"] == 0
+
+
+def test_drop_newest_keeps_earliest_events():
+    sub = Subscription(maxsize=3, policy=DROP_NEWEST)
+    for i in range(10):
+        sub.put(Event(type="t", payload={"i": i}))
+    assert _ids(sub) == [0, 1, 2]
+    assert sub.stats()["dropped"] == 7
+
+
+def test_coalesce_replaces_pending_event_in_place():
+    sub = Subscription(
+        maxsize=10,
+        policy=COALESCE,
+        key=lambda ev: ev.payload.get("k"),
+    )
+    sub.put(Event(type="t", payload={"i": 0, "k": "a"}))
+    sub.put(Event(type="t", payload={"i": 1}))
+    sub.put(Event(type="t", payload={"i": 2, "k": "a"}))
+    sub.put(Event(type="t", payload={"i": 3}))
+    assert _ids(sub) == [2, 1, 3]
+    assert sub.stats()["coalesced"] == 1
+    # once delivered, the key no longer coalesces
+    sub.put(Event(type="t", payload={"i": 4, "k": "a"}))
+    assert _ids(sub) == [4]
+
+
+def test_coalesce_requires_key():
+    with pytest.raises(ValueError):
+        Subscription(policy=COALESCE)
+
+
+def test_block_policy_waits_for_room_then_drops_on_timeout():
+    sub = Subscription(maxsize=1, policy=BLOCK, block_timeout=0.05)
+    sub.put(Event(type="t", payload={"i": 0}))
+    started = time.monotonic()
+    sub.put(Event(type="t", payload={"i": 1}))
+    assert time.monotonic() - started >= 0.04
+    assert sub.stats()["dropped"] == 1
+
+    threading.Timer(0.05, sub.get).start()
+    sub.put(Event(type="t", payload={"i": 2}), timeout=2)
+    assert _ids(sub) == [2]
+
+
+def test_slow_subscriber_does_not_stall_publish():
+    bus = EventBus()
+    slow = bus.register(maxsize=10)
+    fast = bus.register(maxsize=0)
+    for i in range(1000):
+        bus.publish(Event(type="t", payload={"i": i}))
+    assert fast.qsize() == 1000
+    assert slow.qsize() == 10
+    assert [s["dropped"] for s in bus.stats()] == [990, 0]
+
+
+def test_get_timeout_raises_empty():
+    sub = Subscription()
+    with pytest.raises(queue.Empty):
+        sub.get(timeout=0.01)
+
+
+def test_topic_subscriptions_only_receive_matching_events():
+    bus = EventBus()
+    intents = bus.register(topics=["intent.*"])
+    finished = bus.register(topics=["job.finished"])
+    everything = bus.register()
+    for etype in ("intent.start_run", "job.progress", "job.finished", "intentional"):
+        bus.publish(Event(type=etype, payload={}))
+
+    def types(sub):
+        return [ev.type for ev in bus_items(sub)]
+
+    assert types(intents) == ["intent.start_run"]
+    assert types(finished) == ["job.finished"]
+    assert len(types(everything)) == 4
+
+
+def test_routes_follow_register_and_unregister():
+    bus = EventBus()
+    first = bus.register(topics=["job.*"])
+    bus.publish(Event(type="job.progress", payload={}))  # route now cached
+    second = bus.register(topics=["job.progress"])
+    bus.publish(Event(type="job.progress", payload={}))
+    assert first.qsize() == 2 and second.qsize() == 1
+    bus.unregister(first)
+    bus.publish(Event(type="job.progress", payload={}))
+    assert first.qsize() == 2 and second.qsize() == 2
+
+
+def test_get_batch_drains_up_to_max_items():
+    sub = Subscription()
+    for i in range(10):
+        sub.put(Event(type="t", payload={"i": i}))
+    assert [ev.payload["i"] for ev in sub.get_batch(4)] == [0, 1, 2, 3]
+    assert len(sub.get_batch(100)) == 6
+    assert sub.get_batch(100, timeout=0.01) == []
+    assert sub.stats()["delivered"] == 10
+
+
+def test_close_wakes_waiting_consumer_and_blocked_producer():
+    sub = Subscription(maxsize=1, policy=BLOCK)
+    sub.put(Event(type="t", payload={}))
+    producer = threading.Thread(target=sub.put, args=(Event(type="t", payload={}),))
+    producer.start()
+    threading.Timer(0.05, sub.close).start()
+    producer.join(2)
+    assert not producer.is_alive()
+    assert len(sub.get_batch()) == 1
+    # closed and drained: returns at once instead of blocking
+    assert sub.get_batch() == []
+
+
+def test_batch_consumer_loop_delivers_lists_and_stops_immediately():
+    bus = get_event_bus()
+    batches = []
+    got_all = threading.Event()
+
+    def consumer(batch):
+        batches.append([ev.payload["i"] for ev in batch])
+        if sum(len(b) for b in batches) == 100:
+            got_all.set()
+
+    stop = threading.Event()
+    t = threading.Thread(
+        target=run_batch_consumer_loop,
+        args=(consumer, stop),
+        kwargs={"topics": ["test.batch"], "max_batch": 32},
+        daemon=True,
+    )
+    t.start()
+    while not bus._route("test.batch"):
+        # wait until the loop has registered its subscription
+        time.sleep(0.005)
+    for i in range(100):
+        bus.publish(Event(type="test.batch", payload={"i": i}))
+    assert got_all.wait(2)
+    assert [i for b in batches for i in b] == list(range(100))
+    assert max(len(b) for b in batches) <= 32
+
+    started = time.monotonic()
+    stop.set()
+    t.join(2)
+    assert not t.is_alive()
+    assert time.monotonic() - started < 0.2
@@ -0,0 +1,253 @@
+import threading
+import time
+
+import pytest
+
+from app.events import Event, EventBus
+from backend.core.job_manager import JobManager
+from data.db import engine
+from data.models import Base
+
+
+@pytest.fixture(autouse=True)
+def prepare_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+class SlowAdapter:
+    """Adapter stub that records how many searches overlap."""
+
+    name = "slow"
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return [{"unique_id": f"{keyword}:{country}:1", "domain": "x.example.com"}]
+
+
+def run_job(mgr, bus, keywords, timeout=10):
+    q = bus.register()
+    mgr.start_keywords_job(keywords)
+    events = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ev = q.get(timeout=timeout)
+        events.append(ev)
+        if ev.type == "job.finished":
+            break
+    bus.unregister(q)
+    return events
+
+
+def test_keywords_run_in_parallel():
+    bus = EventBus()
+    mgr = JobManager(bus=bus, max_workers=4)
+    mgr.adapter = SlowAdapter()
+    keywords = [f"kw{i}" for i in range(8)]
+    events = run_job(mgr, bus, keywords)
+    mgr.shutdown()
+
+    done = [ev.payload["keyword"] for ev in events if ev.type == "job.keyword_done"]
+    assert sorted(done) == sorted(keywords)
+    assert mgr.adapter.peak == 4
+    assert events[-1].type == "job.finished"
+
+
+def test_per_job_limit_and_event_order():
+    bus = EventBus()
+    mgr = JobManager(bus=bus, max_workers=4, max_per_job=2)
+    mgr.adapter = SlowAdapter()
+    events = run_job(mgr, bus, [f"kw{i}" for i in range(6)])
+    mgr.shutdown()
+
+    assert mgr.adapter.peak == 2
+    # each keyword still reports progress before completion
+    for kw in {ev.payload.get("keyword") for ev in events if ev.type == "job.progress"}:
+        types = [ev.type for ev in events if ev.payload.get("keyword") == kw]
+        assert types == ["job.progress", "job.keyword_done"]
+
+
+def test_empty_job_finishes():
+    bus = EventBus()
+    mgr = JobManager(bus=bus, max_workers=2)
+    events = run_job(mgr, bus, [])
+    mgr.shutdown()
+    assert [ev.type for ev in events] == ["job.started", "job.finished"]
+    assert isinstance(events[0], Event)
+
+
+def test_adaptive_limit_caps_adapter_concurrency():
+    bus = EventBus()
+    inner = SlowAdapter()
+    mgr = JobManager(
+        bus=bus,
+        max_workers=4,
+        adapter=inner,
+        adaptive=True,
+        adaptive_options={"initial_limit": 2, "max_limit": 2},
+    )
+    events = run_job(mgr, bus, [f"kw{i}" for i in range(6)])
+    mgr.shutdown()
+
+    assert inner.peak == 2
+    assert mgr.adapter.stats()["successes"] == 6
+    assert events[-1].type == "job.finished"
+
+
+def test_adaptive_max_limit_is_capped_at_max_workers():
+    mgr = JobManager(
+        bus=EventBus(),
+        max_workers=3,
+        adaptive=True,
+        adaptive_options={"max_limit": 32},
+    )
+    # the scheduler never runs more than max_workers searches at once
+    assert mgr.adapter.max_limit == 3 and mgr.adapter.limit == 3
+
+
+class GateAdapter:
+    """Keywords starting with ``slow`` block until ``release`` is set."""
+
+    name = "gate"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def start(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        if keyword.startswith("slow"):
+            self.release.wait(10)
+        return [{"unique_id": f"{keyword}:{country}:1", "domain": "x.example.com"}]
+
+
+def wait_for(q, predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ev = q.get(timeout=deadline - time.time())
+        if predicate(ev):
+            return ev
+    raise AssertionError("event not published")
+
+
+def test_cancel_job_publishes_partial_results_and_manager_keeps_working():
+    bus = EventBus()
+    adapter = GateAdapter()
+    mgr = JobManager(bus=bus, max_workers=2, adapter=adapter)
+    q = bus.register()
+    job_id = mgr.start_keywords_job(
+        ["fast0", "fast1"] + [f"slow{i}" for i in range(10)]
+    )
+    wait_for(
+        q,
+        lambda ev: ev.payload.get("keyword") == "fast1"
+        and ev.type == "job.keyword_done",
+    )
+    wait_for(
+        q, lambda ev: ev.type == "job.progress" and ev.payload["keyword"] == "slow1"
+    )
+
+    t0 = time.time()
+    assert mgr.cancel_job(job_id, reason="user")
+    cancelled = wait_for(q, lambda ev: ev.type == "job.cancelled")
+    assert time.time() - t0 < 1.0
+    assert cancelled.payload["job_id"] == job_id
+    assert cancelled.payload["reason"] == "user"
+    assert sorted(cancelled.payload["results"]) == ["fast0", "fast1"]
+    assert cancelled.payload["cancelled"] == [f"slow{i}" for i in range(10)]
+    assert not mgr.cancel_job(job_id)
+
+    # the abandoned searches keep their slots until they return, then the
+    # manager takes new jobs
+    adapter.release.set()
+    events = run_job(mgr, bus, ["fast2", "fast3"])
+    assert events[-1].type == "job.finished"
+    mgr.shutdown()
+    bus.unregister(q)
+
+
+def test_stop_intent_cancels_only_the_named_job():
+    bus = EventBus()
+    adapter = GateAdapter()
+    mgr = JobManager(bus=bus, max_workers=4, max_per_job=1, adapter=adapter)
+    mgr.start()
+    q = bus.register()
+    slow_job = mgr.start_keywords_job(["slow0", "slow1"])
+    other_job = mgr.start_keywords_job(["slow2"])
+    wait_for(
+        q, lambda ev: ev.type == "job.progress" and ev.payload["keyword"] == "slow2"
+    )
+    bus.publish(Event(type="intent.stop_run", payload={"job_id": slow_job}))
+    ev = wait_for(q, lambda ev: ev.type in ("job.cancelled", "job.finished"))
+    assert ev.type == "job.cancelled" and ev.payload["job_id"] == slow_job
+    adapter.release.set()
+    ev = wait_for(q, lambda ev: ev.type in ("job.cancelled", "job.finished"))
+    assert ev.type == "job.finished" and ev.payload["job_id"] == other_job
+    mgr.shutdown()
+    bus.unregister(q)
+
+
+def test_keyword_and_job_timeouts():
+    bus = EventBus()
+    adapter = GateAdapter()
+    mgr = JobManager(bus=bus, max_workers=2, adapter=adapter, keyword_timeout_s=0.1)
+    events = run_job(mgr, bus, ["slow0", "fast0"])
+    errors = [ev for ev in events if ev.type == "job.error"]
+    assert [ev.payload["keyword"] for ev in errors] == ["slow0"]
+    assert events[-1].type == "job.finished"
+
+    mgr.keyword_timeout_s = None
+    q = bus.register()
+    job_id = mgr.start_keywords_job(["slow1"], timeout_s=0.1)
+    ev = wait_for(q, lambda ev: ev.type == "job.cancelled")
+    assert ev.payload == {
+        "keywords": ["slow1"],
+        "job_id": job_id,
+        "reason": "timeout",
+        "results": {},
+        "cancelled": ["slow1"],
+    }
+    adapter.release.set()
+    mgr.shutdown()
+    bus.unregister(q)
+
+
+def test_timed_out_calls_keep_their_slot_until_they_return():
+    bus = EventBus()
+    adapter = GateAdapter()
+    mgr = JobManager(bus=bus, max_workers=2, adapter=adapter, keyword_timeout_s=0.05)
+    q = bus.register()
+    try:
+        mgr.start_keywords_job([f"slow{i}" for i in range(12)])
+        time.sleep(0.5)
+        # the hung adapter calls hold the two slots; nothing else starts
+        helpers = [t for t in threading.enumerate() if t.name == "cancellable-call"]
+        assert len(helpers) == 2
+        errors = []
+        while len(errors) < 2:
+            ev = q.get(timeout=5)
+            if ev.type == "job.error":
+                errors.append(ev)
+        adapter.release.set()
+        wait_for(q, lambda ev: ev.type == "job.finished")
+    finally:
+        adapter.release.set()
+        mgr.shutdown()
+        bus.unregister(q)
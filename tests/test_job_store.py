@@ -0,0 +1,200 @@
+import threading
+import time
+
+import pytest
+
+from app.events import EventBus
+from backend.core.job_manager import JobManager
+from data import job_store
+from data.db import SessionLocal, engine
+from data.models import Base, Job, JobTask, KeywordRun
+
+
+@pytest.fixture(autouse=True)
+def prepare_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+class CountingAdapter:
+    name = "counting"
+
+    def __init__(self):
+        self.calls = []
+
+    def start(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        self.calls.append(keyword)
+        return [{"unique_id": f"{keyword}:{country}:1", "domain": "x.example.com"}]
+
+
+def wait_for(q, etype, timeout=10):
+    events = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ev = q.get(timeout=timeout)
+        events.append(ev)
+        if ev.type == etype:
+            return events
+    raise AssertionError(f"no {etype} event")
+
+
+def test_claim_is_exclusive_until_lease_expires():
+    with SessionLocal() as session:
+        job_id, tasks = job_store.create_job(session, ["a", "b", "a"], "US")
+        session.commit()
+        assert sorted(tasks) == ["a", "b"]
+
+        now = time.time()
+        assert job_store.claim_task(session, tasks["a"], "w1", lease_s=10, now=now)
+        assert not job_store.claim_task(session, tasks["a"], "w2", now=now + 5)
+        # w1 stops renewing: after expiry w2 can take over
+        assert job_store.claim_task(session, tasks["a"], "w2", now=now + 11)
+        # w1's late completion is rejected, w2's is recorded
+        assert not job_store.complete_task(session, tasks["a"], "w1", [])
+        assert job_store.complete_task(session, tasks["a"], "w2", [{"unique_id": "x"}])
+        assert not job_store.finish_job(session, job_id)
+
+        assert job_store.claim_task(session, tasks["b"], "w2")
+        assert job_store.complete_task(session, tasks["b"], "w2", None)
+        assert job_store.finish_job(session, job_id)
+        session.commit()
+        statuses = dict(session.query(JobTask.keyword, JobTask.status).all())
+    assert statuses == {"a": "done", "b": "failed"}
+
+
+def test_duplicate_keywords_run_once_but_report_every_occurrence():
+    bus = EventBus()
+    mgr = JobManager(bus=bus, max_workers=2)
+    mgr.adapter = CountingAdapter()
+    q = bus.register()
+    job_id = mgr.start_keywords_job(["k1", "k2", "k1"])
+    events = wait_for(q, "job.finished")
+    mgr.shutdown()
+
+    done = [ev.payload for ev in events if ev.type == "job.keyword_done"]
+    assert sorted(d["keyword"] for d in done) == ["k1", "k1", "k2"]
+    assert sorted(mgr.adapter.calls) == ["k1", "k2"]
+    assert events[-1].payload == {
+        "keywords": ["k1", "k2", "k1"],
+        "job_id": job_id,
+        "complete": True,
+    }
+    with SessionLocal() as session:
+        assert session.get(Job, job_id).status == "finished"
+
+
+def test_start_resumes_unfinished_job_of_a_dead_process():
+    # simulate a crash: "a" done, "b" claimed by a dead owner mid-run, "c" pending
+    with SessionLocal() as session:
+        past = time.time() - 3600
+        job_id, tasks = job_store.create_job(
+            session, ["a", "b", "c"], "US", owner="dead", lease_s=1, now=past
+        )
+        job_store.claim_task(session, tasks["a"], "dead", now=past)
+        job_store.complete_task(session, tasks["a"], "dead", [{"unique_id": "a"}])
+        job_store.claim_task(session, tasks["b"], "dead", lease_s=1, now=past)
+        session.commit()
+
+    bus = EventBus()
+    q = bus.register()
+    adapter = CountingAdapter()
+    mgr = JobManager(bus=bus, max_workers=2, adapter=adapter)
+    mgr.start()
+    try:
+        events = wait_for(q, "job.finished")
+    finally:
+        mgr.shutdown()
+
+    resumed = [ev.payload for ev in events if ev.type == "job.resumed"]
+    assert resumed == [
+        {"job_id": job_id, "keywords": ["a", "b", "c"], "pending": ["b", "c"]}
+    ]
+    assert sorted(adapter.calls) == ["b", "c"]
+    assert events[-1].payload["complete"] is True
+    with SessionLocal() as session:
+        assert session.get(Job, job_id).status == "finished"
+        attempts = dict(session.query(JobTask.keyword, JobTask.attempts).all())
+        # the dead owner wrote nothing for "b"; the retry's single transaction
+        # stored exactly one run and linked it to the task
+        runs = session.query(KeywordRun).filter_by(keyword="b").all()
+        assert [run.status for run in runs] == ["finished"]
+        assert session.get(JobTask, tasks["b"]).run_id == runs[0].id
+    assert attempts == {"a": 1, "b": 2, "c": 1}
+
+
+class BlockingAdapter(CountingAdapter):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def search(self, keyword, country="us"):
+        self.release.wait(10)
+        return super().search(keyword, country)
+
+
+def test_live_job_is_never_adopted_by_another_manager():
+    bus_a, bus_b = EventBus(), EventBus()
+    q_a, q_b = bus_a.register(), bus_b.register()
+    adapter_a, adapter_b = BlockingAdapter(), CountingAdapter()
+    mgr_a = JobManager(bus=bus_a, max_workers=2, adapter=adapter_a, lease_s=0.6)
+    mgr_b = JobManager(bus=bus_b, max_workers=2, adapter=adapter_b, lease_s=0.6)
+    mgr_a.start()
+    mgr_b.start()
+    try:
+        job_id = mgr_a.start_keywords_job([f"k{i}" for i in range(10)])
+        # several lease periods: A keeps renewing, so B must leave the job alone
+        time.sleep(2.0)
+        adapter_a.release.set()
+        wait_for(q_a, "job.finished")
+        time.sleep(0.5)
+    finally:
+        mgr_a.shutdown()
+        mgr_b.shutdown()
+    assert adapter_b.calls == []
+    assert q_b.get_batch(timeout=0) == []
+    assert sorted(adapter_a.calls) == [f"k{i}" for i in range(10)]
+    with SessionLocal() as session:
+        assert session.get(Job, job_id).status == "finished"
+
+
+def test_job_of_a_stale_owner_is_adopted_once():
+    with SessionLocal() as session:
+        now = time.time()
+        job_id, _ = job_store.create_job(
+            session, ["a"], "US", owner="w1", lease_s=10, now=now
+        )
+        assert job_store.resumable_jobs(session, now=now + 5) == []
+        assert not job_store.adopt_job(session, job_id, "w2", now=now + 5)
+        assert job_store.renew_job_leases(session, "w1", lease_s=10) == 1
+        later = time.time() + 11
+        assert [j["id"] for j in job_store.resumable_jobs(session, now=later)] == [
+            job_id
+        ]
+        assert job_store.adopt_job(session, job_id, "w2", now=later)
+        assert not job_store.adopt_job(session, job_id, "w3", now=later)
+
+
+def test_cancelled_job_keeps_results_and_is_not_resumed():
+    with SessionLocal() as session:
+        job_id, tasks = job_store.create_job(session, ["a", "b", "c"], "US")
+        job_store.claim_task(session, tasks["a"], "w1")
+        job_store.complete_task(session, tasks["a"], "w1", [{"unique_id": "x"}])
+        job_store.claim_task(session, tasks["b"], "w1")
+        assert job_store.cancel_job(session, job_id)
+        assert not job_store.cancel_job(session, job_id)
+        session.commit()
+
+        assert job_store.job_results(session, job_id) == {"a": [{"unique_id": "x"}]}
+        assert job_store.resumable_jobs(session) == []
+        statuses = dict(
+            session.query(JobTask.keyword, JobTask.status).filter_by(job_id=job_id)
+        )
+        assert statuses == {"a": "done", "b": "cancelled", "c": "cancelled"}
+        assert session.get(Job, job_id).status == "cancelled"
+        # the owner of the interrupted task can no longer record it
+        assert not job_store.complete_task(session, tasks["b"], "w1", [])
@@ -2,7 +2,7 @@ import pytest
 from data.db import SessionLocal, engine
 from data.models import Base
 from data import models
-from backend.etapa4_service.main import metrics
+from backend.etapa4_service.main import compute_metrics
 
 
 @pytest.fixture(autouse=True)
@@ -16,7 +16,7 @@ def setup_db():
 
 def test_metrics_empty_db():
     with SessionLocal() as db:
-        result = metrics(db=db)
+        result = compute_metrics(db)
     assert result["total_ads"] == 0
     assert result["total_runs"] == 0
     assert result["avg_duration"] is None
@@ -29,7 +29,7 @@ def test_metrics_single_run():
         )
         db.add(run)
         db.commit()
-        result = metrics(db=db)
+        result = compute_metrics(db)
     assert result["total_runs"] == 1
     assert abs(result["avg_duration"] - 1.23) < 1e-6
     assert result["p50_duration"] == result["p95_duration"] == 1.23
@@ -50,7 +50,7 @@ def test_metrics_multiple_runs():
         ]
         db.add_all(runs)
         db.commit()
-        result = metrics(db=db)
+        result = compute_metrics(db)
     assert result["total_runs"] == 3
     assert abs(result["avg_duration"] - 2.0) < 1e-6
     # p50 deve ser 2.0, p95 próximo de 3.0
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from data.db import SessionLocal, engine
+from data.metrics_store import (
+    read_metrics,
+    rebuild_keyword_stats,
+    sql_keyword_breakdown,
+)
+from data.models import Base, KeywordRun, KeywordStat
+from data.sketch import QuantileSketch
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def finish_run(keyword, duration, results=1):
+    # same two-step lifecycle JobManager uses: insert running, then finish
+    with SessionLocal() as session:
+        run = KeywordRun(keyword=keyword, duration_s=0.0, status="running")
+        session.add(run)
+        session.commit()
+        run.duration_s = duration
+        run.results_count = results
+        run.status = "finished"
+        session.commit()
+        return run.id
+
+
+def test_running_rows_are_not_aggregated():
+    with SessionLocal() as session:
+        session.add(KeywordRun(keyword="k", duration_s=0.0, status="running"))
+        session.commit()
+        assert read_metrics(session)["total_runs"] == 0
+
+
+def test_finish_transition_updates_stats_once():
+    run_id = finish_run("k1", 1.0, results=2)
+    finish_run("k1", 3.0, results=4)
+    finish_run("k2", 2.0)
+    with SessionLocal() as session:
+        # later edits of a finished run are not counted again
+        session.get(KeywordRun, run_id).duration_s = 9.0
+        session.commit()
+    with SessionLocal() as session:
+        summary = read_metrics(session)
+    assert summary["total_runs"] == 3
+    assert summary["avg_duration"] == pytest.approx(2.0)
+    assert summary["per_keyword"]["k1"] == {
+        "runs": 2,
+        "results": 6,
+        "avg_duration": pytest.approx(2.0),
+    }
+    assert summary["sketch"].quantile(0.5) == pytest.approx(2.0)
+
+
+def test_concurrent_writers_do_not_lose_updates():
+    threads = [
+        threading.Thread(target=finish_run, args=("k", float(i + 1))) for i in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with SessionLocal() as session:
+        stat = session.query(KeywordStat).filter_by(keyword="k").one()
+        assert stat.runs == 8
+        assert QuantileSketch.from_dict(stat.duration_sketch).count == 8
+
+
+def test_rebuild_matches_incremental():
+    for i in range(5):
+        finish_run(f"k{i % 2}", float(i))
+    with SessionLocal() as session:
+        before = read_metrics(session)
+        assert rebuild_keyword_stats(session) == 2
+        session.commit()
+        after = read_metrics(session)
+    assert after["per_keyword"] == before["per_keyword"]
+    assert after["sketch"].quantile(0.9) == before["sketch"].quantile(0.9)
+
+
+def test_sketch_roundtrip_and_merge():
+    a = QuantileSketch(exact_limit=4)
+    b = QuantileSketch(exact_limit=4)
+    a.extend([1.0, 2.0, 3.0])
+    b.extend([4.0, 5.0, 6.0])
+    a.merge(QuantileSketch.from_dict(b.to_dict()))
+    assert a.count == 6 and a.values is None
+    assert a.quantile(0.0) == 1.0 and a.quantile(1.0) == 6.0
+    assert a.quantile(0.5) == pytest.approx(3.0, rel=0.02)
+
+
+def test_sql_breakdown_agrees_with_store():
+    for i in range(6):
+        finish_run(f"k{i % 3}", float(i + 1), results=i)
+    with SessionLocal() as session:
+        session.add(KeywordRun(keyword="k0", duration_s=0.0, status="running"))
+        session.commit()
+        stored = read_metrics(session)["per_keyword"]
+        sql = sql_keyword_breakdown(session)
+    assert set(sql) == set(stored)
+    for kw, stat in sql.items():
+        assert stat["runs"] == stored[kw]["runs"]
+        assert stat["results"] == stored[kw]["results"]
+        assert stat["avg_duration"] == pytest.approx(stored[kw]["avg_duration"])
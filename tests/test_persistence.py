@@ -0,0 +1,59 @@
+import pytest
+from data.db import SessionLocal, engine
+from data.models import Ad, Base
+from data import persistence
+from data.persistence import ad_rows, upsert_ads
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_ad_rows_collapses_duplicates():
+    rows = ad_rows(
+        [
+            {"unique_id": "a", "title": "first"},
+            {"unique_id": "b", "title": "other"},
+            {"unique_id": "a", "title": "second"},
+        ],
+        "kw",
+        "us",
+    )
+    assert [r["unique_id"] for r in rows] == ["b", "a"]
+    assert rows[1]["title"] == "second"
+    assert rows[1]["keyword"] == "kw"
+
+
+def test_upsert_ads_inserts_then_updates():
+    with SessionLocal() as session:
+        upsert_ads(session, ad_rows([{"unique_id": "a", "title": "v1"}], "k", "us"))
+        session.commit()
+    with SessionLocal() as session:
+        rows = ad_rows(
+            [{"unique_id": "a", "title": "v2"}, {"unique_id": "b", "title": "new"}],
+            "k2",
+            "br",
+        )
+        upsert_ads(session, rows, batch_size=1)
+        session.commit()
+        ads = {a.unique_id: a for a in session.query(Ad).all()}
+    assert len(ads) == 2
+    assert ads["a"].title == "v2"
+    assert ads["a"].keyword == "k2"
+    assert ads["a"].country == "br"
+
+
+def test_upsert_ads_lookup_fallback(monkeypatch):
+    # force the portable IN (...) path used by dialects without ON CONFLICT
+    monkeypatch.setattr(persistence, "_NATIVE_INSERTS", {})
+    with SessionLocal() as session:
+        upsert_ads(session, ad_rows([{"unique_id": "a", "title": "v1"}], "k", "us"))
+        session.commit()
+    with SessionLocal() as session:
+        upsert_ads(session, ad_rows([{"unique_id": "a", "title": "v2"}], "k", "us"))
+        session.commit()
+        assert [a.title for a in session.query(Ad).all()] == ["v2"]
@@ -0,0 +1,118 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.core.job_manager import record_keyword_run
+from backend.etapa4_service import main
+from data import models
+from data.data_version import read_data_version
+from data.db import SessionLocal, engine
+from data.models import Base
+from data.persistence import upsert_ads
+
+client = TestClient(main.app)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def metrics_calls(monkeypatch):
+    calls = []
+    compute = main.compute_metrics
+
+    def counting(db, extra_quantiles=()):
+        calls.append(extra_quantiles)
+        return compute(db, extra_quantiles)
+
+    monkeypatch.setattr(main, "compute_metrics", counting)
+    return calls
+
+
+def current_version():
+    with SessionLocal() as session:
+        return read_data_version(session)
+
+
+def test_writes_bump_the_version_once_per_transaction():
+    before = current_version()
+    with SessionLocal() as session:
+        session.add(models.KeywordRun(keyword="k", duration_s=1.0, status="finished"))
+        session.flush()
+        upsert_ads(session, [{"unique_id": "a", "keyword": "k"}])
+        session.commit()
+    after = current_version()
+    epoch, version = after.rsplit("-", 1)
+    assert before == f"{epoch}-0" and version == "1"
+    # reading does not bump it
+    with SessionLocal() as session:
+        session.query(models.Ad).all()
+        session.commit()
+    assert current_version() == after
+
+
+def test_repeated_polls_are_served_from_cache_and_revalidate(metrics_calls):
+    first = client.get("/metrics")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    again = client.get("/metrics")
+    assert again.json() == first.json() and again.headers["etag"] == etag
+    revalidated = client.get("/metrics", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert len(metrics_calls) == 1
+
+    # a committed keyword invalidates the cached response
+    record_keyword_run("python", "US", [{"unique_id": "p1"}], started=0.0)
+    changed = client.get("/metrics", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["total_ads"] == 1
+    assert changed.headers["etag"] != etag
+    assert len(metrics_calls) == 2
+
+
+def test_cache_key_is_the_normalised_query():
+    with SessionLocal() as session:
+        session.add_all(
+            [models.Ad(unique_id=f"a{i}", keyword=f"k{i % 2}") for i in range(4)]
+        )
+        session.commit()
+    a = client.get("/ads?keyword=k0&limit=10")
+    b = client.get("/ads?limit=10&keyword=k0")
+    c = client.get("/ads?keyword=k1&limit=10")
+    assert a.headers["etag"] == b.headers["etag"] != c.headers["etag"]
+    assert {ad["keyword"] for ad in c.json()} == {"k1"}
+
+
+def test_paging_header_is_kept_and_errors_are_not_cached():
+    with SessionLocal() as session:
+        session.add_all([models.Ad(unique_id=f"a{i}", keyword="k") for i in range(3)])
+        session.commit()
+    first = client.get("/ads?limit=2")
+    cached = client.get("/ads?limit=2")
+    assert cached.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+    assert client.get("/ads?limit=0").status_code == 422
+    assert "etag" not in client.get("/ads?limit=0").headers
+
+
+def test_large_bodies_are_compressed_when_accepted():
+    with SessionLocal() as session:
+        session.add_all(
+            [
+                models.Ad(unique_id=f"a{i}", keyword="k", title="t" * 50)
+                for i in range(50)
+            ]
+        )
+        session.commit()
+    plain = client.get("/ads", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    # httpx decodes the gzip body transparently
+    zipped = client.get("/ads", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.json() == plain.json()
+    assert int(zipped.headers["content-length"]) < len(plain.content)
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from backend.core.scheduler import BATCH, INTERACTIVE, Scheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def gated_scheduler(**kwargs):
+    """One worker held busy by a gate task, so submissions queue up."""
+    sched = Scheduler(max_workers=1, **kwargs)
+    gate = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        gate.wait(5)
+
+    sched.submit(hold, flow="gate")
+    started.wait(5)
+    return sched, gate
+
+
+def test_interactive_runs_before_queued_batch_work():
+    sched, gate = gated_scheduler()
+    order = []
+    for i in range(5):
+        sched.submit(order.append, f"batch{i}", flow="backfill", priority=BATCH)
+    sched.submit(order.append, "gui", flow="gui", priority=INTERACTIVE)
+    gate.set()
+    sched.shutdown()
+    assert order[0] == "gui"
+    assert order[1:] == [f"batch{i}" for i in range(5)]
+
+
+def test_fair_queuing_interleaves_flows_by_weight():
+    sched, gate = gated_scheduler()
+    order = []
+    for i in range(6):
+        sched.submit(order.append, ("big", i), flow="big")
+    for i in range(3):
+        sched.submit(order.append, ("small", i), flow="small")
+    for i in range(4):
+        sched.submit(order.append, ("heavy", i), flow="heavy", weight=2.0)
+    gate.set()
+    sched.shutdown()
+    flows = [flow for flow, _ in order]
+    # the small job is not stuck behind the big one's backlog, and weight 2
+    # gets twice the slots while all three flows are backlogged
+    assert flows == [
+        "big", "small", "heavy", "heavy",
+        "big", "small", "heavy", "heavy",
+        "big", "small", "big", "big", "big",
+    ]  # fmt: skip
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert bucket.available()
+    bucket.take()
+    bucket.take()
+    assert not bucket.available()
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.available()
+
+
+def test_rate_limited_tasks_do_not_block_other_keys():
+    sched = Scheduler(max_workers=2, rate_limits={"country:BR": (1, 1)})
+    done = []
+    started = time.monotonic()
+    futures = [
+        sched.submit(
+            lambda c=c: done.append((c, time.monotonic())), keys=[f"country:{c}"]
+        )
+        for c in ("BR", "BR", "US", "US")
+    ]
+    for f in futures:
+        f.result(timeout=5)
+    sched.shutdown()
+    br = [t - started for c, t in done if c == "BR"]
+    us = [t - started for c, t in done if c == "US"]
+    assert max(us) < 0.5
+    assert max(br) >= 0.9  # second BR search waited for a token
+    # counted once per task that waited, not per pick that skipped it
+    assert sched.stats()["throttled"] == 1
+
+
+def test_bucket_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        Scheduler(max_workers=1, rate_limits={"country:BR": 0})
+
+
+def test_throttled_backlog_does_not_slow_down_other_picks():
+    clock = FakeClock()
+    sched, gate = gated_scheduler(rate_limits={"country:BR": (1, 1)}, clock=clock)
+    for i in range(20000):
+        sched.submit(time.sleep, 0, flow="backfill", keys=["country:BR"])
+    with sched._cond:
+        sched._buckets["country:BR"].tokens = 0
+        t0 = time.perf_counter()
+        for _ in range(100):
+            assert sched._pick() == (None, pytest.approx(1.0))
+        elapsed = time.perf_counter() - t0
+    # one heap head to look at, not 20k entries to pop and push back
+    assert elapsed / 100 < 0.001
+    gate.set()
+    sched.shutdown(cancel_queued=True)
+
+
+def test_stats_report_depth_and_waits():
+    sched, gate = gated_scheduler()
+    for _ in range(3):
+        sched.submit(time.sleep, 0, flow="job1", priority=BATCH)
+    stats = sched.stats()
+    assert stats["queued"][BATCH] == 3
+    assert stats["queued_per_flow"] == {"job1": 3}
+    assert stats["running"] == 1
+    gate.set()
+    sched.shutdown()
+    stats = sched.stats()
+    assert stats["completed"] == 4
+    assert stats["wait_s"][BATCH]["count"] == 3
+    assert stats["wait_s"][BATCH]["p95"] > 0
+
+
+def test_submit_after_shutdown_raises():
+    sched = Scheduler(max_workers=1)
+    sched.shutdown()
+    with pytest.raises(RuntimeError):
+        sched.submit(print)
@@ -0,0 +1,68 @@
+import random
+import statistics
+
+import pytest
+
+from backend.core.adapters.simulator import (
+    COUNT_DISTRIBUTIONS,
+    LATENCY_DISTRIBUTIONS,
+    SimulatedAdapter,
+)
+
+
+def started(**kwargs):
+    adapter = SimulatedAdapter(latency_s=0.0, **kwargs)
+    adapter.start()
+    return adapter
+
+
+def test_same_keyword_gives_same_ads():
+    a = started(seed=1)
+    b = started(seed=1)
+    assert a.search("python") == b.search("python")
+    assert a.search("python") != a.search("java")
+
+
+@pytest.mark.parametrize("dist", LATENCY_DISTRIBUTIONS)
+def test_latency_distribution_means(dist):
+    adapter = SimulatedAdapter(latency=dist, latency_s=0.05, latency_sigma=2.5)
+    rng = random.Random(7)
+    draws = [adapter.draw_latency(rng) for _ in range(20000)]
+    assert min(draws) >= 0
+    assert statistics.mean(draws) == pytest.approx(0.05, rel=0.15)
+
+
+@pytest.mark.parametrize("dist", COUNT_DISTRIBUTIONS)
+def test_result_count_distribution_means(dist):
+    adapter = SimulatedAdapter(results=dist, results_mean=8)
+    rng = random.Random(7)
+    draws = [adapter.draw_count(rng) for _ in range(20000)]
+    assert min(draws) >= 0
+    assert statistics.mean(draws) == pytest.approx(8, rel=0.1)
+
+
+def test_payload_size_and_duplicates():
+    adapter = started(
+        results="fixed", results_mean=50, payload_bytes=100, duplicate_ratio=0.5
+    )
+    ads = [ad for kw in ("a", "b", "c", "d") for ad in adapter.search(kw)]
+    assert all(len(ad["body"]) == 100 for ad in ads)
+    shared = [ad for ad in ads if ":shared:" in ad["unique_id"]]
+    assert 0.35 < len(shared) / len(ads) < 0.65
+    assert len({ad["unique_id"] for ad in ads}) < len(ads)
+
+
+def test_error_injection():
+    adapter = started(error_rate=0.3)
+    failures = 0
+    for i in range(500):
+        try:
+            adapter.search(f"kw{i}")
+        except RuntimeError:
+            failures += 1
+    assert 100 < failures < 200
+
+
+def test_rejects_unknown_distribution():
+    with pytest.raises(ValueError):
+        SimulatedAdapter(latency="zipf")
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from data.sketch import QuantileSketch
+
+
+def exact_quantile(sorted_values, q):
+    return sorted_values[round(q * (len(sorted_values) - 1))]
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.95, 0.99, 0.999])
+def test_relative_error_is_bounded(q):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 1.5) for _ in range(50000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.extend(values)
+    expected = exact_quantile(sorted(values), q)
+    assert sketch.quantile(q) == pytest.approx(expected, rel=0.011)
+
+
+def test_exact_while_small():
+    sketch = QuantileSketch()
+    sketch.extend([3.0, 1.0, 2.0])
+    assert sketch.quantile(0.5) == 2.0
+    assert sketch.quantile(0.95) == pytest.approx(2.9)
+
+
+def test_bins_are_bounded():
+    sketch = QuantileSketch(max_bins=64, exact_limit=0)
+    for i in range(1, 20000):
+        sketch.add(i * 1e-3)
+    assert sketch.memory_bins() <= 64
+    assert sketch.count == 19999
+    # upper quantiles keep their accuracy after the low buckets are folded
+    assert sketch.quantile(0.99) == pytest.approx(19.8, rel=0.011)
+
+
+def test_merge_matches_single_sketch():
+    rng = random.Random(3)
+    values = [rng.expovariate(2.0) for _ in range(5000)]
+    whole = QuantileSketch()
+    whole.extend(values)
+    left, right = QuantileSketch(), QuantileSketch()
+    left.extend(values[:2500])
+    right.extend(values[2500:])
+    left.merge(right)
+    restored = QuantileSketch.from_dict(left.to_dict())
+    for q in (0.1, 0.5, 0.99):
+        assert restored.quantile(q) == whole.quantile(q)
+    assert restored.count == whole.count
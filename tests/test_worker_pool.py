@@ -0,0 +1,195 @@
+import os
+import time
+
+import pytest
+
+from app.events import EventBus
+from backend.core.job_manager import JobManager
+from backend.core.worker_pool import WorkerPool, WorkerPoolBroken
+from data.db import SessionLocal, engine
+from data.models import Ad, Base, KeywordRun
+
+
+@pytest.fixture(autouse=True)
+def prepare_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+class PidAdapter:
+    """Reports which process served the search; "crash" kills the worker."""
+
+    name = "pid"
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def search(self, keyword, country="us"):
+        if keyword == "crash":
+            os._exit(3)
+        return [
+            {
+                "unique_id": f"{keyword}:{country}:1",
+                "title": str(os.getpid()),
+                "domain": "x.example.com",
+            }
+        ]
+
+
+def run_job(mgr, bus, keywords, timeout=30):
+    q = bus.register()
+    mgr.start_keywords_job(keywords)
+    events = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ev = q.get(timeout=timeout)
+        events.append(ev)
+        if ev.type == "job.finished":
+            break
+    bus.unregister(q)
+    return events
+
+
+def test_process_mode_runs_keywords_in_worker_processes():
+    bus = EventBus()
+    mgr = JobManager(
+        bus=bus, max_workers=2, worker_mode="process", adapter_factory=PidAdapter
+    )
+    mgr.start()
+    try:
+        events = run_job(mgr, bus, ["a", "b", "c", "d"])
+    finally:
+        mgr.shutdown()
+
+    done = [ev.payload["keyword"] for ev in events if ev.type == "job.keyword_done"]
+    assert sorted(done) == ["a", "b", "c", "d"]
+    assert events[-1].type == "job.finished"
+    with SessionLocal() as session:
+        pids = {ad.title for ad in session.query(Ad)}
+        runs = session.query(KeywordRun).filter_by(status="finished").count()
+    assert str(os.getpid()) not in pids
+    assert 1 <= len(pids) <= 2
+    assert runs == 4
+
+
+def test_crashed_worker_is_restarted():
+    bus = EventBus()
+    mgr = JobManager(
+        bus=bus, max_workers=1, worker_mode="process", adapter_factory=PidAdapter
+    )
+    mgr.start()
+    try:
+        events = run_job(mgr, bus, ["crash", "after"])
+        # the replacement is spawned after a short backoff
+        deadline = time.time() + 5
+        while mgr.worker_pool.restarts == 0 and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        mgr.shutdown()
+
+    errors = [ev.payload for ev in events if ev.type == "job.error"]
+    assert [e["keyword"] for e in errors] == ["crash"]
+    assert "code 3" in errors[0]["error"]
+    done = [ev.payload["keyword"] for ev in events if ev.type == "job.keyword_done"]
+    assert done == ["after"]
+    assert mgr.worker_pool.restarts == 1
+
+
+class SleepyAdapter(PidAdapter):
+    def search(self, keyword, country="us"):
+        time.sleep(2)
+        return super().search(keyword, country)
+
+
+def test_cancel_does_not_wait_for_worker_processes():
+    bus = EventBus()
+    mgr = JobManager(
+        bus=bus, max_workers=1, worker_mode="process", adapter_factory=SleepyAdapter
+    )
+    mgr.start()
+    q = bus.register()
+    try:
+        job_id = mgr.start_keywords_job(["a", "b", "c"])
+        while q.get(timeout=30).type != "job.progress":
+            pass
+        t0 = time.time()
+        assert mgr.cancel_job(job_id)
+        ev = q.get(timeout=5)
+        while ev.type != "job.cancelled":
+            ev = q.get(timeout=5)
+        assert time.time() - t0 < 1.0
+        assert ev.payload["cancelled"] == ["a", "b", "c"]
+    finally:
+        mgr.shutdown(wait=False)
+        bus.unregister(q)
+
+
+class HangingAdapter(PidAdapter):
+    def search(self, keyword, country="us"):
+        if keyword == "hang":
+            time.sleep(60)
+        return super().search(keyword, country)
+
+
+def test_keyword_timeout_kills_the_worker_in_process_mode():
+    bus = EventBus()
+    mgr = JobManager(
+        bus=bus,
+        max_workers=1,
+        worker_mode="process",
+        adapter_factory=HangingAdapter,
+        keyword_timeout_s=1.0,
+    )
+    mgr.start()
+    try:
+        t0 = time.time()
+        events = run_job(mgr, bus, ["hang", "after"])
+    finally:
+        mgr.shutdown()
+
+    errors = [ev.payload for ev in events if ev.type == "job.error"]
+    assert [e["keyword"] for e in errors] == ["hang"]
+    assert "within 1.0s" in errors[0]["error"]
+    done = [ev.payload["keyword"] for ev in events if ev.type == "job.keyword_done"]
+    assert done == ["after"]
+    assert time.time() - t0 < 30
+
+
+def crashing_factory():
+    os._exit(5)
+
+
+def test_crash_loop_backs_off_and_trips_the_breaker():
+    bus = EventBus()
+    pool = WorkerPool(
+        bus,
+        crashing_factory,
+        processes=1,
+        max_restarts=2,
+        restart_window_s=60,
+        backoff_base_s=0.2,
+    )
+    pool.start()
+    try:
+        t0 = time.time()
+        futures = [pool.submit(f"k{i}", "US") for i in range(5)]
+        # submit never waits for a respawn while workers crash
+        assert time.time() - t0 < 0.1
+        # each death fails the keyword its worker had; the third trips the
+        # breaker and fails the ones still queued
+        assert [f.result(timeout=30) for f in futures[:3]] == [None, None, None]
+        for future in futures[3:]:
+            with pytest.raises(WorkerPoolBroken):
+                future.result(timeout=30)
+        assert pool.broken and pool.restarts == 2
+        # two backoffs (0.2s, 0.4s) before the third death
+        assert time.time() - t0 >= 0.6
+        with pytest.raises(WorkerPoolBroken):
+            pool.submit("later", "US").result(timeout=1)
+    finally:
+        pool.shutdown()